@@ -10,10 +10,18 @@ BIAS.py
  list of indices, and a sini cut, and outputs the number of transits that
  would be detected by my method.
 
-     * bias(sini, sini_u, transits, cut= ) uses the value(s) of sini to bias
-         a population of dwarfs or a single dwarf.
-     * help_bias(sini, siniu, cut= , i= ) is a helper function to assit bias()
+     * bias(sini, sini_u, transits, cut= , k= ) uses the value(s) of sini to
+         bias a population of dwarfs or a single dwarf.
+     * help_bias(sini, siniu, cut= , k= ) is a helper function to assit bias()
          in determining whether an object would have been chosen or not.
+     * as_float(x, prec= ) makes arrays of floats, keeping float32 ones
+     * low_sini(sini, sini_u, k= ) does help_bias()'s lower-limit test for
+         whole arrays of sinis at once.
+     * bias_mask(sini, sini_u, cut= , transits= , top20= , k= ) is the
+         array version of bias().
+
+ The lower limit is sini - k*sini_u, k = 1 (one sigma) by default. With
+ k = 0 a sini > 1.0 is never lowered, i.e. it is rejected outright.
 
 Modification history:
  6/26/16  - made bias() less monolithic by adding help_bias(), fixed code to
@@ -22,14 +30,25 @@ Modification history:
              stellar populations
  11/4/16  - revised bias()
  11/14/16 - added 'top20' keyword for bias()
+ 10/19/26 - look up transits in a set in bias(), added low_sini() and
+             bias_mask()
+ 10/19/26 - added as_float() so low_sini() and bias_mask() keep float32
+             sinis in float32
+ 10/19/26 - added 'backend' kwarg to low_sini() for KERNELS.py
+ 10/19/26 - added 'k' kwarg (sigmas of the lower limit) to bias(),
+             help_bias(), low_sini() and bias_mask(); low_sini() takes an
+             array of them to try several lower limits at once
 
 * LAST REVIEWED: 10/24/16
 """
 
+import numpy as np
+
 from lolimit import lolimit
+import kernels
 
 
-def bias(sini, sini_u, cut=0.95, transits=None, top20=1):
+def bias(sini, sini_u, cut=0.95, transits=None, top20=1, k=1):
     """Biases the population of BDs to the top candidates based *only* on
     their measured values of sini and the sini cut-off. **Chooses objects
     that will be observed, not which objects will show a transiting
@@ -47,6 +66,9 @@ def bias(sini, sini_u, cut=0.95, transits=None, top20=1):
         A list of the indices of objects with transiting exoplanets
     *top20 : 0 or 1
         Optional keyword that indicates whether or not to bias to the top 20%
+    *k : number
+        The lower limit tried for a sini > 1.0 is sini - k*sini_u (see
+        help_bias())
 
     Returns
     -------
@@ -67,7 +89,7 @@ def bias(sini, sini_u, cut=0.95, transits=None, top20=1):
         lows = []        # indices of the BDs that used lower-limit sini
         highs = []       # This will be a list of top sini values and indices.
         for i in range(len(sini)):
-            res = help_bias(sini[i], sini_u[i], cut)
+            res = help_bias(sini[i], sini_u[i], cut, k)
             if res[0] == 1:         # The lower limit was tried.
                 lows += [i]
                 sini[i] = res[2]    # Reset the sini to its lower limit.
@@ -83,16 +105,17 @@ def bias(sini, sini_u, cut=0.95, transits=None, top20=1):
             highs = highs[:top]     # The list is reduced to the top 20% sinis.
 #           used_low = [str(x) + '*' for x in indices if x in lows]
         high_inds = [x[-1] for x in highs]
-        transited = [x for x in high_inds if x in transits]
+        tr_set = set(transits or ())     # transits may be left as None.
+        transited = [x for x in high_inds if x in tr_set]
         return high_inds, transited, ct
 
     # To evaluate just one object's data:
     else:
-        res = help_bias(sini, sini_u, cut)
+        res = help_bias(sini, sini_u, cut, k)
         return res
 
 
-def help_bias(sini, sini_u, cut=0.95):
+def help_bias(sini, sini_u, cut=0.95, k=1):
     """A helper function for bias() that evaluates a sini to see whether the
     lower limit should be used and whether or not the object would have been
     biased.
@@ -105,6 +128,9 @@ def help_bias(sini, sini_u, cut=0.95):
         The uncertainty of the sini value
     cut : number
         The value of the sini cut-off
+    *k : number
+        The number of sigmas of the lower limit, sini - k*sini_u (1 by
+        default; 0 rejects every sini > 1.0)
 
     Returns
     -------
@@ -124,7 +150,7 @@ def help_bias(sini, sini_u, cut=0.95):
     (1, 0, 1.199411835930064)
     """
     if sini > 1.0:              # If sini > 1.0, try the lower limit.
-        nsini = float(lolimit(sini, sini_u))
+        nsini = float(lolimit(sini, k*sini_u))
         if sini != nsini:
             low = 1
         else:
@@ -137,3 +163,110 @@ def help_bias(sini, sini_u, cut=0.95):
     else:
         biased = 0
     return low, biased, sini
+
+
+def as_float(x, prec=None):
+    """Makes x an array of floats of the given precision. Without one,
+    float32 arrays (see VEC_POP.py's 'prec') stay float32 and everything
+    else becomes float64.
+
+    Parameters
+    ----------
+    x : array
+        The values
+    *prec : dtype
+        The precision wanted, e.g. 'float32'
+
+    Returns
+    -------
+    x : array
+        The values as floats (not copied when they already are)
+    """
+    x = np.asarray(x)
+    if prec is None:
+        prec = np.float32 if x.dtype == np.float32 else np.float64
+    return x.astype(prec, copy=False)
+
+
+def low_sini(sini, sini_u, backend=None, k=1):
+    """The array version of help_bias()'s lower-limit test: every sini > 1.0
+    is replaced by its lower limit, sini - k*sini_u, when that is <= 1.0. An
+    object is then biased when cut <= low_sini(sini, sini_u) <= 1.0.
+
+    Parameters
+    ----------
+    sini : array
+        The sini(s) of the objects
+    sini_u : array
+        The uncertainties of the sini values
+    *backend : None, 'numba' or 'numpy'
+        Uses KERNELS.py's compiled loop when Numba is installed (None, the
+        default, or 'numba'); 'numpy' never does
+    *k : number or array
+        The number of sigmas of the lower limit (1 by default, 0 to reject
+        every sini > 1.0); an array of them broadcasts against sini, e.g.
+        shape (policies, 1) for one row of sinis per policy
+
+    Returns
+    -------
+    low : array
+        The sinis that help_bias() would compare with the cut-off
+
+    Example
+    -------
+    >>> low_sini([0.8338721104131719, 1.0908342487974698],
+    ...          [0.11948557079946316, 0.12651281002313186])
+    array([0.83387211, 0.96432144])
+    """
+    sini = as_float(sini)
+    sini_u = as_float(sini_u, sini.dtype)
+    if sini.ndim == 1 and np.ndim(k) == 0 and k == 1 and \
+            kernels.use_numba(backend):
+        return kernels.low_sini(sini, sini_u)
+    low = sini - as_float(k, sini.dtype) * sini_u
+    return np.where((sini > 1.0) & (low <= 1.0), low, sini)
+
+
+def bias_mask(sini, sini_u, cut=0.95, transits=None, top20=1, k=1):
+    """The array version of bias(): biases a whole population at once and
+    returns boolean masks instead of lists of indices.
+
+    Parameters
+    ----------
+    sini : array
+        The sinis of the objects
+    sini_u : array
+        The uncertainties of the sini values
+    *cut : number
+        The sini cut-off to be used for this bias
+    *transits : array
+        A boolean mask of the objects with transiting exoplanets
+    *top20 : 0 or 1
+        Optional keyword that indicates whether or not to bias to the top 20%
+    *k : number
+        The number of sigmas of the lower limit (see low_sini())
+
+    Returns
+    -------
+    chosen : array
+        True for the objects that would be observed (bias()'s 'high_inds')
+    spotted : array
+        True for the chosen objects with a visibly transiting planet
+    ct : number
+        The total number of objects within the sini cut-off
+    """
+    low = low_sini(sini, sini_u, k=k)
+    # Compare float32 sinis with the cut in float64, as sini_cut._sweep() does.
+    chosen = (np.float64(cut) <= low) & (low <= 1.0)
+    ct = int(np.count_nonzero(chosen))
+    if top20 == 1:
+        top = int(0.2 * len(low))
+        # Highest sini first, ties to the higher index (as sorted() does).
+        order = np.argsort(np.where(chosen, low, -np.inf), kind='stable')
+        keep = np.zeros(len(low), dtype=bool)
+        keep[order[::-1][:min(top, ct)]] = True
+        chosen = keep
+    if transits is None:
+        transits = np.zeros(len(low), dtype=bool)
+    spotted = chosen & transits
+    return chosen, spotted, ct
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:31:08 2026
+
+@author: Madeleine
+
+BOOT_CUT.py
+
+ Bootstrap confidence intervals on the ideal sini cut-off and the highest
+ hit rate of one generated population, so SINI_CURVES.py's ideal cut can be
+ quoted with an uncertainty without rerunning the whole simulation.
+
+ Each resample draws n stars (with replacement) from the population as an
+ array of indices. SINI_CUT.py's sweep works out which cuts each original
+ star passes once, so a whole batch of resamples is scored by looking those
+ up through the index arrays, without sorting any resample again.
+
+     * boot_cut(sinis, sinius, transits, nboot= , cuts= , top20= , ci= ,
+         batch= , seed= ) returns percentile intervals on the ideal cut and
+         the highest hit rate
+
+Modification history:
+ 10/19/26 - created
+ 10/19/26 - the cuts default to gen_cuts(), as in plot(), instead of every
+             breakpoint, whose highest cut chooses a single star
+"""
+
+import numpy as np
+
+from bias import low_sini
+from sini_cut import _sweep, tr_mask, gen_cuts
+
+
+def boot_cut(sinis, sinius, transits, nboot=1000, cuts=None, top20=0, ci=95,
+             batch=50, seed=None):
+    """Bootstraps the ideal sini cut-off and highest hit rate of a
+    population.
+
+    Parameters
+    ----------
+    sinis : list
+        List of sini values for a population
+    sinius : list
+        List of sini uncertainty values for a population
+    transits : list
+        A list of indices that represent the stars with a transiting planet
+    *nboot : number
+        The number of resamples (1000 by default)
+    *cuts : list
+        The sini cuts to evaluate (plot()'s gen_cuts() by default). The
+        breakpoints of sini_cut.break_cuts() give exact ideal cuts, but
+        their highest cut chooses a single star, so the interval of the
+        highest hit rate then reaches 1.0
+    *top20 : 0 or 1
+        Optional keyword that indicates whether or not to bias to the top 20%
+    *ci : number
+        The width of the confidence intervals in percent (95 by default)
+    *batch : number
+        The number of resamples evaluated together
+    *seed : number
+        Seed for the resampling
+
+    Returns
+    -------
+    ideal_ci : tuple
+        The (lower, upper) percentile interval of the ideal cut
+    peak_ci : tuple
+        The (lower, upper) percentile interval of the highest hit rate
+    ideals : array
+        The ideal cut of every resample
+    peaks : array
+        The highest hit rate of every resample
+
+    Example
+    -------
+    >>> from vec_pop import gen_pop_arrays
+    >>> pop = gen_pop_arrays(n=10**5, seed=1, top20=0)
+    >>> transits = np.flatnonzero(pop['transit'])
+    >>> ideal_ci, peak_ci = boot_cut(pop['sini_m'], pop['sini_u'], transits,
+    ...                              seed=1)[:2]       # about 2 s
+    >>> ideal_ci
+    (0.9797979797979799, 0.98989898989899)
+    >>> peak_ci
+    (0.10853436798661037, 0.12984910862201124)
+    """
+    rng = np.random.default_rng(seed)
+    low = low_sini(sinis, sinius)
+    n = len(low)
+    tr = tr_mask(transits, n)
+    if cuts is None:
+        cuts = gen_cuts()
+    cuts = np.asarray(cuts, dtype=float)
+
+    ideals = []
+    peaks = []
+    for start in range(0, nboot, batch):
+        b = min(batch, nboot - start)
+        idx = rng.integers(0, n, size=(b, n))
+        ratios = _sweep(cuts, low, tr, idx=idx, top20=top20)[0]
+        best = np.argmax(ratios, axis=1)
+        peak = ratios[np.arange(b), best]
+        ideals += [np.where(peak > 0, cuts[best], 0.0)]
+        peaks += [peak]
+    ideals = np.concatenate(ideals)
+    peaks = np.concatenate(peaks)
+
+    q = [(100 - ci) / 2.0, (100 + ci) / 2.0]
+    ideal_ci = tuple(float(x) for x in np.percentile(ideals, q))
+    peak_ci = tuple(float(x) for x in np.percentile(peaks, q))
+    return ideal_ci, peak_ci, ideals, peaks
@@ -37,6 +37,12 @@ Modification history:
  10/31/16 - added maxy limit
  11/3/16  - incorporated eval_cut2()
  11/11/16 - added fractional increase plots to each subplot
+ 10/19/26 - added 'metrics' and 'progress' kwargs to datagen() for
+             METRICS.py's throughput reports, stopped printing every curve
+ 10/19/26 - datagen() returned after the first population size; it now
+             runs every size (and a/R*) before finishing; a/R* is passed
+             to generate_pop() as a list, as gen_planet() needs, and the
+             transits spotted are read from eval_cut2()'s 'maxtr' list
 
 * LAST REVIEWED: 10/27/16
 """
@@ -47,6 +53,7 @@ import ast
 
 from random_incs import *
 from sini_cut import *
+from metrics import new_meter, tick, finish
 
 
 #==============================================================================
@@ -69,7 +76,7 @@ pd_e = errors[:]
 rad_e = errors[:]
 
 
-def datagen(numcuts=100, unc=0):
+def datagen(numcuts=100, unc=0, metrics=None, progress=None):
     """A function to generate and evaluate multiple populations of stars
     while altering certain variables.
 
@@ -79,15 +86,20 @@ def datagen(numcuts=100, unc=0):
         The number of sini cut-off values desired
     *unc : 0 or 1
         Optional keyword to decide whether to vary uncertainty values or not
+    *metrics : string
+        A file to keep METRICS.py's throughput and progress metrics in
+    *progress : function
+        Called with the same metrics every few seconds
     """
     cuts = gen_cuts(numcuts)
+    meter = new_meter(len(pop) * len(ar), metrics, progress)
     if unc == 1:
         test_unc_prec()
     for s in range(len(pop)):           # Different population sizes.
         plt.figure(s+1, figsize=(25, 12))
 
         for d in range(len(ar)):        # Test different a/R* values.
-            generate_pop(n=pop[s], ar=ar[d], top20=0)
+            generate_pop(n=pop[s], ar=[ar[d]], top20=0)
 
             # Read data from text document and then evaluate
             data = []
@@ -109,9 +121,10 @@ def datagen(numcuts=100, unc=0):
                               frinc=1, top20=0)     # change top20 as necessary
             hitrate = evals[0]
             ideal = evals[1]
-            num_trans = evals[2]
+            num_trans = evals[2][0]     # the most transits spotted
             frincs = evals[3]
             ideal_frac = evals[4]
+            tick(meter, pop[s], hitrate)
 
             if len(transits) != 0:
                 tr_ratio = float(num_trans) / len(transits)
@@ -120,7 +133,6 @@ def datagen(numcuts=100, unc=0):
                 tr_perc = 0
 
             plt.subplot(5, 2, d+1)
-            print(cuts, hitrate)
             plt.plot(cuts, hitrate,
                      c='g',
                      label='Hit Rate\n v. Sini Cut-off')
@@ -175,7 +187,8 @@ Hit Rate = # of transits seen / # stars observed'.format(pop[s])
         print('Plot', s+1, 'complete.')
 
     #result = 'some sort of analysis'
-        return
+    finish(meter)
+    return
 
 
 #==============================================================================
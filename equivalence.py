@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 22:06:31 2026
+
+@author: Madeleine
+
+EQUIVALENCE.py
+
+ Checks that the faster engines give the same science as the original
+ scalar pipeline (RANDOM_INCS.py's generate_pop() with bias.bias() and
+ SINI_CUT.py's eval_cut2()), and times them side by side. The engines
+ compared are:
+
+     scalar   generate_pop() + eval_cut2()
+     numpy    vec_pop.gen_pop_arrays() + sini_cut.hit_curve(backend='numpy')
+     numba    the same with KERNELS.py's compiled loops (when installed)
+
+ Two kinds of check are made:
+
+     exact        Both engines draw from the same seeds, so everything they
+                  calculate must match exactly: the measured sinis and
+                  uncertainties, the transiting stars, bias()'s chosen and
+                  spotted stars, the hit rate at every cut, the ideal cut
+                  and 'maxtr'.
+     statistical  Both engines draw from different seeds, and their trials
+                  are compared as samples: two-sample Kolmogorov-Smirnov
+                  tests of the ideal cuts and of the selection counts (stars
+                  within the cut, observed and spotted), and a z-test of the
+                  average hit rate at every cut (Bonferroni-corrected over
+                  the cuts). This also holds for engines that draw their
+                  random numbers differently.
+
+     * exact_check(n= , trials= , numcuts= , top20= , md= , seed= ) runs the
+         matched-seed checks
+     * stat_check(n= , trials= , numcuts= , top20= , md= , seed= , alpha= )
+         runs the two-sample tests
+     * ks_2samp(a, b) is the two-sample KS test (statistic, p-value)
+     * run_harness(n= , trials= , stat_trials= , ..., fname= ) runs both
+         and writes the report
+
+Modification history:
+ 10/19/26 - created
+"""
+
+import contextlib
+import io
+import math
+import time
+
+import numpy as np
+
+from random_incs import generate_pop, spawn_rngs
+from bias import low_sini
+from mdwarfs import choose_planets
+from sini_cut import gen_cuts, eval_cut2, hit_curve
+from vec_pop import gen_pop_arrays
+import kernels
+
+REPORT = 'equivalence.txt'
+CUT = 0.95              # generate_pop()'s cut, for the selection counts.
+
+
+def engines():
+    """The fast engines available here."""
+    return ['numpy', 'numba'] if kernels.HAVE_NUMBA else ['numpy']
+
+
+def _planets(n, md, ar, rng):
+    if md == 1:
+        return choose_planets(n, rng)
+    return ar
+
+
+def _scalar(n, ar, top20, md, cuts, seed):
+    """One trial of the scalar pipeline, quietly (bias() prints)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        all_data, transits = generate_pop(n=n, ar=ar, top20=top20, md=md,
+                                          save=0, seed=seed)
+        gen = time.perf_counter() - start
+        sini = [row[12] for row in all_data]
+        sini_u = [row[13] for row in all_data]
+        # bias() lowers sinis above 1 in place, so keep them first.
+        sini_m, sini_u_m = np.array(sini, dtype=float), np.array(sini_u)
+        start = time.perf_counter()
+        ratios, ideal, maxtr = eval_cut2(cuts, sini, sini_u, transits,
+                                         top20=top20)
+        score = time.perf_counter() - start
+    chosen = np.array([row[-2] for row in all_data], dtype=bool)
+    spotted = np.array([row[-1] for row in all_data], dtype=bool)
+    tr = np.zeros(n, dtype=bool)
+    tr[list(transits)] = True
+    return {'sini_m': sini_m, 'sini_u': sini_u_m.astype(float), 'transit': tr,
+            'chosen': chosen, 'spotted': spotted,
+            'ratios': np.array(ratios, dtype=float), 'ideal': ideal,
+            'maxtr': list(maxtr), 'gen': gen, 'score': score}
+
+
+def _fast(n, ar, top20, md, cuts, seed, backend):
+    """One trial of a vectorized engine."""
+    start = time.perf_counter()
+    pop = gen_pop_arrays(n=n, ar=ar, top20=top20, md=md, seed=seed)
+    gen = time.perf_counter() - start
+    start = time.perf_counter()
+    ratios, ideal, maxtr = hit_curve(cuts, pop['sini_m'], pop['sini_u'],
+                                     np.flatnonzero(pop['transit']),
+                                     top20=top20, backend=backend)
+    score = time.perf_counter() - start
+    return {'sini_m': pop['sini_m'], 'sini_u': pop['sini_u'],
+            'transit': pop['transit'], 'chosen': pop['chosen'],
+            'spotted': pop['spotted'], 'ratios': ratios, 'ideal': ideal,
+            'maxtr': maxtr, 'gen': gen, 'score': score}
+
+
+def exact_check(n=1000, trials=20, numcuts=100, top20=0, md=0, ar=[20],
+                seed=None):
+    """Runs the scalar pipeline and every fast engine on the same seeds and
+    checks that they agree exactly.
+
+    Parameters
+    ----------
+    *n : number
+        The size of each population
+    *trials : number
+        The number of populations
+    *numcuts : number
+        The number of sini cuts
+    *top20, md, ar :
+        The same as for sini_curves.plot()
+    *seed : number
+        Seed of the check
+
+    Returns
+    -------
+    results : dictionary
+        For each fast engine, the number of trials in which each quantity
+        matched ('sini_m', 'sini_u', 'transit', 'chosen', 'spotted',
+        'ratios', 'ideal', 'maxtr'), plus 'time' (total generating and
+        scoring seconds of every engine, 'scalar' included) and 'trials'
+    """
+    cuts = gen_cuts(numcuts)
+    names = ['sini_m', 'sini_u', 'transit', 'chosen', 'spotted', 'ratios',
+             'ideal', 'maxtr']
+    fast = engines()
+    results = {'trials': trials,
+               'time': dict((x, [0.0, 0.0]) for x in ['scalar'] + fast)}
+    for x in fast:
+        results[x] = dict((name, 0) for name in names)
+    for rng in spawn_rngs(seed, trials):
+        planets = _planets(n, md, ar, rng)
+        pop_seed = int(rng.integers(2**32))
+        want = _scalar(n, planets, top20, md, cuts, pop_seed)
+        results['time']['scalar'][0] += want['gen']
+        results['time']['scalar'][1] += want['score']
+        for x in fast:
+            got = _fast(n, planets, top20, md, cuts, pop_seed, x)
+            results['time'][x][0] += got['gen']
+            results['time'][x][1] += got['score']
+            for name in names:
+                same = np.array_equal(np.asarray(want[name]),
+                                      np.asarray(got[name]))
+                results[x][name] += int(same)
+    return results
+
+
+def _kolmogorov(x):
+    """P(K > x) for the Kolmogorov distribution."""
+    if x < 0.2:
+        return 1.0
+    k = np.arange(1, 101)
+    return float(min(1.0, max(0.0, 2 * np.sum((-1)**(k-1) *
+                                             np.exp(-2 * k**2 * x**2)))))
+
+
+def ks_2samp(a, b):
+    """The two-sample Kolmogorov-Smirnov test.
+
+    Parameters
+    ----------
+    a, b : arrays
+        The two samples
+
+    Returns
+    -------
+    d : number
+        The largest distance between the two empirical distributions
+    p : number
+        Its (asymptotic) p-value; small values mean the samples differ
+    """
+    a = np.sort(np.asarray(a, dtype=float))
+    b = np.sort(np.asarray(b, dtype=float))
+    both = np.concatenate((a, b))
+    cdf_a = np.searchsorted(a, both, side='right') / len(a)
+    cdf_b = np.searchsorted(b, both, side='right') / len(b)
+    d = float(np.max(np.abs(cdf_a - cdf_b)))
+    en = math.sqrt(len(a) * len(b) / (len(a) + len(b)))
+    return d, _kolmogorov((en + 0.12 + 0.11 / en) * d)
+
+
+def stat_check(n=1000, trials=200, numcuts=100, top20=0, md=0, ar=[20],
+               seed=None, alpha=0.01):
+    """Runs the scalar pipeline and every fast engine on different seeds and
+    compares their trials with two-sample tests.
+
+    Parameters
+    ----------
+    *n, numcuts, top20, md, ar, seed :
+        As for exact_check()
+    *trials : number
+        The number of populations per engine
+    *alpha : number
+        The significance level of the tests
+
+    Returns
+    -------
+    results : dictionary
+        For each fast engine, (statistic, p-value, passed) for 'ideal',
+        'ct', 'observed' and 'spotted' (KS tests) and 'hit_rate' (the
+        largest |z| over the cuts and its Bonferroni-corrected p-value),
+        plus 'time' and 'trials'
+    """
+    cuts = gen_cuts(numcuts)
+    fast = engines()
+    samples = {}
+    results = {'trials': trials, 'alpha': alpha,
+               'time': dict((x, [0.0, 0.0]) for x in ['scalar'] + fast)}
+    for e, (x, rng) in enumerate(zip(['scalar'] + fast,
+                                     spawn_rngs(seed, len(fast) + 1))):
+        rows = {'ideal': [], 'ct': [], 'observed': [], 'spotted': [],
+                'ratios': []}
+        for t in range(trials):
+            planets = _planets(n, md, ar, rng)
+            pop_seed = int(rng.integers(2**32))
+            if x == 'scalar':
+                out = _scalar(n, planets, top20, md, cuts, pop_seed)
+            else:
+                out = _fast(n, planets, top20, md, cuts, pop_seed, x)
+            results['time'][x][0] += out['gen']
+            results['time'][x][1] += out['score']
+            rows['ideal'] += [out['ideal']]
+            rows['observed'] += [np.count_nonzero(out['chosen'])]
+            rows['spotted'] += [np.count_nonzero(out['spotted'])]
+            low = low_sini(out['sini_m'], out['sini_u'])
+            rows['ct'] += [np.count_nonzero((CUT <= low) & (low <= 1.0))]
+            rows['ratios'] += [out['ratios']]
+        samples[x] = dict((name, np.array(rows[name])) for name in rows)
+
+    base = samples['scalar']
+    for x in fast:
+        res = {}
+        for name in ('ideal', 'ct', 'observed', 'spotted'):
+            d, p = ks_2samp(base[name], samples[x][name])
+            res[name] = (d, p, p >= alpha)
+        m1, m2 = base['ratios'].mean(0), samples[x]['ratios'].mean(0)
+        se = np.sqrt(base['ratios'].var(0, ddof=1) / trials +
+                     samples[x]['ratios'].var(0, ddof=1) / trials)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = np.where(se > 0, np.abs(m1 - m2) / np.where(se > 0, se, 1),
+                         0.0)
+        zmax = float(z.max())
+        p = min(1.0, len(cuts) * math.erfc(zmax / math.sqrt(2)))
+        res['hit_rate'] = (zmax, p, p >= alpha)
+        results[x] = res
+    return results
+
+
+def _times(results, x, trials):
+    gen, score = results['time'][x]
+    return '{0:9.2f} {1:9.2f}'.format(1000 * gen / trials,
+                                       1000 * score / trials)
+
+
+def report(exact, stats):
+    """Lays the results of exact_check() and stat_check() out as text, with
+    each engine's time per trial beside its checks.
+
+    Returns
+    -------
+    text : string
+    """
+    lines = ['EXACT (matched seeds, {0} trials)'.format(exact['trials']), '']
+    fast = [x for x in engines() if x in exact]
+    lines += ['{0:10s} {1:>9s} {2:>9s} {3:>9s}  {4}'.format(
+        'engine', 'gen ms', 'score ms', 'speed-up', 'matched')]
+    base = sum(exact['time']['scalar'])
+    lines += ['{0:10s} {1}'.format('scalar', _times(exact, 'scalar',
+                                                   exact['trials']))]
+    for x in fast:
+        ok = ', '.join('{0} {1}/{2}'.format(name, exact[x][name],
+                                            exact['trials'])
+                       for name in exact[x])
+        speed = base / max(sum(exact['time'][x]), 1e-12)
+        lines += ['{0:10s} {1} {2:8.1f}x  {3}'.format(
+            x, _times(exact, x, exact['trials']), speed, ok)]
+        same = all(v == exact['trials'] for v in exact[x].values())
+        lines += ['{0:10s} {1}'.format('', 'EQUAL' if same else 'DIFFERENT')]
+
+    lines += ['', 'STATISTICAL (independent seeds, {0} trials each, '
+              'alpha = {1})'.format(stats['trials'], stats['alpha']), '']
+    lines += ['{0:10s} {1:>9s} {2:>9s} {3:>9s}  {4}'.format(
+        'engine', 'gen ms', 'score ms', 'speed-up', 'test: statistic, p')]
+    base = sum(stats['time']['scalar'])
+    lines += ['{0:10s} {1}'.format('scalar', _times(stats, 'scalar',
+                                                   stats['trials']))]
+    for x in fast:
+        speed = base / max(sum(stats['time'][x]), 1e-12)
+        tests = ['{0} {1:.3f}, {2:.3f} {3}'.format(
+            name, d, p, 'ok' if ok else 'FAIL')
+            for name, (d, p, ok) in sorted(stats[x].items())]
+        lines += ['{0:10s} {1} {2:8.1f}x  {3}'.format(
+            x, _times(stats, x, stats['trials']), speed, tests[0])]
+        lines += ['{0:41s}{1}'.format('', t) for t in tests[1:]]
+    return '\n'.join(lines) + '\n'
+
+
+def run_harness(n=1000, trials=20, stat_trials=200, numcuts=100, top20=0,
+                md=0, ar=[20], seed=None, fname=REPORT):
+    """Runs exact_check() and stat_check() and writes their report.
+
+    Parameters
+    ----------
+    *n, numcuts, top20, md, ar, seed :
+        As for exact_check()
+    *trials : number
+        The number of matched-seed trials
+    *stat_trials : number
+        The number of trials per engine in the statistical tests
+    *fname : string
+        The report file (None to only return it)
+
+    Returns
+    -------
+    text : string
+        The report
+
+    Example
+    -------
+    >>> print(run_harness(seed=1, fname=None))
+    """
+    exact = exact_check(n, trials, numcuts, top20, md, ar, seed)
+    stats = stat_check(n, stat_trials, numcuts, top20, md, ar, seed)
+    text = report(exact, stats)
+    if fname is not None:
+        with open(fname, 'w') as file:
+            file.write(text)
+    return text
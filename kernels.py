@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:02:11 2026
+
+@author: Madeleine
+
+KERNELS.py
+
+ Compiled loops for the two branch-heavy steps of scoring a population: the
+ lower-limit test of bias.help_bias() and the per-cut count of
+ sini_cut.eval_cut2(). With Numba installed the loops are compiled the
+ first time they are used; without it, bias.low_sini() and sini_cut._sweep()
+ use their NumPy versions instead (the loops below still run as plain
+ Python, which is only useful for checking them).
+
+ The sweep walks the population once, highest sini first, and the cuts
+ once, highest first, so 10^3 cuts x 10^7 stars costs one sort plus one
+ pass, without the cumulative-sum arrays the NumPy version builds.
+
+     * use_numba(backend) says whether a backend setting picks the compiled
+         loops
+     * low_sini(sini, sini_u) is bias.low_sini() as a loop
+     * sweep(cuts, low, tr, top20= ) is sini_cut._sweep() for one population
+         as a loop
+
+Modification history:
+ 10/19/26 - created
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """Leaves the function as it is when Numba is missing."""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+def use_numba(backend=None):
+    """Says whether to use the compiled loops.
+
+    Parameters
+    ----------
+    *backend : None, 'numba' or 'numpy'
+        None (default) and 'numba' use Numba when it is installed; 'numpy'
+        never does
+
+    Returns
+    -------
+    use : bool
+    """
+    if backend not in (None, 'numba', 'numpy'):
+        raise ValueError("backend must be None, 'numba' or 'numpy'")
+    return HAVE_NUMBA and backend != 'numpy'
+
+
+@njit(cache=True)
+def _low_loop(sini, sini_u, out):
+    for i in range(len(sini)):
+        s = sini[i]
+        low = s - sini_u[i]
+        if s > 1.0 and low <= 1.0:
+            out[i] = low
+        else:
+            out[i] = s
+
+
+@njit(cache=True)
+def _sweep_loop(low, tr, cuts, order, top, cnt, hits, obs):
+    # low and tr are the stars with low <= 1.0, highest sini first; order
+    # puts the cuts highest first; top is -1 unless keeping the top 20%.
+    j = 0
+    h = 0
+    top_hits = 0
+    for i in range(min(top, len(low))):
+        top_hits += tr[i]
+    for k in range(len(order)):
+        c = cuts[order[k]]
+        while j < len(low) and low[j] >= c:
+            h += tr[j]
+            j += 1
+        cnt[order[k]] = j
+        if top >= 0 and j >= top:
+            hits[order[k]] = top_hits
+            obs[order[k]] = top
+        else:
+            hits[order[k]] = h
+            obs[order[k]] = j
+
+
+def low_sini(sini, sini_u):
+    """bias.low_sini() as a loop.
+
+    Parameters
+    ----------
+    sini : array
+        The sini(s) of the objects
+    sini_u : array
+        The uncertainties of the sini values
+
+    Returns
+    -------
+    low : array
+        The sinis that help_bias() would compare with the cut-off
+    """
+    sini = np.ascontiguousarray(sini)
+    sini_u = np.ascontiguousarray(np.broadcast_to(sini_u, sini.shape),
+                                  dtype=sini.dtype)
+    out = np.empty_like(sini)
+    _low_loop(sini, sini_u, out)
+    return out
+
+
+def sweep(cuts, low, tr, top20=0):
+    """sini_cut._sweep() for one population as a loop: the same hit rates
+    and counts, from one sort of the stars and one pass over them.
+
+    Parameters
+    ----------
+    cuts : array
+        The sini cuts
+    low : array
+        low_sini() of the population
+    tr : array
+        Boolean transit mask
+    *top20 : 0 or 1
+        Keeps only the top 20% of the population, like bias()
+
+    Returns
+    -------
+    ratios, hits, cnt : arrays
+        As from sini_cut._sweep()
+    """
+    cuts = np.asarray(cuts, dtype=float)
+    ok = low <= 1.0
+    # Highest sini first; ties go to the higher index, as in bias().
+    srt = np.argsort(np.where(ok, low, -np.inf), kind='stable')[::-1]
+    m = int(np.count_nonzero(ok))
+    srt = srt[:m]
+    lows = np.ascontiguousarray(low[srt], dtype=float)
+    trs = np.ascontiguousarray(tr[srt], dtype=np.int64)
+    order = np.argsort(cuts, kind='stable')[::-1].copy()
+    top = int(0.2 * len(low)) if top20 == 1 else -1
+    cnt = np.zeros(len(cuts), dtype=np.int64)
+    hits = np.zeros(len(cuts), dtype=np.int64)
+    obs = np.zeros(len(cuts), dtype=np.int64)
+    _sweep_loop(lows, trs, cuts, order, top, cnt, hits, obs)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratios = np.where(obs > 0, hits / np.where(obs > 0, obs, 1), 0.0)
+    return ratios, hits, cnt
@@ -11,6 +11,10 @@ LOLIMIT.py
 
      * lolimit(sini,siniu,inc= ) calculates the lower limit of a sini according
          to its calc'd uncertainty
+     * sini_limits(sini, sini_u) calculates the lower and upper limits of
+         whole arrays of sinis at once, clipped into [0, 1]
+     * inc_limits(sini, sini_u) calculates the matching inclination
+         intervals
 
 Mod history:
  6/10/16  - added optional keyword 'inc' to lolimit() that calculates the
@@ -18,12 +22,16 @@ Mod history:
  6/14/16  - revised code to comply with PEP8 standards
  9/1/16   - added function test_limits() from TEST_LIMITS.py
  11/28/16 - have it import * from FIND_SINI.py
+ 10/19/26 - lolimit(hi=1) now returns the upper limit too, documented
+             test_limits()'s result, added sini_limits() and inc_limits()
 
 * LAST REVIEWED: 10/24/16
 """
 
 import math
 
+import numpy as np
+
 from find_sini import *
 
 # 6/10 suggestion: create way to return the low sini
@@ -42,7 +50,7 @@ def lolimit(sini, siniu, inc=0, hi=0):
     *inc : 0 or 1
         An optional keyword that will calculate the inclination when set to 1
     *hi : 0 or 1
-        An optional keyword that calculates the upper limit
+        An optional keyword that also returns the upper limit when set to 1
 
     Returns
     -------
@@ -52,6 +60,10 @@ def lolimit(sini, siniu, inc=0, hi=0):
         The lower limit of sini
     sini : number
         Original sini
+    *high : number
+        The upper limit of sini, sini + siniu; when hi=1, lolimit() returns
+        a 2-tuple (result, high), where result is what it returns without
+        hi: incl when inc=1, otherwise low (or sini)
 
     Example
     -------
@@ -59,19 +71,21 @@ def lolimit(sini, siniu, inc=0, hi=0):
     0.964321438774338
     >>> lolimit(1.0908342487974698,0.12651281002313186,1)
     1.3028681155989101
+    >>> lolimit(1.0908342487974698,0.12651281002313186,hi=1)
+    (0.964321438774338, 1.2173470588206017)
     """
     low = sini - siniu
     if low <= 1.0:
         if inc == 1:
-            incl = math.asin(low)
-            return incl
+            result = math.asin(low)
         else:
-            return low
+            result = low
+    else:          # Unable to calculate inclination:
+        result = sini   # Used for calculations.
     if hi == 1:
         high = sini + siniu
-        # What was I doing here?...
-    else:          # Unable to calculate inclination:
-        return sini     # Used for calculations.
+        return result, high
+    return result
 
 
 def test_limits(v, p, r, vu, pu, ru):
@@ -95,15 +109,85 @@ def test_limits(v, p, r, vu, pu, ru):
 
     Returns
     -------
-    result :
-        ...
+    result : number
+        lolimit() of the calculated sini: the lower limit of sini (sini minus
+        its uncertainty) when that is <= 1.0, otherwise the sini itself
 
     Examples
     --------
-    >>>
+    >>> test_limits(30, 14400, 71492, 3, 720, 7149.2)
+    0.817457828894757
     """
     sini = find_sini(v, p, r)
     unc = sini_unc(v, p, r, vu, pu, ru)
 
     result = lolimit(sini, unc)
     return result
+
+
+def sini_limits(sini, sini_u):
+    """The array version of lolimit(hi=1): the lower and upper limits of many
+    sinis at once, clipped into the physical range [0, 1]. (bias.low_sini()
+    keeps its own lower limit, which is not clipped at 0, so the stars
+    bias() chooses at a cut of 0 stay the same.)
+
+    Parameters
+    ----------
+    sini : array
+        The sin(inc) values of a population or catalog
+    sini_u : array
+        The uncertainties of the sini values
+
+    Returns
+    -------
+    low : array
+        The lower limits, sini - sini_u, clipped into [0, 1]
+    high : array
+        The upper limits, sini + sini_u, clipped into [0, 1]
+    ok : array
+        True where the interval reaches [0, 1] at all (sini - sini_u <= 1.0,
+        lolimit()'s test); elsewhere low and high are both 1.0
+
+    Example
+    -------
+    >>> low, high, ok = sini_limits(
+    ...     [0.8338721104131719, 1.0908342487974698, 1.5],
+    ...     [0.11948557079946316, 0.12651281002313186, 0.1])
+    >>> low
+    array([0.71438654, 0.96432144, 1.        ])
+    >>> high
+    array([0.95335768, 1.        , 1.        ])
+    >>> ok
+    array([ True,  True, False])
+    """
+    sini = np.asarray(sini, dtype=float)
+    sini_u = np.asarray(sini_u, dtype=float)
+    low = sini - sini_u
+    ok = low <= 1.0
+    low = np.clip(low, 0.0, 1.0)
+    high = np.clip(sini + sini_u, 0.0, 1.0)
+    return low, high, ok
+
+
+def inc_limits(sini, sini_u):
+    """The inclination intervals (radians) that match sini_limits(), as
+    lolimit(inc=1) gives for one lower limit.
+
+    Parameters
+    ----------
+    sini : array
+        The sin(inc) values of a population or catalog
+    sini_u : array
+        The uncertainties of the sini values
+
+    Returns
+    -------
+    inc_low : array
+        The inclinations of the lower sini limits (0 to pi/2)
+    inc_high : array
+        The inclinations of the upper sini limits (0 to pi/2)
+    ok : array
+        True where the interval reaches [0, 1] (see sini_limits())
+    """
+    low, high, ok = sini_limits(sini, sini_u)
+    return np.arcsin(low), np.arcsin(high), ok
@@ -12,10 +12,13 @@ Modification history:
  12/8/16  - added Aurora's planet probabilites, added choose_planet() for
              generating a/R* values based on probs
  12/9/16  - fixed probabilities, changed choose_planet()
+ 10/19/26 - choose_planet() draws from an explicit numpy Generator, added
+             choose_planets() to draw for many stars at once
 """
 
 import math
-import random
+
+import numpy as np
 
 from random_incs import *
 
@@ -66,13 +69,14 @@ orb_dist = [ar_gen(p) for p in periods]
 dist_rounded = [int(round(x)) for x in orb_dist]
 
 
-def choose_planet():
+def choose_planet(rng=None):
     """A function to return one star's planets' a/R* values by choosing from a
     probability distribution.
 
     Parameters
     ----------
-    None
+    *rng : numpy.random.Generator
+        The random number generator to draw from (a new one by default)
 
     Returns
     -------
@@ -86,9 +90,25 @@ def choose_planet():
     >>> choose_planet()
     [96, 13, 43, 30]
     """
-    ar_list = []
-    for x in range(len(probs)):
-        num = random.uniform(0, 100)
-        if num <= probs[x]:
-            ar_list += [dist_rounded[x]]
-    return ar_list
+    return choose_planets(1, rng)[0]
+
+
+def choose_planets(n, rng=None):
+    """Chooses the planets of n stars at once, drawing every number in one
+    call; the same as n calls of choose_planet() with the same generator.
+
+    Parameters
+    ----------
+    n : number
+        The number of stars
+    *rng : numpy.random.Generator
+        The random number generator to draw from (a new one by default)
+
+    Returns
+    -------
+    ar : list
+        A list of n lists of a/R* values
+    """
+    nums = np.random.default_rng(rng).uniform(0, 100, (n, len(probs)))
+    hits = nums <= np.array(probs)
+    return [[dist_rounded[x] for x in np.flatnonzero(row)] for row in hits]
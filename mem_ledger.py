@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:58:52 2026
+
+@author: Madeleine
+
+MEM_LEDGER.py
+
+ Memory accounting of a run stage by stage. A ledger is a dictionary that
+ build_pop() and generate_pop() (RANDOM_INCS.py) are handed through their
+ 'ledger' kwarg; they call stage(ledger, name) as each part of the work
+ starts ('truths', 'planets', 'measurements', 'bias', 'flags', 'output'),
+ and stage(None, ...) returns straight away, so a run without a ledger pays
+ nothing. For every stage the ledger keeps (from tracemalloc):
+
+     peak       the most memory held above what there was when the stage
+                started, i.e. what the stage needed at once (bytes)
+     retained   what the stage left behind when the next one started
+                (negative when it freed what earlier stages held)
+     rss        the resident memory of the process when it ended (bytes,
+                Linux only)
+
+ and, divided by the number of stars, bytes per star. Given the bytes per
+ star of a smaller run ('rates'), a ledger works out what a stage will need
+ before it starts and warns (ResourceWarning, or MemoryError with
+ hard=1) when that would take the process past its budget, and it warns
+ again whenever a stage ends within WARN_AT of the budget.
+
+     * new_ledger(stars, budget= , rates= , hard= ) starts the accounting
+     * stage(ledger, name) ends the current stage and starts the next
+     * close_ledger(ledger) ends the last stage and the accounting
+     * stage_rates(ledger) gives the peak bytes per star of every stage
+     * report(ledger) lays the ledger out as text
+     * current_rss() is the resident memory of the process now
+
+Modification history:
+ 10/19/26 - created
+"""
+
+import os
+import tracemalloc
+import warnings
+from collections import OrderedDict
+
+WARN_AT = 0.9           # Fraction of the budget that sets off a warning.
+
+
+def current_rss():
+    """The resident memory of this process now, in bytes (None where
+    /proc is missing)."""
+    try:
+        with open('/proc/self/statm') as file:
+            pages = int(file.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def _used(ledger):
+    """What counts against the budget: the resident memory where it can be
+    read, the memory traced so far where not."""
+    rss = current_rss()
+    if rss is not None:
+        return rss
+    return ledger['base'] + tracemalloc.get_traced_memory()[0]
+
+
+def new_ledger(stars, budget=None, rates=None, hard=0):
+    """Starts accounting for a run (and tracemalloc, unless it is already
+    tracing).
+
+    Parameters
+    ----------
+    stars : number
+        The number of stars in the run, for the bytes per star
+    *budget : number
+        The most memory (bytes) the process should hold
+    *rates : dictionary
+        The peak bytes per star of each stage (stage_rates() of a smaller
+        run), to foresee what each stage will need before it starts
+    *hard : 0 or 1
+        Raises MemoryError instead of warning when a stage is foreseen to go
+        over the budget
+
+    Returns
+    -------
+    ledger : dictionary
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    ledger = {'stars': stars, 'budget': budget, 'rates': rates or {},
+              'hard': hard, 'started': started, 'stages': OrderedDict(),
+              'current': None, 'base': 0}
+    ledger['base'] = (current_rss() or 0) - tracemalloc.get_traced_memory()[0]
+    return ledger
+
+
+def _end(ledger):
+    name = ledger['current']
+    if name is None:
+        return
+    current, peak = tracemalloc.get_traced_memory()
+    entry = ledger['stages'][name]
+    start = entry.pop('start')
+    entry['peak'] = max(entry['peak'], peak - start)
+    entry['retained'] += current - start
+    entry['rss'] = current_rss()
+    ledger['current'] = None
+    budget = ledger['budget']
+    if budget is not None and _used(ledger) > WARN_AT * budget:
+        warnings.warn('memory is at {0:.0f}% of the budget after {1!r}'.format(
+            100.0 * _used(ledger) / budget, name), ResourceWarning,
+            stacklevel=3)
+
+
+def stage(ledger, name):
+    """Ends the current stage and starts the named one. Warns (or raises
+    MemoryError) first if the ledger's rates say the stage will take the
+    process past its budget.
+
+    Parameters
+    ----------
+    ledger : dictionary or None
+        The ledger (None to do nothing)
+    name : string
+        The stage starting; a name used again adds to the same entry
+    """
+    if ledger is None:
+        return
+    _end(ledger)
+    budget = ledger['budget']
+    need = ledger['rates'].get(name, 0) * ledger['stars']
+    if budget is not None and _used(ledger) + need > budget:
+        text = ('{0!r} is expected to need {1:.1f} MB, which would take the '
+                'process past its budget of {2:.1f} MB').format(
+                    name, need / 2.0**20, budget / 2.0**20)
+        if ledger['hard'] == 1:
+            raise MemoryError(text)
+        warnings.warn(text, ResourceWarning, stacklevel=2)
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    entry = ledger['stages'].setdefault(name, {'peak': 0, 'retained': 0,
+                                               'rss': None})
+    entry['start'] = current
+    ledger['current'] = name
+
+
+def close_ledger(ledger):
+    """Ends the last stage (and tracemalloc, if the ledger started it) and
+    works out the bytes per star.
+
+    Returns
+    -------
+    ledger : dictionary
+        The same ledger; every stage also has 'peak_per_star' and
+        'retained_per_star', and 'peak' is the largest peak of any stage
+    """
+    _end(ledger)
+    ledger['peak'] = max([0] + [x['peak'] for x in
+                                ledger['stages'].values()])
+    if ledger['started']:
+        tracemalloc.stop()
+        ledger['started'] = False
+    stars = max(ledger['stars'], 1)
+    for entry in ledger['stages'].values():
+        entry['peak_per_star'] = entry['peak'] / stars
+        entry['retained_per_star'] = entry['retained'] / stars
+    return ledger
+
+
+def stage_rates(ledger):
+    """The peak bytes per star of every stage of a closed ledger (the
+    'rates' for a bigger run)."""
+    return dict((name, x['peak_per_star']) for name, x in
+                ledger['stages'].items())
+
+
+def report(ledger):
+    """Lays a closed ledger out as a text table.
+
+    Returns
+    -------
+    text : string
+    """
+    def mb(x):
+        return float('nan') if x is None else x / 2.0**20
+
+    lines = ['Memory by stage, {0} stars'.format(ledger['stars'])]
+    if ledger['budget'] is not None:
+        lines += ['budget: {0:.1f} MB'.format(mb(ledger['budget']))]
+    lines += ['{0:>14s} {1:>10s} {2:>12s} {3:>10s} {4:>12s} {5:>9s}'.format(
+        'stage', 'peak MB', 'peak B/star', 'kept MB', 'kept B/star',
+        'RSS MB')]
+    for name, x in ledger['stages'].items():
+        lines += ['{0:>14s} {1:10.2f} {2:12.1f} {3:10.2f} {4:12.1f} '
+                  '{5:9.1f}'.format(name, mb(x['peak']), x['peak_per_star'],
+                                    mb(x['retained']),
+                                    x['retained_per_star'], mb(x['rss']))]
+    return '\n'.join(lines) + '\n'
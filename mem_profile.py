@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:59:40 2026
+
+@author: Madeleine
+
+MEM_PROFILE.py
+
+ Finds out where the memory of a big generate_pop() run goes, with
+ MEM_LEDGER.py: how much each stage needs at its peak and keeps, in all and
+ per star. The stages are build_pop()'s 'truths' (the all_data rows),
+ 'planets' (gen_planet()'s nested pl_data lists), 'measurements', then
+ generate_pop()'s 'bias', 'flags' and 'output' (str(all_data) and the two
+ files), and last 'plot lists', the rounded sini lists and hit rates of one
+ trial of sini_curves.plot().
+
+ With a budget, a small calibration run is made first, so the bytes per
+ star of every stage are known and the big run warns before a stage that
+ would take the process past the budget starts, rather than after.
+
+     * profile_pop(n= , budget= , calib= , hard= , numcuts= , fname= ,
+         ...) runs and accounts one population
+
+Modification history:
+ 10/19/26 - created
+"""
+
+from random_incs import generate_pop
+from sini_cut import gen_cuts, eval_cut2
+from mem_ledger import (new_ledger, stage, close_ledger, stage_rates,
+                        report)
+
+CALIB = 2000            # Stars in the calibration run.
+
+
+def _run(n, ledger, numcuts, kwargs):
+    try:
+        all_data, transits = generate_pop(n=n, ledger=ledger, **kwargs)
+        stage(ledger, 'plot lists')
+        sini_list = [float('{:06.4f}'.format(float(row[12])))
+                     for row in all_data]
+        siniu_list = [float('{:06.4f}'.format(float(row[13])))
+                      for row in all_data]
+        eval_cut2(gen_cuts(numcuts), sini_list, siniu_list, transits,
+                  top20=kwargs.get('top20', 1))
+    finally:
+        close_ledger(ledger)
+    return ledger
+
+
+def profile_pop(n=10**5, budget=None, calib=CALIB, hard=0, numcuts=100,
+                fname=None, **kwargs):
+    """Generates one population with every stage's memory accounted.
+
+    Parameters
+    ----------
+    *n : number
+        The size of the population
+    *budget : number
+        The most memory (bytes) the process should hold; the stages are
+        foreseen from a calibration run and a warning given before any that
+        would go over it
+    *calib : number
+        The size of the calibration run (only made with a budget and when
+        smaller than n)
+    *hard : 0 or 1
+        Raises MemoryError instead of warning before a stage that would go
+        over the budget
+    *numcuts : number
+        The number of sini cuts of the 'plot lists' stage
+    *fname : string
+        A file to write the report to
+    **kwargs
+        Passed on to generate_pop() (e.g. md, ar, top20, save); with md=1,
+        ar has one entry per star and its first calib are used to calibrate
+
+    Returns
+    -------
+    ledger : dictionary
+        The closed ledger (see MEM_LEDGER.py); report(ledger) lays it out
+
+    Example
+    -------
+    >>> ledger = profile_pop(10**6, budget=4 * 2**30, fname='memory.txt')
+    """
+    rates = None
+    if budget is not None and calib < n:
+        small = dict(kwargs)
+        if small.get('md', 0) == 1 and 'ar' in small:
+            small['ar'] = small['ar'][:calib]
+        rates = stage_rates(_run(calib, new_ledger(calib), numcuts, small))
+    ledger = _run(n, new_ledger(n, budget, rates, hard), numcuts, kwargs)
+    if fname is not None:
+        with open(fname, 'w') as file:
+            file.write(report(ledger))
+    return ledger
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:14:37 2026
+
+@author: Madeleine
+
+METRICS.py
+
+ Progress and throughput reports for long Monte Carlo runs such as
+ sini_curves.plot() and dwarf_datagen.datagen(). A meter counts the trials
+ and stars simulated and, every few seconds, works out:
+
+     trials/sec, stars/sec   since the run started
+     ETA                     seconds until the last trial at that rate
+     CI width                width of the 95% confidence interval of the
+                             average hit rate at its current peak
+     peak RSS                the most memory the process has held (bytes)
+
+ and writes them to a metrics file in the plain-text exposition format
+ (one 'name{labels} value' line per metric, which node_exporter's textfile
+ collector and most cluster monitors read) and/or passes them to a
+ callback. The file also holds the time of the last trial, so a stalled
+ worker shows up as a time that stops moving. A run without a meter keeps
+ None in its place, and tick(None, ...) returns straight away.
+
+     * new_meter(total, fname= , callback= , every= , job= ) starts a meter
+         (or returns None when there is nowhere to report to)
+     * tick(meter, stars= , ratios= ) counts one trial, reporting when due
+     * report(meter) works out the metrics now
+     * finish(meter) sends the final report
+     * peak_rss() is the peak resident memory of the process
+
+Modification history:
+ 10/19/26 - created
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:             # Windows
+    resource = None
+
+EVERY = 5.0             # Seconds between reports.
+Z95 = 1.959963984540054
+
+HELP = [('trials_done', 'Trials finished'),
+        ('trials_total', 'Trials in the run'),
+        ('stars_done', 'Stars simulated'),
+        ('trials_per_second', 'Trials per second since the start'),
+        ('stars_per_second', 'Stars per second since the start'),
+        ('eta_seconds', 'Seconds left at the current rate'),
+        ('ci_width', 'Width of the 95% interval of the peak average hit '
+                     'rate'),
+        ('peak_rss_bytes', 'Peak resident memory of the process'),
+        ('last_trial_timestamp_seconds', 'Unix time of the last trial')]
+
+
+def peak_rss():
+    """The peak resident memory of this process in bytes (None where the
+    resource module is missing)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return rss                  # Already in bytes on macOS.
+    return rss * 1024
+
+
+def new_meter(total, fname=None, callback=None, every=EVERY, job='mdwarfs'):
+    """Starts a meter for a run.
+
+    Parameters
+    ----------
+    total : number
+        The number of trials in the run
+    *fname : string
+        The metrics file, rewritten at every report
+    *callback : function
+        Called with the metrics dictionary at every report
+    *every : number
+        Seconds between reports (5 by default)
+    *job : string
+        The 'job' label of the metrics in the file
+
+    Returns
+    -------
+    meter : dictionary or None
+        None when neither fname nor callback is given, so the run skips
+        the metrics altogether
+    """
+    if fname is None and callback is None:
+        return None
+    now = time.monotonic()
+    return {'total': total, 'fname': fname, 'callback': callback,
+            'every': every, 'job': job, 'start': now, 'next': now + every,
+            'trials': 0, 'stars': 0, 'last': time.time(),
+            'sum': None, 'sumsq': None}
+
+
+def tick(meter, stars=0, ratios=None):
+    """Counts one finished trial and reports when a report is due.
+
+    Parameters
+    ----------
+    meter : dictionary or None
+        From new_meter() (nothing is done for None)
+    *stars : number
+        The number of stars simulated in the trial
+    *ratios : list
+        The trial's hit rates, for the confidence interval
+    """
+    if meter is None:
+        return
+    meter['trials'] += 1
+    meter['stars'] += stars
+    meter['last'] = time.time()
+    if ratios is not None:
+        ratios = np.asarray(ratios, dtype=float)
+        if meter['sum'] is None:
+            meter['sum'] = np.zeros(len(ratios))
+            meter['sumsq'] = np.zeros(len(ratios))
+        meter['sum'] += ratios
+        meter['sumsq'] += ratios * ratios
+    if time.monotonic() >= meter['next']:
+        _send(meter)
+
+
+def report(meter):
+    """Works out the metrics of a meter now.
+
+    Parameters
+    ----------
+    meter : dictionary
+        From new_meter()
+
+    Returns
+    -------
+    metrics : dictionary
+        The values listed in HELP (NaN where not known yet)
+    """
+    elapsed = max(time.monotonic() - meter['start'], 1e-9)
+    done = meter['trials']
+    trial_rate = done / elapsed
+    if trial_rate > 0:
+        eta = (meter['total'] - done) / trial_rate
+    else:
+        eta = float('nan')
+    ci = float('nan')
+    if meter['sum'] is not None and done > 1:
+        mean = meter['sum'] / done
+        i = int(np.argmax(mean))
+        var = (meter['sumsq'][i] - done * mean[i]**2) / (done - 1)
+        ci = float(2 * Z95 * np.sqrt(max(var, 0.0) / done))
+    rss = peak_rss()
+    return {'trials_done': done, 'trials_total': meter['total'],
+            'stars_done': meter['stars'],
+            'trials_per_second': trial_rate,
+            'stars_per_second': meter['stars'] / elapsed,
+            'eta_seconds': eta, 'ci_width': ci,
+            'peak_rss_bytes': float('nan') if rss is None else rss,
+            'last_trial_timestamp_seconds': meter['last']}
+
+
+def _write(meter, metrics):
+    lines = []
+    label = '{{job="{0}"}}'.format(meter['job'])
+    for name, text in HELP:
+        value = float(metrics[name])
+        value = 'NaN' if np.isnan(value) else repr(value)
+        lines += ['# HELP mdwarfs_{0} {1}'.format(name, text),
+                  '# TYPE mdwarfs_{0} gauge'.format(name),
+                  'mdwarfs_{0}{1} {2}'.format(name, label, value)]
+    tmp = meter['fname'] + '.{0}.tmp'.format(os.getpid())
+    with open(tmp, 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+    os.replace(tmp, meter['fname'])     # Readers never see half a file.
+
+
+def _send(meter):
+    metrics = report(meter)
+    if meter['fname'] is not None:
+        _write(meter, metrics)
+    if meter['callback'] is not None:
+        meter['callback'](metrics)
+    meter['next'] = time.monotonic() + meter['every']
+    return metrics
+
+
+def finish(meter):
+    """Sends the final report of a run.
+
+    Parameters
+    ----------
+    meter : dictionary or None
+        From new_meter()
+
+    Returns
+    -------
+    metrics : dictionary or None
+        The final metrics (None for no meter)
+
+    Example
+    -------
+    >>> from sini_cut import gen_cuts
+    >>> from sini_curves import run_trial, trial_seed
+    >>> cuts = gen_cuts(100)
+    >>> meter = new_meter(20, fname='run.prom')
+    >>> for x in range(20):             # 20 trials of 1000 stars
+    ...     ratios = run_trial(cuts, 1000, [20], 0, 0, 1,
+    ...                        seed=trial_seed(1, x), save=0)[0]
+    ...     tick(meter, stars=1000, ratios=ratios)
+    >>> metrics = finish(meter)
+    >>> metrics['trials_done'], metrics['stars_done'], metrics['ci_width']
+    (20, 20000, 0.05589786600689486)
+    """
+    if meter is None:
+        return None
+    return _send(meter)
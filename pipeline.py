@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:32:17 2026
+
+@author: Madeleine
+
+PIPELINE.py
+
+ Runs the trials of SINI_CURVES.py's plot() as a pipeline instead of one
+ step after another. plot() generates a population (writing 'gen_pop.txt'
+ and 'all_data.txt'), scores it, saves a figure and adds a row to the
+ results store, and only then starts the next trial, so every stall writing
+ to a slow (network) disk adds to the time of the run. Here each stage runs
+ on its own thread and hands its work to the next through a bounded
+ asyncio queue:
+
+     generate   draw_trial()                          (thread)
+     evaluate   eval_cut2()                           (thread)
+     tally      sini_curves.tally(), METRICS.py       (event loop)
+     render     draw_curve() to a PNG                 (thread)
+     record     RESULTS_DB.py's add_trials()          (thread)
+
+ A full queue makes the stage before it wait (at most 'depth' trials are
+ held between two stages), so memory stays bounded however far the figures
+ or the store fall behind. The figures are drawn with matplotlib's object
+ interface (Figure + the Agg canvas), since pyplot is not thread-safe. The
+ trials keep their seeds and order, so the averages, files and rows are the
+ same as plot()'s. The compute stages share the GIL, so the gain is the
+ disk and rendering time that no longer adds to the computing.
+
+     * pipeline(n= , pop= , ..., depth= ) the coroutine; await it where an
+         event loop is already running (IPython/Spyder)
+     * run_pipeline(n= , pop= , ..., depth= ) runs it to the end
+
+Modification history:
+ 10/19/26 - created
+"""
+
+import asyncio
+import datetime
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from sini_cut import gen_cuts, eval_cut2
+from mdwarfs import choose_planets
+from results_db import open_store, trial_row, add_trials
+from metrics import new_meter, tick, finish
+from sini_curves import trial_seed, draw_trial, tally, draw_curve, curve_path
+
+DEPTH = 4
+DONE = None         # Sent down every queue after the last trial
+
+
+def render(cuts, stats, pop, ar, md, n_pl, fname):
+    """Saves one figure of the average hit rate curve without pyplot, so it
+    can be called from any thread."""
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    draw_curve(fig.add_subplot(), cuts, stats, pop, ar, md, n_pl)
+    fig.savefig(fname)
+
+
+async def _generate(loop, pool, out, n, pop, ar, top20, md, n_pl, seed,
+                    save):
+    for x in range(n):
+        drawn = await loop.run_in_executor(pool, draw_trial, pop, ar, top20,
+                                           md, n_pl, trial_seed(seed, x),
+                                           save)
+        await out.put((x, drawn))
+    await out.put(DONE)
+
+
+async def _evaluate(loop, pool, inq, out, cuts, top20):
+    while True:
+        item = await inq.get()
+        if item is DONE:
+            break
+        x, (sini_list, siniu_list, transits) = item
+        evals = await loop.run_in_executor(pool, functools.partial(
+            eval_cut2, cuts, sini_list, siniu_list, transits, top20=top20))
+        await out.put((x, evals))
+    await out.put(DONE)
+
+
+async def _tally(inq, outs, cuts, pop, meter):
+    stats = {'trials': 0}
+    while True:
+        item = await inq.get()
+        if item is DONE:
+            break
+        x, evals = item
+        tally(stats, cuts, evals[0], evals[2])
+        tick(meter, pop, evals[0])
+        # A copy, as the next trial updates stats in place.
+        for out in outs:
+            await out.put((x, evals, dict(stats)))
+    for out in outs:
+        await out.put(DONE)
+    return stats
+
+
+async def _render(loop, pool, inq, cuts, pop, ar, md, n_pl):
+    while True:
+        item = await inq.get()
+        if item is DONE:
+            break
+        x, evals, stats = item
+        await loop.run_in_executor(pool, render, cuts, stats, pop, ar, md,
+                                   n_pl, curve_path(md, x))
+        status = str(x+1) + ' plots complete.'
+        print(status)
+
+
+def _open(store):
+    return open_store(store)
+
+
+def _close(conn):
+    conn.close()
+
+
+async def _record(loop, pool, inq, store, params, cuts, seed):
+    # The connection is only used from the one thread of pool.
+    conn = await loop.run_in_executor(pool, _open, store)
+    run = str(datetime.datetime.now())
+    rows = []
+    try:
+        while True:
+            item = await inq.get()
+            if item is not DONE:
+                x, evals, stats = item
+                rows += [trial_row(params, x, cuts, evals[0], evals[1],
+                                   evals[2], seed=trial_seed(seed, x),
+                                   run=run)]
+            if len(rows) == 100 or (item is DONE and rows):
+                await loop.run_in_executor(pool, add_trials, conn, rows)
+                rows = []
+            if item is DONE:
+                break
+    finally:
+        await loop.run_in_executor(pool, _close, conn)
+
+
+async def pipeline(n=100, pop=100, ar=[20], numcuts=100, md=0, n_pl=1,
+                   top20=0, store=None, seed=None, metrics=None,
+                   progress=None, figures=1, save=1, depth=DEPTH):
+    """Runs the trials of plot() with generation, scoring, figures and the
+    results store overlapping.
+
+    Parameters
+    ----------
+    *n, pop, ar, numcuts, md, n_pl, top20, store, seed, metrics, progress :
+        The same as for sini_curves.plot()
+    *figures : 0 or 1
+        Saves the figure of the average after every trial, as plot() does,
+        when set to 1 (default)
+    *save : 0 or 1
+        Writes 'gen_pop.txt' and 'all_data.txt' for every trial, as plot()
+        does, when set to 1 (default)
+    *depth : number
+        The most trials waiting between two stages
+
+    Returns
+    -------
+    stats : dictionary
+        tally()'s averages over all of the trials
+    """
+    loop = asyncio.get_running_loop()
+    cuts = gen_cuts(numcuts)
+    meter = new_meter(n, metrics, progress)
+    if md == 1:
+        ar = choose_planets(pop, np.random.default_rng(trial_seed(seed)))
+    params = {'pop': pop, 'ar': ar, 'md': md, 'n_pl': n_pl, 'top20': top20,
+              'numcuts': numcuts}
+
+    pools = [ThreadPoolExecutor(1) for i in range(4)]
+    drawn = asyncio.Queue(depth)
+    scored = asyncio.Queue(depth)
+    outs = []
+    stages = [_generate(loop, pools[0], drawn, n, pop, ar, top20, md, n_pl,
+                        seed, save),
+              _evaluate(loop, pools[1], drawn, scored, cuts, top20)]
+    if figures == 1:
+        outs += [asyncio.Queue(depth)]
+        stages += [_render(loop, pools[2], outs[-1], cuts, pop, ar, md,
+                           n_pl)]
+    if store is not None:
+        outs += [asyncio.Queue(depth)]
+        stages += [_record(loop, pools[3], outs[-1], store, params, cuts,
+                           seed)]
+    stages += [_tally(scored, outs, cuts, pop, meter)]
+
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # One stage failed: stop the others rather than leave them waiting
+        # on a queue that will never move.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=True, cancel_futures=True)
+    finish(meter)
+    return tasks[-1].result()
+
+
+def run_pipeline(n=100, pop=100, ar=[20], numcuts=100, md=0, n_pl=1,
+                 top20=0, store=None, seed=None, metrics=None, progress=None,
+                 figures=1, save=1, depth=DEPTH):
+    """Runs pipeline() to the end; see pipeline() for the parameters.
+
+    Example
+    -------
+    >>> stats = run_pipeline(n=50, pop=1000, seed=1, store='results.db')
+    """
+    return asyncio.run(pipeline(n, pop, ar, numcuts, md, n_pl, top20, store,
+                                seed, metrics, progress, figures, save,
+                                depth))
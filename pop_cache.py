@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:05:52 2026
+
+@author: Madeleine
+
+POP_CACHE.py
+
+ An on-disk cache of generated stellar populations for RANDOM_INCS.py. Each
+ population is stored in NumPy's binary .npz format under a hash of the
+ parameters it was generated with and its seed, so a population can be
+ scored again (with a different sini cut or 'top20' setting) without being
+ generated again. The least recently used files are deleted once the cache
+ grows past CACHE_MAX bytes.
+
+     * pop_key(params, seed) hashes the generator parameters and seed
+     * load_pop(key, path= , names= ) returns the cached arrays, or None
+     * save_pop(key, arrays, path= , max_bytes= ) stores a population and
+         evicts old ones
+     * pack_pop(all_data, transits) turns generate_pop() rows into arrays
+     * unpack_pop(arrays, cols= ) turns the arrays (or some columns of
+         them) back into rows
+
+ Scorers that work on arrays (sini_cut.hit_curve(), bias_mask()) can take
+ the columns straight from load_pop(), as random_incs.pop_arrays() does,
+ and never build rows at all.
+
+Modification history:
+ 10/19/26 - created
+ 10/19/26 - VERSION 2: populations are drawn from numpy Generators
+ 10/19/26 - added 'names' kwarg to load_pop() and 'cols' kwarg to
+             unpack_pop() so only the columns needed are read and rebuilt
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+CACHE_DIR = 'pop_cache'
+CACHE_MAX = 2 * 1024**3         # 2 GB
+VERSION = 2                     # Change when all_data or the draws change.
+RAGGED = (5, 6)                 # Columns of all_data that hold a list/star.
+
+
+def pop_key(params, seed):
+    """Hashes a population's generator parameters and seed.
+
+    Parameters
+    ----------
+    params : dictionary
+        The keywords the population was generated with (n, ar, freq,
+        vsini_e, period_e, radius_e, md, n_pl)
+    seed : number
+        The seed of the random number generators
+
+    Returns
+    -------
+    key : string
+        A hexadecimal SHA-1 digest
+
+    Example
+    -------
+    >>> pop_key({'n': 100, 'ar': [20]}, 3)
+    '90dae9e29bf7d31f4d96a0f8215e36b3fd06f122'
+    """
+    text = json.dumps([VERSION, params, seed], sort_keys=True,
+                      default=lambda x: np.asarray(x).tolist())
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _path(key, path):
+    return os.path.join(path, key + '.npz')
+
+
+def load_pop(key, path=CACHE_DIR, names=None):
+    """Loads a cached population and marks it as recently used.
+
+    Parameters
+    ----------
+    key : string
+        The population's key from pop_key()
+    *path : string
+        The cache directory
+    *names : list
+        Only these arrays are read (e.g. ['c12', 'c13', 'transits']); all of
+        them by default
+
+    Returns
+    -------
+    arrays : dictionary or None
+        The arrays stored by save_pop(), or None when not cached
+    """
+    fname = _path(key, path)
+    try:
+        with np.load(fname) as data:
+            arrays = {name: data[name] for name in data.files
+                      if names is None or name in names}
+    except (IOError, ValueError, KeyError):     # Missing/half-written file.
+        return None
+    os.utime(fname)
+    return arrays
+
+
+def save_pop(key, arrays, path=CACHE_DIR, max_bytes=CACHE_MAX):
+    """Stores a population, then deletes the least recently used files until
+    the cache fits in max_bytes.
+
+    Parameters
+    ----------
+    key : string
+        The population's key from pop_key()
+    arrays : dictionary
+        The arrays from pack_pop()
+    *path : string
+        The cache directory
+    *max_bytes : number
+        The size limit of the cache directory
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    fname = _path(key, path)
+    tmp = fname + '.{0}.tmp'.format(os.getpid())
+    with open(tmp, 'wb') as file:
+        np.savez(file, **arrays)
+    os.replace(tmp, fname)      # Readers never see a half-written file.
+
+    files = [os.path.join(path, x) for x in os.listdir(path)
+             if x.endswith('.npz')]
+    files = sorted(files, key=os.path.getmtime)     # oldest first
+    total = sum(os.path.getsize(x) for x in files)
+    for old in files:
+        if total <= max_bytes or old == fname:
+            break
+        total -= os.path.getsize(old)
+        os.remove(old)
+
+
+def pack_pop(all_data, transits):
+    """Turns the rows made by random_incs.build_pop() into arrays. Every
+    column gets its own array; the planet columns, which hold a list per
+    star, are flattened and stored with their lengths.
+
+    Parameters
+    ----------
+    all_data : list
+        A list of the generated data
+    transits : list
+        A list of the indices of dwarfs with transiting planets
+
+    Returns
+    -------
+    arrays : dictionary
+        'c0', 'c1', ... for the columns, 'len5' and 'len6' for the lengths of
+        the ragged columns, and 'transits'
+    """
+    arrays = {'transits': np.array(transits, dtype=int)}
+    for c in range(len(all_data[0]) if all_data else 0):
+        col = [row[c] for row in all_data]
+        if c in RAGGED:
+            arrays['len' + str(c)] = np.array([len(x) for x in col],
+                                              dtype=int)
+            col = [x for sub in col for x in sub]
+        arrays['c' + str(c)] = np.array(col)
+    return arrays
+
+
+def unpack_pop(arrays, cols=None):
+    """Undoes pack_pop().
+
+    Parameters
+    ----------
+    arrays : dictionary
+        The arrays from pack_pop() or load_pop()
+    *cols : list
+        The numbers of the columns to rebuild the rows from, in order (all
+        of them by default)
+
+    Returns
+    -------
+    all_data : list
+        A list of the generated data (only the columns in cols)
+    transits : list
+        A list of the indices of dwarfs with transiting planets
+    """
+    if cols is None:
+        cols = range(len([x for x in arrays if x.startswith('c')]))
+    data = []
+    for c in cols:
+        col = arrays['c' + str(c)].tolist()
+        if c in RAGGED:
+            ends = np.cumsum(arrays['len' + str(c)]).tolist()
+            col = [col[e - l:e] for e, l in
+                   zip(ends, arrays['len' + str(c)].tolist())]
+        data += [col]
+    all_data = [list(row) for row in zip(*data)]
+    transits = arrays['transits'].tolist()
+    return all_data, transits
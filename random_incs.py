@@ -46,6 +46,25 @@ Modification history:
  12/1/16  - continued gen_planet(), removed planet lines from generate_pop()
  12/9/16  - added planet_eval() for use with M-dwarf parameters, changed
              planet generation in generate_pop(md=1)
+ 10/19/26 - restored generate_pop()'s return statement, added 'save' kwarg so
+             callers that keep the data in memory can skip the text files;
+             moved generation into build_pop(), added 'seed' and 'cache'
+             kwargs to generate_pop() for use with POP_CACHE.py, fixed
+             md=1 rows getting every star's 'transit seen?' list, look up
+             the biased indices in sets instead of lists
+ 10/19/26 - every draw now comes from an explicit numpy Generator ('rng'
+             kwargs, or generate_pop()'s 'seed') in bulk, in the same order
+             as VEC_POP.py; added spawn_rngs() for independent streams
+ 10/19/26 - added 'cols' kwarg to build_pop() and generate_pop() so only
+             the requested columns are calculated and kept, pick_columns()
+ 10/19/26 - added 'ledger' kwarg to build_pop() and generate_pop() for
+             MEM_LEDGER.py's memory accounting of each stage
+ 10/19/26 - a cached population is only made into rows for the columns
+             kept; added pop_arrays() to hand cached columns to array
+             scorers without making rows
+ 10/19/26 - build_pop() builds each row from the kept columns alone, and
+             gen_planet()/planet_eval() skip the planet lists ('lists'
+             kwarg) when no row keeps them
 
 * LAST REVIEWED: 7/27/16
 """
@@ -53,20 +72,58 @@ Modification history:
 
 import numpy as np
 import math
-import random
 import datetime
+import itertools
 
 from find_inc import find_inc
 from find_sini import *
 from bias import *
 from star_dict import add_entry
+from pop_cache import pop_key, load_pop, save_pop, pack_pop, unpack_pop
+import mem_ledger
+
+# The columns of generate_pop()'s rows, in order. For md=1 'planets' holds
+# each star's a/R*s instead of whether it has each planet.
+COLUMNS = ('inc', 'vsini', 'period', 'radius', 'sini', 'planets', 'pl_transit',
+           'success', 'inc_m', 'vsini_m', 'period_m', 'radius_m', 'sini_m',
+           'sini_u', 'chosen', 'spotted')
 
 
 def f(x):
     return math.sin(x)
 
 
-def gen_incs(n):
+def spawn_rngs(seed, num):
+    """Makes num independent random number generators from one seed, so
+    subtasks (trials, stages, worker processes) can draw in parallel and
+    still give the same results as in serial.
+
+    Parameters
+    ----------
+    seed : number, SeedSequence or numpy.random.Generator
+        The parent seed (None for fresh entropy)
+    num : number
+        The number of generators
+
+    Returns
+    -------
+    rngs : list
+        num numpy.random.Generators; the i-th one is the same whenever the
+        same seed is split into the same number of streams
+
+    Examples
+    --------
+    >>> [x.random() for x in spawn_rngs(1, 2)]
+    [0.6990345474368357, 0.4757645185899906]
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed.spawn(num)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [np.random.default_rng(x) for x in seed.spawn(num)]
+
+
+def gen_incs(n, rng=None):
     """A function to generate inclination based on a probability
     distribution.
 
@@ -74,6 +131,8 @@ def gen_incs(n):
     ----------
     n : number
         The size of the desired population
+    *rng : numpy.random.Generator
+        The random number generator to draw from (a new one by default)
 
     Returns
     -------
@@ -91,7 +150,7 @@ def gen_incs(n):
     x = data
     y = [i/len(data) for i in range(len(data))]  # cumulative num / total num
 
-    draw = np.random.rand(n)
+    draw = np.random.default_rng(rng).random(n)
     incs = np.interp(draw, y, x)                 # Inclinations are in radians.
 
     # added 12/12
@@ -127,18 +186,23 @@ def gen_incs(n):
     return incs
 
 
-def gen_period(md=0):
+def gen_period(md=0, rng=None, size=None):
     """A function that will generate a rotational period (seconds).
 
     Parameters
     ----------
     *md : 0 or 1
         A kwarg to indicate whether or not to use M-dwarf parameters
+    *rng : numpy.random.Generator
+        The random number generator to draw from (a new one by default)
+    *size : number
+        The number of periods to draw at once (one by default)
 
     Returns
     -------
-    period : number
-        A randomly-generated period in seconds
+    period : number or array
+        A randomly-generated period in seconds (an array of them when size
+        is given)
 
     Examples
     --------
@@ -153,22 +217,27 @@ def gen_period(md=0):
     if md == 1:
         low = 2.4 * 3600       # 0.1 days -> seconds
         hi = 24 * 3600         # 1.0 day -> seconds
-    period = random.uniform(low, hi)
+    period = np.random.default_rng(rng).uniform(low, hi, size)
     return period
 
 
-def gen_radius(md=0):
+def gen_radius(md=0, rng=None, size=None):
     """Randomly generates a radius based on a Gaussian curve.
 
     Parameters
     ----------
     *md : 0 or 1
         A kwarg to indicate whether or not to use M-dwarf parameters
+    *rng : numpy.random.Generator
+        The random number generator to draw from (a new one by default)
+    *size : number
+        The number of radii to draw at once (one by default)
 
     Returns
     -------
-    r : number
-        One randomly generated value for radius (kilometers)
+    r : number or array
+        One randomly generated value for radius (kilometers), or an array of
+        them when size is given
 
     Examples
     --------
@@ -182,11 +251,11 @@ def gen_radius(md=0):
         Rsun = 695700  # km (source: NASA fact sheet)
         R = 0.3 * Rsun
     stdv = R * 0.1 / 3
-    r = random.gauss(R, stdv)
+    r = np.random.default_rng(rng).normal(R, stdv, size)
     return r
 
 
-def gen_planet(n_pl, n, ar, incs, freq=1):
+def gen_planet(n_pl, n, ar, incs, freq=1, rng=None, lists=1):
     """A function to generate planets around stars.
 
     Parameters
@@ -202,6 +271,11 @@ def gen_planet(n_pl, n, ar, incs, freq=1):
     *freq : number
         A fraction representing the intrinsic frequency of stars having an
         orbiting exoplanet (1.0 = 100% by default)
+    *rng : numpy.random.Generator
+        The random number generator to draw from (a new one by default)
+    *lists : 0 or 1
+        Builds pl_data when set to 1 (default); with 0 only the transits are
+        found (with the same draws) and pl_data is None
 
     Returns
     -------
@@ -212,12 +286,22 @@ def gen_planet(n_pl, n, ar, incs, freq=1):
         A list of indices of stars with observable transits
     """
     # Randomly assign a planet to an object based on intrinsic frequency.
+    rng = np.random.default_rng(rng)
     num_planets = int(freq * n)
     transits = []                            # Indices of dwarfs w/ transits
-    pl_data = [[[], []] for x in range(n)]   # Full list of planetary data
+    pl_data = None
+    if lists == 1:
+        pl_data = [[[], []] for x in range(n)]   # Full list of planetary data
     for i in range(n_pl):  # for each exoplanet...
-        planets = ([1] * num_planets) + ([0] * (n - num_planets))
-        random.shuffle(planets)
+        planets = [0] * n
+        for j in rng.permutation(n)[:num_planets]:
+            planets[j] = 1
+        if lists != 1:
+            # Only the transits: just the stars with this planet.
+            for j in range(n):
+                if planets[j] == 1 and abs(ar[i]*math.cos(incs[j])) < 1:
+                    transits += [j]
+            continue
         for j in range(n):  # for each star in the population...
             pl_data[j][0] += [planets[j]]       # Assign a planet to each obj
             if planets[j] == 1:  # if this star has a planet...
@@ -233,7 +317,7 @@ def gen_planet(n_pl, n, ar, incs, freq=1):
     return pl_data, transits
 
 
-def planet_eval(ar, incs):
+def planet_eval(ar, incs, lists=1):
     """A function that evaluates exoplanets' transitability(?) when the
     planet's existence doesn't need to be determined. (An alternate to
     gen_planet() for use with M-dwarf data.)
@@ -244,6 +328,9 @@ def planet_eval(ar, incs):
         A list of lists with the a/R* values for the planets of each star
     incs : list
         A list of inclinations of stars in the population
+    *lists : 0 or 1
+        Builds obs when set to 1 (default); with 0 only the transits are
+        found and obs is None
 
     Returns
     -------
@@ -254,53 +341,66 @@ def planet_eval(ar, incs):
         A list of indices of stars with observable transits
     """
     transits = []
-    obs = [[] for x in range(len(ar))]
+    obs = None
+    if lists == 1:
+        obs = [[] for x in range(len(ar))]
     for i in range(len(ar)):
         for j in range(len(ar[i])):
             arcosi = abs(ar[i][j]*math.cos(incs[i]))
             if arcosi < 1:  # if (a/R)*cosi < 1:
-                obs[i] += [1]
+                if lists == 1:
+                    obs[i] += [1]
                 transits += [i]
-            else:
+            elif lists == 1:
                 obs[i] += [0]
     return obs, transits
 
 
-def generate_pop(n=100, cut=0.95, ar=[20], freq=1, vsini_e=0.1, period_e=0.05,
-                 radius_e=0.1, top20=1, md=0, n_pl=1):
-    """A function that will generate a population of n stars with the
-    specified parameters.
+def pick_columns(cols=None):
+    """Checks a selection of columns and puts it in COLUMNS order.
 
     Parameters
     ----------
-    *n : number
-        The number of stars in the population (100 by default)
-    *cut : number
-        The sini cut for this population (0.95 by default)
-    *ar : list
-        Semimajor axis / stellar radius ([20] by default)
-    *freq : number
-        A fraction representing the intrinsic frequency of stars having an
-        orbiting exoplanet (1.0 = 100% by default)
-    *vsini_e : number
-        Rate of error on the vsini values (0.1 by default, from literature)
-    *period_e : number
-        The error rate assumed for the rotational period (0.05 by default,
-        averaged from literature)
-    *radius_e : number
-        The error rate assumed for the radii (10% by default)
-    *top20 : 0 or 1
-        Optional keyword that indicates whether or not to bias to the top 20%
-        (for bias.bias())
-    *md : 0 or 1
-        A kwarg to indicate whether or not to use M-dwarf parameters
-    *n_pl : number
-        The number of planets to be generated per star
+    *cols : list
+        Names from COLUMNS (None for all of them)
+
+    Returns
+    -------
+    cols : tuple
+        The selected columns, in the order they appear in rows
+    """
+    if cols is None:
+        return COLUMNS
+    unknown = set(cols) - set(COLUMNS)
+    if unknown:
+        raise ValueError('unknown columns: {0}'.format(sorted(unknown)))
+    return tuple(x for x in COLUMNS if x in cols)
+
+
+def build_pop(n=100, ar=[20], freq=1, vsini_e=0.1, period_e=0.05,
+              radius_e=0.1, md=0, n_pl=1, rng=None, cols=None, ledger=None):
+    """Generates the stellar truths, planets and measurements of a population
+    of n stars; generate_pop() then biases it and writes it out.
+
+    Parameters
+    ----------
+    *n, ar, freq, vsini_e, period_e, radius_e, md, n_pl :
+        The same as for generate_pop()
+    *rng : numpy.random.Generator
+        The random number generator to draw from (a new one by default)
+    *cols : list
+        Only these columns are kept (the first 14 of COLUMNS by default);
+        each row is built from them alone, the true sini, measured
+        inclination and 'success' are only calculated and the planet lists
+        only built when they or a column needing them is kept
+    *ledger : dictionary
+        A MEM_LEDGER.py ledger to account the memory of the 'truths',
+        'planets' and 'measurements' stages to
 
     Returns
     -------
     all_data : list
-        A list of the generated data
+        A list of the generated data (without the bias columns)
     transits : list
         A list of the indices of dwarfs with transiting planets
     """
@@ -314,35 +414,49 @@ def generate_pop(n=100, cut=0.95, ar=[20], freq=1, vsini_e=0.1, period_e=0.05,
 #   true period = set at 4 hours = 14400 seconds
 #   true radius = randomly generated from Gaussian curve
 #==============================================================================
-    all_data = []
-
-    incs = gen_incs(n)
-    for i in incs:
-        r = gen_radius(md)
-        P = gen_period(md)
-        vsin_i = (2*math.pi*r/P)*math.sin(i)
-        sin_i = find_sini(vsin_i, P, r)
-        all_data += [[i, vsin_i, P, round(r, 4), sin_i]]
-
-    # We have just created a list 'all_data' containing "true" elements for
-    # each generated dwarf:
+    mem_ledger.stage(ledger, 'truths')
+    cols = pick_columns(cols)
+    need_sini = 'sini' in cols or 'success' in cols
+
+    # Drawn in bulk, in the same order as vec_pop.draw_truths(). Each truth
+    # is kept as its own list; only the kept columns go into the rows.
+    rng = np.random.default_rng(rng)
+    incs = gen_incs(n, rng)
+    radii = gen_radius(md, rng, n).tolist()
+    periods = gen_period(md, rng, n).tolist()
+    vsinis = [(2*math.pi*r/P)*math.sin(i)
+              for i, r, P in zip(incs.tolist(), radii, periods)]
+    sinis = None
+    if need_sini:
+        sinis = [find_sini(v, P, r) for v, P, r in zip(vsinis, periods,
+                                                        radii)]
+    data = {'vsini': vsinis, 'period': periods, 'sini': sinis}
+    if 'inc' in cols:
+        data['inc'] = incs.tolist()
+    if 'radius' in cols:
+        data['radius'] = [round(r, 4) for r in radii]
+
+    # We have just created the "true" elements for each generated dwarf:
     key = ['inclination (rads)', 'vsini (km/s)', 'period (seconds)',
            'radius (km)', 'sini (rads)']
 
+    mem_ledger.stage(ledger, 'planets')
+    # The nested planet lists are only built when a row keeps them.
+    lists = int('planets' in cols or 'pl_transit' in cols)
     if md == 1:
-        planet_data = planet_eval(ar, incs)
-        observed = planet_data[0]
+        planet_data = planet_eval(ar, incs, lists)
+        data['planets'] = ar
+        data['pl_transit'] = planet_data[0]
         transits = planet_data[1]
-        for i in range(n):
-            all_data[i] += [ar[i], observed]
         key += ['exoplanet a/R*(s)', 'transit seen?']
     else:
-        planet_data = gen_planet(n_pl, n, ar, incs, freq)
-        planets = planet_data[0]
+        planet_data = gen_planet(n_pl, n, ar, incs, freq, rng, lists)
         transits = planet_data[1]
-        for i in range(n):
-            all_data[i] += planets[i]
+        if lists == 1:
+            data['planets'] = [x[0] for x in planet_data[0]]
+            data['pl_transit'] = [x[1] for x in planet_data[0]]
         key += ['exoplanet(s)?', 'transit seen?']
+    planet_data = None
 
 #==============================================================================
 #   MEASUREMENTS/ASSUMPTIONS
@@ -360,79 +474,268 @@ def generate_pop(n=100, cut=0.95, ar=[20], freq=1, vsini_e=0.1, period_e=0.05,
 #   assumed period error = input percentage * period
 #   assumed radius error = input percent * radius (10% by default)
 #==============================================================================
+    mem_ledger.stage(ledger, 'measurements')
+    # Each row starts with the truths and planets kept (one tuple per star)
+    # and gets only the measurements kept.
+    front = [data[x] for x in cols if x in COLUMNS[:7]]
+    front = zip(*front) if front else itertools.repeat((), n)
+    data = None
+    keep = [j for j, x in enumerate(COLUMNS[8:14]) if x in cols]
+    need_inc = 'inc_m' in cols
+    need_success = 'success' in cols
+    need_m = 'sini_m' in cols or need_success
+    need_u = 'sini_u' in cols or need_success
+    sini_m = sini_u = im = None
+
+    ra = 71492                                  # assumed radius in km
+    if md == 1:
+        ra = 0.3 * 695700                       # assumed radius for M-dwarfs
+    ra_e = radius_e * ra                        # assumed radius error
     results = 0                                 # successful transits calc'd
-    for i in range(n):
+    all_data = []
+    for i, row in zip(range(n), front):
         # "true" elements:
-        it = all_data[i][0]                     # true inc
-        vt = all_data[i][1]                     # true vsini
-        pt = all_data[i][2]                     # true period
-        rt = all_data[i][3]                     # true radius
-        sini_t = all_data[i][4]                 # true sini
+        vt = vsinis[i]                          # true vsini
+        pt = periods[i]                         # true period
 
         # "measured" or assumed elements:
-        ra = 71492                              # assumed radius in km
-        if md == 1:
-            ra = 0.3 * 695700                   # assumed radius for M-dwarfs
-        ra_e = radius_e * ra                    # assumed radius error
         p_e = period_e * pt                     # period error in secs
         pm = pt + p_e                           # measured period
         vm_e = vsini_e * vt                     # measured vsini error
         vm = vt + vm_e                          # measured vsini
 
         # Calculate measured sini.
-        sini_m = find_sini(vm, pm, ra)
-        sini_u = sini_unc(vm, pm, ra, vm_e, p_e, ra_e)
-        diff = abs(sini_m - sini_t)  # added abs() 10/24
+        if need_m:
+            sini_m = find_sini(vm, pm, ra)
+        if need_u:
+            sini_u = sini_unc(vm, pm, ra, vm_e, p_e, ra_e)
 
         # Calculate measured inclination (in radians).
-        im = find_inc(vm, pm, ra)
-
-        if diff <= sini_u:      # This means the sini we calculated with the
-            all_data[i] += [1]  # measured values is off of the true value
-            results += 1        # within the calculated error.
-        else:
-            all_data[i] += [0]
+        if need_inc:
+            im = find_inc(vm, pm, ra)
+
+        row = list(row)
+        if need_success:
+            if abs(sini_m - sinis[i]) <= sini_u:    # added abs() 10/24
+                row += [1]      # This means the sini we calculated with the
+                results += 1    # measured values is off of the true value
+            else:               # within the calculated error.
+                row += [0]
         add = [im, vm, pm, ra, sini_m, sini_u]
-        all_data[i] += add
+        row += add if len(keep) == 6 else [add[j] for j in keep]
+        all_data += [row]
 
     # *** 9/19 CHECK THIS!!  10/21 left off here
     key += ['successfully calculated inc?', 'measured inc', 'measured vsini',
             'measured period', 'measured radius', 'measured sini',
             'sini uncertainty']
 
-    m_sinis = [all_data[x][12] for x in range(n)]
-    m_sinius = [all_data[x][13] for x in range(n)]
+    return all_data, transits
+
+
+def _cache_names(keep):
+    """The arrays of a cached population that hold the columns in keep."""
+    names = ['transits']
+    for j in keep:
+        names += ['c' + str(j)]
+        if j in (5, 6):                     # The planet columns are ragged.
+            names += ['len' + str(j)]
+    return names
+
+
+def pop_arrays(n=100, ar=[20], freq=1, vsini_e=0.1, period_e=0.05,
+               radius_e=0.1, md=0, n_pl=1, seed=0,
+               cols=('sini_m', 'sini_u')):
+    """Returns columns of a population as arrays straight from POP_CACHE.py's
+    cache (generating and storing the population first when it is not
+    there), for scorers that work on arrays such as sini_cut.hit_curve().
+    A cached population is never made into rows, so scoring it again costs
+    only reading the columns.
+
+    Parameters
+    ----------
+    n, ar, freq, vsini_e, period_e, radius_e, md, n_pl :
+        The same as for generate_pop()
+    *seed : number
+        Seed of the population (the cache needs one)
+    *cols : list
+        The columns wanted, from the first 14 of COLUMNS
+
+    Returns
+    -------
+    arrays : dictionary
+        An array for every column in cols, plus 'transits' (the indices of
+        dwarfs with transiting planets)
+
+    Example
+    -------
+    >>> from sini_cut import hit_curve, gen_cuts
+    >>> p = pop_arrays(n=10**5, seed=3)
+    >>> ratios, ideal, maxtr = hit_curve(gen_cuts(), p['sini_m'], p['sini_u'],
+    ...                                  p['transits'])
+    >>> float(ideal), maxtr
+    (0.98989898989899, [1963, 95399])
+    """
+    cols = pick_columns(cols)
+    if 'chosen' in cols or 'spotted' in cols:
+        raise ValueError("'chosen' and 'spotted' depend on the cut; use "
+                         "bias_mask()")
+    params = {'n': n, 'ar': ar, 'freq': freq, 'vsini_e': vsini_e,
+              'period_e': period_e, 'radius_e': radius_e, 'md': md,
+              'n_pl': n_pl}
+    pkey = pop_key(params, int(seed))
+    keep = [COLUMNS.index(x) for x in cols]
+    cached = load_pop(pkey, names=_cache_names(keep))
+    if cached is None:
+        all_data, transits = build_pop(rng=np.random.default_rng(seed),
+                                       **params)
+        cached = pack_pop(all_data, transits)
+        save_pop(pkey, cached)
+    arrays = {'transits': cached['transits']}
+    for x, j in zip(cols, keep):
+        if j in (5, 6):
+            # One array of each star's planets.
+            ends = np.cumsum(cached['len' + str(j)])
+            arrays[x] = np.split(cached['c' + str(j)], ends[:-1])
+        else:
+            arrays[x] = cached['c' + str(j)]
+    return arrays
+
+
+def generate_pop(n=100, cut=0.95, ar=[20], freq=1, vsini_e=0.1, period_e=0.05,
+                 radius_e=0.1, top20=1, md=0, n_pl=1, save=1, seed=None,
+                 cache=0, cols=None, ledger=None):
+    """A function that will generate a population of n stars with the
+    specified parameters.
+
+    Parameters
+    ----------
+    *n : number
+        The number of stars in the population (100 by default)
+    *cut : number
+        The sini cut for this population (0.95 by default)
+    *ar : list
+        Semimajor axis / stellar radius ([20] by default)
+    *freq : number
+        A fraction representing the intrinsic frequency of stars having an
+        orbiting exoplanet (1.0 = 100% by default)
+    *vsini_e : number
+        Rate of error on the vsini values (0.1 by default, from literature)
+    *period_e : number
+        The error rate assumed for the rotational period (0.05 by default,
+        averaged from literature)
+    *radius_e : number
+        The error rate assumed for the radii (10% by default)
+    *top20 : 0 or 1
+        Optional keyword that indicates whether or not to bias to the top 20%
+        (for bias.bias())
+    *md : 0 or 1
+        A kwarg to indicate whether or not to use M-dwarf parameters
+    *n_pl : number
+        The number of planets to be generated per star
+    *save : 0 or 1
+        Writes 'gen_pop.txt' and 'all_data.txt' when set to 1 (default)
+    *seed : number, SeedSequence or numpy.random.Generator
+        Seed (or generator) for every random draw, so the population can be
+        drawn again (None by default)
+    *cache : 0 or 1
+        Looks the population up in POP_CACHE.py's on-disk cache (and stores
+        it there after generating it) when set to 1; needs a number as seed
+    *cols : list
+        The columns (from COLUMNS) to keep in the rows, e.g. ['sini_m',
+        'sini_u'] for a run that only scores the population; the values no
+        kept column needs are not calculated. All of them by default. Only
+        whole populations are stored in the cache.
+    *ledger : dictionary
+        A MEM_LEDGER.py ledger to account the memory of each stage to (see
+        build_pop(); then 'cache', 'bias', 'flags' and 'output')
+
+    Returns
+    -------
+    all_data : list
+        A list of the generated data (one row per star with the columns of
+        cols, in COLUMNS order)
+    transits : list
+        A list of the indices of dwarfs with transiting planets
+
+    Example
+    -------
+    >>> all_data, transits = generate_pop(cols=['sini_m', 'sini_u'], save=0,
+    ...                                   seed=1)
+    Taking top 20%
+    >>> all_data[0]
+    [1.1662007993266978, 0.16710496302040564]
+    """
+    params = {'n': n, 'ar': ar, 'freq': freq, 'vsini_e': vsini_e,
+              'period_e': period_e, 'radius_e': radius_e, 'md': md,
+              'n_pl': n_pl}
+    cols = pick_columns(cols)
+    # The bias always needs the measured sinis and their uncertainties.
+    built = pick_columns((set(cols) - {'chosen', 'spotted'}) |
+                         {'sini_m', 'sini_u'})
+    cached = None
+    cache = cache == 1 and isinstance(seed, (int, np.integer))
+    if cache:
+        pkey = pop_key(params, int(seed))
+        keep = [COLUMNS.index(x) for x in built]
+        # Only the columns kept are read and made into rows.
+        cached = load_pop(pkey, names=_cache_names(keep))
+    if cached is not None:
+        mem_ledger.stage(ledger, 'cache')
+        all_data, transits = unpack_pop(cached, keep)
+    else:
+        all_data, transits = build_pop(rng=np.random.default_rng(seed),
+                                       cols=built, ledger=ledger, **params)
+        if cache and built == COLUMNS[:14]:
+            save_pop(pkey, pack_pop(all_data, transits))
+
+    mem_ledger.stage(ledger, 'bias')
+    js, ju = built.index('sini_m'), built.index('sini_u')
+    m_sinis = [all_data[x][js] for x in range(n)]
+    m_sinius = [all_data[x][ju] for x in range(n)]
     bias1 = bias(sini=m_sinis, sini_u=m_sinius,
                  cut=cut, transits=transits, top20=top20)
+    mem_ledger.stage(ledger, 'flags')
+    chosen = set(bias1[0])
+    spotted = set(bias1[1])
     for i in range(n):
-        if i in bias1[0]:            # If index is in the top 20 selected:
-            all_data[i] += [1]
-        else:
-            all_data[i] += [0]
-        if i in bias1[1]:            # If a transit can be spotted:
-            all_data[i] += [1]
-        else:
-            all_data[i] += [0]
+        if 'chosen' in cols:
+            if i in chosen:          # If index is in the top 20 selected:
+                all_data[i] += [1]
+            else:
+                all_data[i] += [0]
+        if 'spotted' in cols:
+            if i in spotted:         # If a transit can be spotted:
+                all_data[i] += [1]
+            else:
+                all_data[i] += [0]
+    have = built + tuple(x for x in ('chosen', 'spotted') if x in cols)
+    if cols != have:
+        # Drop the sinis the bias needed but the caller did not ask for.
+        keep = [have.index(x) for x in cols]
+        all_data = [[row[j] for j in keep] for row in all_data]
 
 #    star_catalog = {'00KEY': key}
 #    for i in range(len(all_data)):
 #        star_catalog = add_entry(star_catalog, i, all_data[i])
 
-    date = 'Generated on: ' + str(datetime.datetime.now()) + '\n'
+    if save == 1:
+        mem_ledger.stage(ledger, 'output')
+        date = 'Generated on: ' + str(datetime.datetime.now()) + '\n'
 
-    file = open('gen_pop.txt', 'w')
-    file.write(date)
-    for i in range(n):
-        file.write('{:06.4f}   {:06.4f} \n'.format(float(m_sinis[i]),
-                                                   float(m_sinius[i])))
-    file.write(str(transits))
-    file.close()
+        file = open('gen_pop.txt', 'w')
+        file.write(date)
+        for i in range(n):
+            file.write('{:06.4f}   {:06.4f} \n'.format(float(m_sinis[i]),
+                                                       float(m_sinius[i])))
+        file.write(str(transits))
+        file.close()
 
-    g = open('all_data.txt', 'w')
-    g.write(date + str(all_data) + ',' + str(transits))
-    g.close()
+        g = open('all_data.txt', 'w')
+        g.write(date + str(all_data) + ',' + str(transits))
+        g.close()
 
-    return
+    return all_data, transits
 
 #    f = open('generated_data.txt', 'w')
 #    gen_data = [key] + [all_data]
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:03:27 2026
+
+@author: Madeleine
+
+RESULTS_DB.py
+
+ A local SQLite database of per-trial results, so later analyses can query
+ stored hit-rate curves instead of rerunning simulations or reading plot
+ file names. Each row is one trial: the parameters it was generated with,
+ its seed, its hit-rate curve (and the cuts it was evaluated at), its ideal
+ sini cut and eval_cut2()'s 'maxtr' counts. Curves are stored as raw
+ float64 bytes.
+
+     * open_store(path= ) opens (and if needed creates) a database
+     * trial_row(params, trial, cuts, ratios, ideal, maxtr, seed= , run= )
+         builds one row
+     * add_trials(conn, rows) inserts many rows in one transaction
+     * get_trials(conn, **params) returns the rows matching the parameters
+     * get_curves(conn, **params) returns their curves as one array
+
+Modification history:
+ 10/19/26 - created
+"""
+
+import datetime
+import json
+import sqlite3
+
+import numpy as np
+
+STORE = 'results.db'
+PARAMS = ('run', 'pop', 'ar', 'md', 'n_pl', 'top20', 'numcuts', 'vsini_e',
+          'period_e', 'radius_e')
+FIELDS = PARAMS + ('trial', 'seed', 'ideal', 'peak', 'maxtr', 'nobs',
+                   'cuts', 'curve')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    id INTEGER PRIMARY KEY,
+    run TEXT, pop INTEGER, ar TEXT, md INTEGER, n_pl INTEGER,
+    top20 INTEGER, numcuts INTEGER, vsini_e REAL, period_e REAL,
+    radius_e REAL, trial INTEGER, seed TEXT, ideal REAL, peak REAL,
+    maxtr INTEGER, nobs INTEGER, cuts BLOB, curve BLOB);
+CREATE INDEX IF NOT EXISTS trials_params
+    ON trials (pop, ar, md, n_pl, top20, numcuts);
+CREATE INDEX IF NOT EXISTS trials_run ON trials (run, trial);
+"""
+
+
+def open_store(path=STORE):
+    """Opens the results database, creating its table and indices when
+    needed.
+
+    Parameters
+    ----------
+    *path : string
+        The database file ('results.db' by default)
+
+    Returns
+    -------
+    conn : sqlite3.Connection
+        The open database
+    """
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _ar_text(ar):
+    """a/R* lists are stored as JSON text so they can be matched exactly."""
+    if ar is None:
+        return None
+    return json.dumps(np.asarray(ar).tolist())
+
+
+def trial_row(params, trial, cuts, ratios, ideal, maxtr, seed=None,
+              run=None):
+    """Builds the row of one trial.
+
+    Parameters
+    ----------
+    params : dictionary
+        The trial's parameters (any of pop, ar, md, n_pl, top20, numcuts,
+        vsini_e, period_e, radius_e)
+    trial : number
+        The index of the trial in its run
+    cuts : array
+        The sini cuts the trial was evaluated at
+    ratios : array
+        The hit rate at each cut
+    ideal : number
+        The ideal sini cut-off value
+    maxtr : list
+        eval_cut2()'s highest number of transits spotted and the number of
+        objects observed then
+    *seed : number
+        The seed the trial was generated with
+    *run : string
+        A name for the run (the current time by default)
+
+    Returns
+    -------
+    row : dictionary
+        The row, ready for add_trials()
+    """
+    row = dict((x, params.get(x)) for x in PARAMS)
+    row['run'] = run if run is not None else str(datetime.datetime.now())
+    if row['md'] == 1:
+        row['ar'] = None        # Random for each star when md=1.
+    else:
+        row['ar'] = _ar_text(row['ar'])
+    ratios = np.asarray(ratios, dtype=float)
+    row.update({'trial': trial,
+                'seed': None if seed is None else str(seed),
+                'ideal': float(ideal),
+                'peak': float(ratios.max()) if len(ratios) else 0.0,
+                'maxtr': int(maxtr[0]), 'nobs': int(maxtr[1]),
+                'cuts': np.asarray(cuts, dtype=float).tobytes(),
+                'curve': ratios.tobytes()})
+    return row
+
+
+def add_trials(conn, rows):
+    """Inserts many rows in one transaction.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        The open database
+    rows : list
+        Rows from trial_row()
+    """
+    sql = 'INSERT INTO trials ({0}) VALUES ({1})'.format(
+        ', '.join(FIELDS), ', '.join('?' * len(FIELDS)))
+    with conn:
+        conn.executemany(sql, [[row[x] for x in FIELDS] for row in rows])
+
+
+def get_trials(conn, **params):
+    """Returns the rows whose parameters match, in the order they were
+    stored.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        The open database
+    **params
+        Values to match (any of PARAMS, plus 'trial' and 'seed')
+
+    Returns
+    -------
+    rows : list
+        Dictionaries with the stored fields; 'cuts' and 'curve' are arrays
+
+    Example
+    -------
+    >>> rows = get_trials(open_store(), pop=100, ar=[20], top20=0)
+    >>> np.mean([x['ideal'] for x in rows])
+    0.9373737373737374
+    """
+    where = []
+    values = []
+    for name in sorted(params):
+        if name not in PARAMS + ('trial', 'seed'):
+            raise ValueError('unknown parameter: {0}'.format(name))
+        value = params[name]
+        if name == 'ar':
+            value = _ar_text(value)
+        elif name == 'seed' and value is not None:
+            value = str(value)
+        if value is None:
+            where += [name + ' IS NULL']
+        else:
+            where += [name + ' = ?']
+            values += [value]
+    sql = 'SELECT {0} FROM trials'.format(', '.join(FIELDS))
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY id'
+    rows = []
+    for res in conn.execute(sql, values):
+        row = dict(zip(FIELDS, res))
+        row['cuts'] = np.frombuffer(row['cuts'], dtype=float)
+        row['curve'] = np.frombuffer(row['curve'], dtype=float)
+        if row['ar'] is not None:
+            row['ar'] = json.loads(row['ar'])
+        rows += [row]
+    return rows
+
+
+def get_curves(conn, **params):
+    """Returns the hit-rate curves of the matching trials as one array; the
+    trials must share their cuts.
+
+    Returns
+    -------
+    cuts : array
+        The sini cuts
+    curves : array
+        The hit rates, shape (trials, cuts)
+    """
+    rows = get_trials(conn, **params)
+    if not rows:
+        return np.array([]), np.zeros((0, 0))
+    return rows[0]['cuts'], np.array([x['curve'] for x in rows])
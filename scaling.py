@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 22:41:09 2026
+
+@author: Madeleine
+
+SCALING.py
+
+ End-to-end scaling benchmark of the SINI_CURVES.py workflow: every trial
+ generates a population, scores it at every sini cut, and the trials are
+ combined in order with sini_curves.tally(), as plot() does (without the
+ figures). The trials are dealt out to a pool of worker processes the way
+ SHARD_RUNS.py deals them to shards, with the same per-trial seeds, so
+ every run gives the same averaged curve. Three tables are made:
+
+     size    one worker, growing populations: time, stars/sec and memory
+             per population size
+     weak    the population grows with the number of workers (pop x
+             workers stars per trial), so the work per worker stays the
+             same; efficiency = T(1) / T(workers)
+     strong  the same trials spread over more workers; speed-up =
+             T(1) / T(workers) and efficiency = speed-up / workers
+
+ Every run starts a fresh pool, even with one worker, so the times include
+ starting the workers (a campaign pays for that too) and each run's memory
+ is measured on its own: the peak resident memory of the largest worker
+ and the sum over all workers (METRICS.py's peak_rss()), which is what a
+ node has to hold.
+
+     * run_point(pop, trials, workers, ...) times one run of the workflow
+     * benchmark(sizes= , workers= , trials= , ...) runs all three tables
+     * report(bench) lays them out as text
+     * run_benchmark(..., fname= ) runs and writes the report
+
+Modification history:
+ 10/19/26 - created
+"""
+
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from sini_cut import gen_cuts, hit_curve
+from mdwarfs import choose_planets
+from vec_pop import gen_pop_arrays
+from sini_curves import trial_seed, run_trial, tally
+from metrics import peak_rss
+
+REPORT = 'scaling.txt'
+SIZES = [100, 1000, 10**4, 10**5]
+WORKERS = [1, 2, 4, 8]
+
+
+def _trials(job):
+    """Runs one worker's share of the trials."""
+    indices, pop, ar, numcuts, md, n_pl, top20, engine, seed = job
+    cuts = gen_cuts(numcuts)
+    curves = np.zeros((len(indices), len(cuts)))
+    maxtr = np.zeros((len(indices), 2), dtype=int)
+    for i, x in enumerate(indices):
+        if engine == 'scalar':
+            evals = run_trial(cuts, pop, ar, top20, md, n_pl,
+                              seed=trial_seed(seed, x), save=0)
+        else:
+            p = gen_pop_arrays(n=pop, ar=ar, top20=top20, md=md, n_pl=n_pl,
+                               seed=trial_seed(seed, x))
+            evals = hit_curve(cuts, p['sini_m'], p['sini_u'],
+                              np.flatnonzero(p['transit']), top20=top20)
+        curves[i] = evals[0]
+        maxtr[i] = evals[2]
+    return indices, curves, maxtr, peak_rss()
+
+
+def run_point(pop, trials, workers=1, ar=[20], numcuts=100, md=0, n_pl=1,
+              top20=0, engine='numpy', seed=1):
+    """Times one run of the whole workflow.
+
+    Parameters
+    ----------
+    pop : number
+        The size of each population
+    trials : number
+        The number of trials
+    *workers : number
+        The number of worker processes
+    *ar, numcuts, md, n_pl, top20 :
+        The same as for sini_curves.plot()
+    *engine : 'numpy' or 'scalar'
+        gen_pop_arrays() + hit_curve() (default) or plot()'s own
+        run_trial()
+    *seed : number
+        Seed of the run
+
+    Returns
+    -------
+    point : dictionary
+        'pop', 'trials', 'workers', 'time' (seconds), 'stars_per_sec',
+        'worker_rss' (peak bytes of the largest worker), 'total_rss' (summed
+        over the workers) and 'stats' (tally()'s averages)
+    """
+    if md == 1:
+        ar = choose_planets(pop, np.random.default_rng(trial_seed(seed)))
+    start = time.perf_counter()
+    jobs = [(list(range(w, trials, workers)), pop, ar, numcuts, md, n_pl,
+             top20, engine, seed) for w in range(workers)]
+    with Pool(workers) as pool:
+        parts = pool.map(_trials, jobs)
+    curves = np.zeros((trials, numcuts))
+    maxtr = np.zeros((trials, 2), dtype=int)
+    for indices, c, m, rss in parts:
+        curves[indices] = c
+        maxtr[indices] = m
+    stats = {'trials': 0}
+    cuts = gen_cuts(numcuts).tolist()
+    for x in range(trials):
+        tally(stats, cuts, curves[x].tolist(), maxtr[x].tolist())
+    elapsed = time.perf_counter() - start
+    rss = [x[3] for x in parts if x[3] is not None]
+    return {'pop': pop, 'trials': trials, 'workers': workers,
+            'time': elapsed, 'stars_per_sec': pop * trials / elapsed,
+            'worker_rss': max(rss) if rss else None,
+            'total_rss': sum(rss) if rss else None, 'stats': stats}
+
+
+def benchmark(sizes=SIZES, workers=WORKERS, trials=16, pop=10**4,
+              **kwargs):
+    """Runs the size, weak and strong scaling tables.
+
+    Parameters
+    ----------
+    *sizes : list
+        The population sizes of the size table
+    *workers : list
+        The worker counts of the weak and strong tables
+    *trials : number
+        The number of trials of every run
+    *pop : number
+        The population size of the strong table (and of one worker in the
+        weak table)
+    **kwargs
+        Passed on to run_point()
+
+    Returns
+    -------
+    bench : dictionary
+        'size', 'weak' and 'strong' lists of run_point() results, plus
+        'cpus' (the cores available)
+    """
+    bench = {'cpus': os.cpu_count(), 'settings': dict(kwargs)}
+    bench['settings'].update({'trials': trials, 'pop': pop})
+    bench['size'] = [run_point(n, trials, 1, **kwargs) for n in sizes]
+    bench['weak'] = [run_point(pop * w, trials, w, **kwargs) for w in workers]
+    bench['strong'] = [run_point(pop, trials, w, **kwargs) for w in workers]
+    return bench
+
+
+def _mb(x):
+    return float('nan') if x is None else x / 2.0**20
+
+
+def report(bench):
+    """Lays the results of benchmark() out as text tables.
+
+    Returns
+    -------
+    text : string
+    """
+    lines = ['End-to-end scaling of the sini_curves workflow',
+             'cores available: {0}'.format(bench['cpus']),
+             'settings: {0}'.format(bench['settings']), '',
+             'SIZE (1 worker)',
+             '{0:>10s} {1:>7s} {2:>9s} {3:>12s} {4:>10s}'.format(
+                 'pop', 'trials', 'time s', 'stars/sec', 'RSS MB')]
+    for p in bench['size']:
+        lines += ['{0:10d} {1:7d} {2:9.3f} {3:12.0f} {4:10.1f}'.format(
+            p['pop'], p['trials'], p['time'], p['stars_per_sec'],
+            _mb(p['worker_rss']))]
+
+    head = '{0:>8s} {1:>10s} {2:>9s} {3:>12s} {4:>9s} {5:>10s} {6:>10s}'
+    row = '{0:8d} {1:10d} {2:9.3f} {3:12.0f} {4:9.2f} {5:10.1f} {6:10.1f}'
+    for name, title in (('weak', 'WEAK (pop grows with workers)'),
+                        ('strong', 'STRONG (same work, more workers)')):
+        first = bench[name][0]
+        lines += ['', title, head.format(
+            'workers', 'pop', 'time s', 'stars/sec', 'effic.', 'worker MB',
+            'total MB')]
+        for p in bench[name]:
+            # Against the first (smallest) worker count.
+            if name == 'weak':
+                eff = first['time'] / p['time']
+            else:
+                eff = ((first['time'] * first['workers']) /
+                       (p['time'] * p['workers']))
+            lines += [row.format(p['workers'], p['pop'], p['time'],
+                                 p['stars_per_sec'], eff,
+                                 _mb(p['worker_rss']), _mb(p['total_rss']))]
+    return '\n'.join(lines) + '\n'
+
+
+def run_benchmark(sizes=SIZES, workers=WORKERS, trials=16, pop=10**4,
+                  fname=REPORT, **kwargs):
+    """Runs benchmark() and writes its report.
+
+    Parameters
+    ----------
+    *sizes, workers, trials, pop, **kwargs :
+        As for benchmark()
+    *fname : string
+        The report file (None to only return it)
+
+    Returns
+    -------
+    text : string
+        The report
+
+    Example
+    -------
+    >>> print(run_benchmark(workers=[1, 2, 4, 8, 16], fname=None))
+    """
+    text = report(benchmark(sizes, workers, trials, pop, **kwargs))
+    if fname is not None:
+        with open(fname, 'w') as file:
+            file.write(text)
+    return text
+
+
+if __name__ == '__main__':
+    print(run_benchmark())
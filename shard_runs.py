@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:20:36 2026
+
+@author: Madeleine
+
+SHARD_RUNS.py
+
+ Splits one SINI_CURVES.py study over several machines (or processes). Each
+ shard runs every count-th trial of the study, starting at its own index,
+ with the same per-trial seeds plot() uses (sini_curves.trial_seed()), and
+ writes its hit-rate curves and transit counts to a small .npz accumulator
+ file. Merging the shard files replays the trials in order through
+ sini_curves.tally(), so the averaged curve, ideal cut and statistics are
+ the same as those of plot(seed=master) on one machine. Shards only share
+ files, so they can run anywhere that can see a common folder.
+
+     * run_shard(master, index, count, n= , pop= , ar= , ...) runs one
+         shard's trials and writes its file
+     * merge_shards(fnames) checks and combines the shard files
+
+ From the command line:
+     python shard_runs.py run MASTER INDEX COUNT [--n= --pop= --ar= ...]
+     python shard_runs.py merge FILE [FILE ...]
+
+Modification history:
+ 10/19/26 - created
+ 10/19/26 - a shard stores ar as floats, so shards run from the command
+             line and from Python match
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from sini_cut import gen_cuts
+from mdwarfs import choose_planets
+from sini_curves import trial_seed, run_trial, tally
+
+SHARD_DIR = 'shards'
+
+
+def shard_name(master, index, count, path=SHARD_DIR):
+    return os.path.join(path, 'shard_{0}_{1:03d}of{2:03d}.npz'.format(
+        master, index, count))
+
+
+def run_shard(master, index, count, n=100, pop=100, ar=[20], numcuts=100,
+              md=0, n_pl=1, top20=0, path=SHARD_DIR):
+    """Runs the trials of one shard (index, index+count, index+2*count, ...)
+    and writes them to a shard file.
+
+    Parameters
+    ----------
+    master : number
+        The seed of the whole study
+    index : number
+        The index of this shard (0 to count-1)
+    count : number
+        The number of shards
+    *n, pop, ar, numcuts, md, n_pl, top20 :
+        The same as for sini_curves.plot()
+    *path : string
+        The folder for the shard files
+
+    Returns
+    -------
+    fname : string
+        The shard file
+    """
+    if not 0 <= index < count:
+        raise ValueError('shard index must be between 0 and count-1')
+    cuts = gen_cuts(numcuts)
+    if md == 1:
+        # The same planets in every shard.
+        ar = choose_planets(pop, np.random.default_rng(trial_seed(master)))
+    trials = list(range(index, n, count))
+    curves = np.zeros((len(trials), len(cuts)))
+    maxtr = np.zeros((len(trials), 2), dtype=int)
+    for i, x in enumerate(trials):
+        evals = run_trial(cuts, pop, ar, top20, md, n_pl,
+                          seed=trial_seed(master, x), save=0)
+        curves[i] = evals[0]
+        maxtr[i] = evals[2]
+
+    params = {'master': master, 'count': count, 'n': n, 'pop': pop,
+              'ar': None if md == 1 else [float(x) for x in ar],
+              'numcuts': numcuts, 'md': md, 'n_pl': n_pl, 'top20': top20}
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    fname = shard_name(master, index, count, path)
+    tmp = fname + '.{0}.tmp'.format(os.getpid())
+    with open(tmp, 'wb') as file:
+        np.savez(file, params=json.dumps(params, sort_keys=True),
+                 trials=np.array(trials, dtype=int), cuts=cuts,
+                 curves=curves, maxtr=maxtr)
+    os.replace(tmp, fname)      # The merge never sees a half-written file.
+    return fname
+
+
+def merge_shards(fnames):
+    """Combines shard files into the results of the whole study.
+
+    Parameters
+    ----------
+    fnames : list
+        The shard files (every shard of one study, in any order)
+
+    Returns
+    -------
+    stats : dictionary
+        sini_curves.tally()'s running averages after the last trial, plus
+        'cuts', 'curves' (every trial's hit rates, in trial order), 'maxtr'
+        and 'params'
+    """
+    params = None
+    trials, curves, maxtr = [], [], []
+    for fname in fnames:
+        with np.load(fname) as data:
+            if params is None:
+                params = str(data['params'])
+                cuts = data['cuts']
+            elif str(data['params']) != params:
+                raise ValueError(fname + ' is from a different study')
+            trials += [data['trials']]
+            curves += [data['curves']]
+            maxtr += [data['maxtr']]
+    if params is None:
+        raise ValueError('no shard files given')
+    params = json.loads(params)
+
+    trials = np.concatenate(trials)
+    order = np.argsort(trials, kind='stable')
+    trials = trials[order]
+    if not np.array_equal(trials, np.arange(params['n'])):
+        missing = sorted(set(range(params['n'])) - set(trials.tolist()))
+        raise ValueError('shards are missing or repeated; missing trials: '
+                         '{0}'.format(missing[:10]))
+    curves = np.concatenate(curves)[order]
+    maxtr = np.concatenate(maxtr)[order]
+
+    stats = {'trials': 0}
+    cuts_list = cuts.tolist()
+    for x in range(len(trials)):
+        tally(stats, cuts_list, curves[x].tolist(), maxtr[x].tolist())
+    stats.update({'cuts': cuts, 'curves': curves, 'maxtr': maxtr,
+                  'params': params})
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sharded sini_curves runs')
+    sub = parser.add_subparsers(dest='cmd')
+    run = sub.add_parser('run', help='run one shard')
+    run.add_argument('master', type=int)
+    run.add_argument('index', type=int)
+    run.add_argument('count', type=int)
+    run.add_argument('--n', type=int, default=100)
+    run.add_argument('--pop', type=int, default=100)
+    run.add_argument('--ar', type=float, nargs='+', default=[20])
+    run.add_argument('--numcuts', type=int, default=100)
+    run.add_argument('--md', type=int, default=0)
+    run.add_argument('--n_pl', type=int, default=1)
+    run.add_argument('--top20', type=int, default=0)
+    run.add_argument('--path', default=SHARD_DIR)
+    merge = sub.add_parser('merge', help='merge shard files')
+    merge.add_argument('files', nargs='+')
+    args = parser.parse_args()
+
+    if args.cmd == 'run':
+        kwargs = vars(args)
+        del kwargs['cmd']
+        print(run_shard(**kwargs))
+    elif args.cmd == 'merge':
+        stats = merge_shards(args.files)
+        print('{0} trials'.format(stats['trials']))
+        print('ideal sini cut-off: {:1.5f}'.format(stats['avg_ideal']))
+        print('Highest average HR = {:3.1f}% = {:3.1f}/{:3.1f}'.format(
+            stats['high'], stats['avgid'], stats['obs']))
+    else:
+        parser.print_help()
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:48:50 2026
+
+@author: Madeleine
+
+SHARED_POP.py
+
+ Puts the arrays of one generated population (by default the measured sini,
+ its uncertainty and the transit mask from VEC_POP.py) in named shared
+ memory or in a memory-mapped file, so many worker processes can evaluate
+ it against different cut grids, 'top20' settings or bootstrap resamples
+ without each getting a pickled copy. Workers attach to the block and read
+ it in place; only the parent creates and removes it.
+
+     * share_pop(pop, cols= , mode= , path= ) copies the arrays into one
+         shared block and returns it with the spec workers need
+     * attach_pop(spec) maps a shared block as read-only arrays
+     * free_pop(block) closes and removes a shared block
+     * map_pop(func, pop, jobs, cols= , mode= , processes= ) runs
+         func(arrays, job) for every job in a pool of workers attached to
+         one shared copy of the population
+     * cut_job(arrays, job) scores the population at one set of cuts
+     * boot_job(arrays, job) finds the ideal cuts of a batch of bootstrap
+         resamples of the population
+
+Modification history:
+ 10/19/26 - created
+"""
+
+import os
+import tempfile
+from multiprocessing import Pool, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from bias import low_sini
+from sini_cut import _sweep, hit_curve
+
+COLS = ('sini_m', 'sini_u', 'transit')
+ALIGN = 64          # Each array starts on a cache line.
+
+_shared = {}        # The attached arrays of a worker process
+
+
+def _layout(pop, cols):
+    """Works out where each array goes in the block."""
+    spec = []
+    offset = 0
+    for name in cols:
+        arr = np.ascontiguousarray(pop[name])
+        spec += [(name, arr.dtype.str, arr.shape, offset)]
+        offset += -(-arr.nbytes // ALIGN) * ALIGN
+    return spec, max(offset, 1)
+
+
+def share_pop(pop, cols=COLS, mode='shm', path=None):
+    """Copies a population's arrays into one shared block.
+
+    Parameters
+    ----------
+    pop : dictionary
+        A population of arrays, e.g. from vec_pop.gen_pop_arrays()
+    *cols : list
+        The names of the arrays to share
+    *mode : 'shm' or 'mmap'
+        Named shared memory, or a memory-mapped file
+    *path : string
+        The file to use when mode='mmap' (a temporary file by default)
+
+    Returns
+    -------
+    block : SharedMemory or string
+        The shared memory, or the file name; pass it to free_pop()
+    spec : dictionary
+        What attach_pop() needs; small enough to send to every worker
+    """
+    layout, size = _layout(pop, cols)
+    if mode == 'shm':
+        block = SharedMemory(create=True, size=size)
+        spec = {'mode': mode, 'name': block.name, 'layout': layout}
+        buf = block.buf
+    elif mode == 'mmap':
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix='.pop')
+            os.close(fd)
+        block = path
+        spec = {'mode': mode, 'name': path, 'layout': layout}
+        buf = np.memmap(path, dtype=np.uint8, mode='w+', shape=(size,))
+    else:
+        raise ValueError("mode must be 'shm' or 'mmap'")
+    for name, dtype, shape, offset in layout:
+        dest = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+        dest[...] = pop[name]
+    if mode == 'mmap':
+        buf.flush()
+        del buf
+    return block, spec
+
+
+def _attach_shm(name):
+    """Attaches to shared memory without registering it with this process's
+    resource tracker, which would otherwise remove the block when a worker
+    exits."""
+    try:
+        return SharedMemory(name=name, track=False)     # Python >= 3.13
+    except TypeError:
+        pass
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def attach_pop(spec):
+    """Maps a shared block as read-only arrays, without copying them.
+
+    Parameters
+    ----------
+    spec : dictionary
+        The spec from share_pop()
+
+    Returns
+    -------
+    block : SharedMemory or numpy.memmap
+        Keep this referenced for as long as the arrays are used
+    arrays : dictionary
+        The shared arrays (read-only)
+    """
+    if spec['mode'] == 'shm':
+        block = _attach_shm(spec['name'])
+        buf = block.buf
+    else:
+        block = np.memmap(spec['name'], dtype=np.uint8, mode='r')
+        buf = block
+    arrays = {}
+    for name, dtype, shape, offset in spec['layout']:
+        arr = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+        arr.flags.writeable = False
+        arrays[name] = arr
+    return block, arrays
+
+
+def free_pop(block):
+    """Closes and removes a block made by share_pop(); only the parent that
+    made it should call this."""
+    if isinstance(block, SharedMemory):
+        block.close()
+        block.unlink()
+    elif os.path.exists(block):
+        os.remove(block)
+
+
+def _init(spec):
+    _shared['block'], _shared['arrays'] = attach_pop(spec)
+
+
+def _call(task):
+    func, job = task
+    return func(_shared['arrays'], job)
+
+
+def map_pop(func, pop, jobs, cols=COLS, mode='shm', processes=None):
+    """Runs func(arrays, job) for every job in a pool of worker processes
+    that all read one shared copy of the population. The block is removed
+    when the jobs are done (or fail).
+
+    Parameters
+    ----------
+    func : function
+        A module-level function taking (arrays, job), e.g. cut_job()
+    pop : dictionary
+        A population of arrays, e.g. from vec_pop.gen_pop_arrays()
+    jobs : list
+        The jobs to run
+    *cols : list
+        The names of the arrays to share
+    *mode : 'shm' or 'mmap'
+        Named shared memory, or a memory-mapped file
+    *processes : number
+        The number of workers (one per CPU by default)
+
+    Returns
+    -------
+    results : list
+        func's result for each job, in order
+
+    Example
+    -------
+    >>> pop = gen_pop_arrays(n=10**5, ar=[30], top20=0, seed=1)
+    >>> jobs = [{'cuts': gen_cuts(k), 'top20': t} for k in (100, 1000)
+    ...         for t in (0, 1)]
+    >>> [x[1] for x in map_pop(cut_job, pop, jobs)]
+    [0.98989898989899, 0.98989898989899, 0.997997997997998, 0.997997997997998]
+    """
+    block, spec = share_pop(pop, cols, mode)
+    try:
+        with Pool(processes, initializer=_init, initargs=(spec,)) as pool:
+            return pool.map(_call, [(func, job) for job in jobs])
+    finally:
+        free_pop(block)
+
+
+def cut_job(arrays, job):
+    """Scores the shared population at one set of cuts.
+
+    Parameters
+    ----------
+    arrays : dictionary
+        The shared 'sini_m', 'sini_u' and 'transit' arrays
+    job : dictionary
+        'cuts' and (optionally) 'top20'
+
+    Returns
+    -------
+    ratios, ideal, maxtr :
+        As from sini_cut.hit_curve()
+    """
+    return hit_curve(job['cuts'], arrays['sini_m'], arrays['sini_u'],
+                     arrays['transit'], top20=job.get('top20', 0))
+
+
+def boot_job(arrays, job):
+    """Finds the ideal cut and highest hit rate of a batch of bootstrap
+    resamples of the shared population (see boot_cut.py). Give each job its
+    own seed so the batches are independent.
+
+    Parameters
+    ----------
+    arrays : dictionary
+        The shared 'sini_m', 'sini_u' and 'transit' arrays
+    job : dictionary
+        'cuts', 'nboot' (the number of resamples), 'seed' and (optionally)
+        'top20'
+
+    Returns
+    -------
+    ideals : array
+        The ideal cut of every resample
+    peaks : array
+        The highest hit rate of every resample
+    """
+    rng = np.random.default_rng(job['seed'])
+    low = low_sini(arrays['sini_m'], arrays['sini_u'])
+    n = len(low)
+    cuts = np.asarray(job['cuts'], dtype=float)
+    idx = rng.integers(0, n, size=(job['nboot'], n))
+    ratios = _sweep(cuts, low, arrays['transit'], idx=idx,
+                    top20=job.get('top20', 0))[0]
+    best = np.argmax(ratios, axis=1)
+    peaks = ratios[np.arange(len(best)), best]
+    return np.where(peaks > 0, cuts[best], 0.0), peaks
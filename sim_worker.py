@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:42:15 2026
+
+@author: Madeleine
+
+SIM_WORKER.py
+
+ A long-lived worker process that answers simulation and scoring requests
+ over a local socket. The worker imports RANDOM_INCS.py, SINI_CUT.py and
+ MDWARFS.py once, so matplotlib, the M-dwarf planet tables and the sini cut
+ grids stay warm between requests instead of being rebuilt by every new
+ interpreter.
+
+     * serve(address= , authkey= ) runs the worker loop until a 'shutdown'
+         request arrives
+     * start(address= , authkey= ) starts serve() in a background process
+         and waits until it is listening
+     * request(op, conn= , address= , authkey= , **kwargs) sends one request
+         to a running worker and returns its result
+     * handle(op, kwargs) evaluates one request in the current process
+     * key_file(address= ) is where a worker leaves its key
+
+ Requests are (op, kwargs) pairs. The available ops are:
+     'ping'     - returns 'pong'
+     'cuts'     - gen_cuts(num= ), cached by number of cuts
+     'generate' - generate_pop(**kwargs) without writing text files; returns
+                  a dictionary of arrays and keeps the population under an id
+     'score'    - eval_cut2() for a kept population (pop=id) or for arrays
+                  passed in directly (sini= , sini_u= , transits= )
+     'drop'     - forgets a kept population
+     'surface'  - VEC_POP.py's ar_surface() on a cached cut grid
+     'shutdown' - stops the worker
+
+ The worker listens on a Unix socket only its user can open (a local TCP
+ port on Windows) and every run gets a new random key. The connection
+ unpickles what it receives, so the key is what keeps other users from
+ running code in the worker: it is handed to clients in the same process
+ by start(), and to any other process through a key file next to the
+ socket (key_file()) that only the user can read.
+
+Modification history:
+ 10/19/26 - created, added 'surface' request
+ 10/19/26 - random key per run and a private Unix socket instead of a fixed
+             key on a TCP port; malformed requests are answered with an
+             error (and wrong keys refused) instead of stopping the worker;
+             'generate' only asks generate_pop() for the sinis
+"""
+
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from multiprocessing import Process, AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+import numpy as np
+
+from random_incs import generate_pop, spawn_rngs
+from sini_cut import gen_cuts, eval_cut2
+from mdwarfs import choose_planets
+from vec_pop import ar_surface
+
+if sys.platform == 'win32':
+    ADDRESS = ('localhost', 6016)
+else:
+    ADDRESS = os.path.join(tempfile.gettempdir(),
+                           'mdwarfs_worker_{0}.sock'.format(os.getuid()))
+AUTHKEY = None          # A new random key for every worker
+MAX_POPS = 16           # Populations kept in memory before the oldest goes.
+
+_cuts = {}              # sini cut grids, keyed by number of cuts
+_pops = OrderedDict()   # kept populations, keyed by id (oldest first)
+_ids = [0]
+_keys = {}              # keys of the workers started here, by address
+
+
+def get_cuts(num=100):
+    """Returns the sini cut grid with num cuts, building it only once.
+
+    Parameters
+    ----------
+    *num : number
+        The number of cuts desired (100 by default)
+
+    Returns
+    -------
+    cuts : array
+        A cached array from sini_cut.gen_cuts()
+    """
+    if num not in _cuts:
+        _cuts[num] = gen_cuts(num)
+    return _cuts[num]
+
+
+def op_generate(keep=1, **kwargs):
+    """Generates a population in memory with generate_pop().
+
+    Parameters
+    ----------
+    *keep : 0 or 1
+        Keeps the population in the worker for later 'score' requests when
+        set to 1 (default)
+    **kwargs
+        Keywords passed on to random_incs.generate_pop() (except 'cols',
+        which is always the measured sinis); when md=1 and no 'ar' is given,
+        a/R* values are chosen with mdwarfs.choose_planets() from a stream
+        split off the population's seed
+
+    Returns
+    -------
+    pop : dictionary
+        'sini', 'sini_u' and 'transits' arrays, plus the population's 'id'
+        when keep=1
+    """
+    if kwargs.get('md', 0) == 1 and 'ar' not in kwargs:
+        rng = spawn_rngs(kwargs.get('seed'), 1)[0]
+        kwargs['ar'] = choose_planets(kwargs.get('n', 100), rng)
+    kwargs['cols'] = ['sini_m', 'sini_u']
+    all_data, transits = generate_pop(save=0, **kwargs)
+    pop = {'sini': np.array([row[0] for row in all_data]),
+           'sini_u': np.array([row[1] for row in all_data]),
+           'transits': np.array(transits, dtype=int)}
+    if keep == 1:
+        _ids[0] += 1
+        _pops[_ids[0]] = pop
+        while len(_pops) > MAX_POPS:
+            _pops.popitem(last=False)
+        pop = dict(pop, id=_ids[0])
+    return pop
+
+
+def op_score(pop=None, sini=None, sini_u=None, transits=None, cuts=None,
+             numcuts=100, top20=0):
+    """Scores a population against a grid of sini cuts with eval_cut2().
+
+    Parameters
+    ----------
+    *pop : number
+        The id of a population kept by an earlier 'generate' request
+    *sini, sini_u, transits : arrays
+        The population to score when no id is given
+    *cuts : array
+        The sini cuts to use (gen_cuts(numcuts) by default)
+    *numcuts : number
+        The number of cuts in the default grid
+    *top20 : 0 or 1
+        Optional keyword that indicates whether or not to bias to the top 20%
+
+    Returns
+    -------
+    res : dictionary
+        'ratios' (array), 'ideal' (number) and 'maxtr' (array)
+    """
+    if pop is not None:
+        data = _pops[pop]
+        _pops.move_to_end(pop)
+        sini, sini_u, transits = data['sini'], data['sini_u'], \
+            data['transits']
+    if cuts is None:
+        cuts = get_cuts(numcuts)
+    # eval_cut2() works on lists and bias() edits the sinis in place.
+    ratios, ideal, maxtr = eval_cut2(cuts, list(np.asarray(sini, float)),
+                                     list(np.asarray(sini_u, float)),
+                                     [int(x) for x in transits], top20=top20)
+    return {'ratios': np.array(ratios), 'ideal': ideal,
+            'maxtr': np.array(maxtr)}
+
+
+def op_surface(ar, cuts=None, numcuts=100, **kwargs):
+    """Finds the hit rate at every (a/R*, sini cut) pair for one population
+    with vec_pop.ar_surface().
+
+    Returns
+    -------
+    res : dictionary
+        'surface' (a/R* values x cuts) and 'ideal' arrays
+    """
+    if cuts is None:
+        cuts = get_cuts(numcuts)
+    surface, ideal, tr = ar_surface(cuts, ar, **kwargs)
+    return {'surface': surface, 'ideal': ideal}
+
+
+def op_drop(pop):
+    """Forgets a kept population; returns whether it was still there."""
+    return _pops.pop(pop, None) is not None
+
+
+OPS = {'ping': lambda: 'pong',
+       'cuts': get_cuts,
+       'generate': op_generate,
+       'score': op_score,
+       'surface': op_surface,
+       'drop': op_drop}
+
+
+def handle(op, kwargs):
+    """Evaluates one request in the current process.
+
+    Parameters
+    ----------
+    op : string
+        The name of the request (a key of OPS)
+    kwargs : dictionary
+        The keywords of the request
+
+    Returns
+    -------
+    result :
+        Whatever the op returns
+    """
+    if op not in OPS:
+        raise ValueError('unknown request: {0}'.format(op))
+    return OPS[op](**kwargs)
+
+
+def key_file(address=ADDRESS):
+    """The file a worker at address leaves its key in for other processes:
+    next to its socket, or in the home folder for a TCP port."""
+    if isinstance(address, str):
+        return address + '.key'
+    return os.path.join(os.path.expanduser('~'),
+                        '.mdwarfs_worker_{0}.key'.format(address[1]))
+
+
+def _private(fname, data=None):
+    """Removes fname and, given data, writes it again readable only by this
+    user."""
+    if os.path.exists(fname):
+        os.remove(fname)
+    if data is not None:
+        fd = os.open(fname, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+
+
+def serve(address=ADDRESS, authkey=AUTHKEY):
+    """Runs the worker loop. Each connection may send any number of requests;
+    the worker answers them in order with ('ok', result) or ('error', text)
+    and stops after a 'shutdown' request.
+
+    Parameters
+    ----------
+    *address : tuple or string
+        The address to listen on (a private Unix socket by default, a local
+        TCP port on Windows)
+    *authkey : bytes
+        The key clients must present (a new random one by default); it is
+        written to key_file(address) for clients in other processes
+    """
+    if authkey is None:
+        authkey = os.urandom(32)
+    if isinstance(address, str):
+        _private(address)                   # A socket left by a dead worker
+        umask = os.umask(0o177)             # Only this user may connect.
+        try:
+            listener = Listener(address, authkey=authkey)
+        finally:
+            os.umask(umask)
+    else:
+        listener = Listener(address, authkey=authkey)
+    _private(key_file(address), authkey)
+    running = True
+    try:
+        while running:
+            try:
+                conn = listener.accept()
+            except AuthenticationError:     # A client with the wrong key
+                continue
+            with conn:
+                while True:
+                    try:
+                        op, kwargs = conn.recv()
+                    except EOFError:        # The client hung up.
+                        break
+                    except Exception as err:    # Not an (op, kwargs) pair
+                        conn.send(('error', 'bad request: {0}: {1}'.format(
+                            type(err).__name__, err)))
+                        continue
+                    if op == 'shutdown':
+                        conn.send(('ok', None))
+                        running = False
+                        break
+                    try:
+                        conn.send(('ok', handle(op, kwargs)))
+                    except Exception as err:
+                        conn.send(('error', '{0}: {1}'.format(
+                            type(err).__name__, err)))
+    finally:
+        listener.close()
+        _private(key_file(address))
+
+
+def start(address=ADDRESS, authkey=AUTHKEY, timeout=30.0):
+    """Starts serve() in a background process and waits until it answers.
+    The key (a new random one by default) is remembered, so connect() and
+    request() in this process need not be given it.
+
+    Returns
+    -------
+    proc : multiprocessing.Process
+        The worker process
+    """
+    if authkey is None:
+        authkey = os.urandom(32)
+    _keys[address] = authkey
+    proc = Process(target=serve, args=(address, authkey), daemon=True)
+    proc.start()
+    stop = time.time() + timeout
+    while True:
+        try:
+            Client(address, authkey=authkey).close()
+            return proc
+        except (ConnectionRefusedError, FileNotFoundError):
+            if time.time() > stop or not proc.is_alive():
+                raise RuntimeError('worker did not start at {0}'.format(
+                    address))
+            time.sleep(0.05)
+
+
+def connect(address=ADDRESS, authkey=AUTHKEY):
+    """Opens a connection that can be reused for many requests. Without an
+    authkey, uses the key of a worker started by this process or the one in
+    key_file(address)."""
+    if authkey is None:
+        authkey = _keys.get(address)
+    if authkey is None:
+        with open(key_file(address), 'rb') as file:
+            authkey = file.read()
+    return Client(address, authkey=authkey)
+
+
+def request(op, conn=None, address=ADDRESS, authkey=AUTHKEY, **kwargs):
+    """Sends one request to a running worker.
+
+    Parameters
+    ----------
+    op : string
+        The name of the request
+    *conn : Connection
+        An open connection from connect(); a new one is opened (and closed)
+        when not given
+    **kwargs
+        The keywords of the request
+
+    Returns
+    -------
+    result :
+        The worker's answer
+
+    Examples
+    --------
+    >>> pop = request('generate', n=500, ar=[30], top20=0)
+    >>> request('score', pop=pop['id'], numcuts=200)['ideal']
+    0.8944723618090452
+    """
+    close = conn is None
+    if close:
+        conn = connect(address, authkey)
+    try:
+        conn.send((op, kwargs))
+        status, result = conn.recv()
+    finally:
+        if close:
+            conn.close()
+    if status == 'error':
+        raise RuntimeError(result)
+    return result
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        serve(('localhost', int(sys.argv[1])))
+    else:
+        serve()
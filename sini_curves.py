@@ -20,18 +20,222 @@ Mod history:
  12/8/16  - import from MDWARFS.py, added a/R* generator in plot() for md=1
  12/9/16  - changed exoplanet generator for md=1, changed title for M-dwarf
              plots
+ 10/19/26 - added 'store' kwarg to plot() to keep every trial's results in
+             RESULTS_DB.py's database
+ 10/19/26 - moved each trial into run_trial() and the running averages into
+             tally() so SHARD_RUNS.py can reproduce them, added 'seed' kwarg
+ 10/19/26 - M-dwarf planets are drawn with choose_planets() from the run's
+             own generator
+ 10/19/26 - added 'metrics' and 'progress' kwargs to plot() for METRICS.py's
+             throughput reports
+ 10/19/26 - split draw_trial() out of run_trial(), added 'batch' kwarg to
+             plot() to score every trial at once with eval_cut_batch()
+ 10/19/26 - draw_trial() only asks generate_pop() for the sinis when it
+             does not save
+ 10/19/26 - moved the figure into draw_curve() and curve_path() so
+             PIPELINE.py can render it off the main thread
 """
 
-import ast
+import datetime
 import os
 import numpy as np
 
 from random_incs import *
 from sini_cut import *
 from mdwarfs import *
+from results_db import open_store, trial_row, add_trials
+from metrics import new_meter, tick, finish
 
 
-def plot(n=100, pop=100, ar=[20], numcuts=100, md=0, n_pl=1, top20=0):
+def trial_seed(seed, x=None):
+    """Derives the seed of trial x of a run from the run's seed, so any
+    trial can be drawn again on its own (and on any machine). Without x,
+    gives the seed used to draw the M-dwarf planets of the run.
+
+    Parameters
+    ----------
+    seed : number
+        The seed of the whole run (None for unseeded trials)
+    *x : number
+        The index of the trial
+
+    Returns
+    -------
+    seed : number or None
+        A 32-bit seed for generate_pop()
+    """
+    if seed is None:
+        return None
+    if x is None:
+        ss = np.random.SeedSequence(seed)
+    else:
+        ss = np.random.SeedSequence(seed, spawn_key=(x,))
+    return int(ss.generate_state(1)[0])
+
+
+def draw_trial(pop, ar, top20, md, n_pl, seed=None, save=1):
+    """Generates the population of one trial of plot(). The sini values are
+    rounded as they are in 'gen_pop.txt', so the results do not depend on
+    whether it is written.
+
+    Parameters
+    ----------
+    pop, ar, top20, md, n_pl :
+        The same as for plot()
+    *seed : number
+        Seed for generate_pop()
+    *save : 0 or 1
+        Writes 'gen_pop.txt' and 'all_data.txt' when set to 1 (default);
+        parallel runs in one folder should use 0
+
+    Returns
+    -------
+    sini_list : list
+        The measured sinis
+    siniu_list : list
+        Their uncertainties
+    transits : list
+        The indices of the stars with a transiting planet
+    """
+    # Only the sinis are needed, unless 'all_data.txt' is written.
+    cols = None if save == 1 else ['sini_m', 'sini_u']
+    j = 12 if save == 1 else 0
+    all_data, transits = generate_pop(n=pop, ar=ar, top20=top20, md=md,
+                                      n_pl=n_pl, save=save, seed=seed,
+                                      cols=cols)
+    sini_list = [float('{:06.4f}'.format(float(row[j]))) for row in all_data]
+    siniu_list = [float('{:06.4f}'.format(float(row[j+1])))
+                  for row in all_data]
+    return sini_list, siniu_list, transits
+
+
+def run_trial(cuts, pop, ar, top20, md, n_pl, seed=None, save=1):
+    """Generates one population and finds its hit rate at every cut, as each
+    trial of plot() does.
+
+    Parameters
+    ----------
+    cuts : list
+        A list of possible sini cuts
+    pop, ar, top20, md, n_pl, seed, save :
+        The same as for draw_trial()
+
+    Returns
+    -------
+    evals : tuple
+        The result of eval_cut2(): the hit rates, the ideal cut and 'maxtr'
+    """
+    sini_list, siniu_list, transits = draw_trial(pop, ar, top20, md, n_pl,
+                                                 seed, save)
+    return eval_cut2(cuts, sini_list, siniu_list, transits, top20=top20)
+
+
+def tally(stats, cuts, ratios, maxtr):
+    """Adds one trial to the running averages reported by plot().
+
+    Parameters
+    ----------
+    stats : dictionary
+        The running averages; start with {'trials': 0}
+    cuts : list
+        A list of possible sini cuts
+    ratios : list
+        The trial's hit rates
+    maxtr : list
+        The trial's highest number of transits spotted and the number of
+        objects observed then
+
+    Returns
+    -------
+    stats : dictionary
+        The same dictionary, updated: 'avg_hr' (the average hit rates),
+        'ideal' (the ideal cut of the average after each trial),
+        'avg_ideal' (their mean), 'maxavgs', 'avgid' (the average number of
+        transits at the ideal cut), 'high' (the highest average hit rate in
+        percent) and 'obs' (the number of stars observed at the ideal cut)
+    """
+    x = stats['trials']
+    if x == 0:
+        stats.update({'total': list(ratios), 'ideal': [], 'maxavgs': []})
+    else:
+        stats['total'] = [a + b for a, b in zip(stats['total'], ratios)]
+    stats['trials'] = x + 1
+    avg_hr = [e/(x+1) for e in stats['total']]
+    index = avg_hr.index(max(avg_hr))
+    stats['ideal'] += [cuts[index]]
+    stats['maxavgs'] += [maxtr[0]]
+    avgid = np.mean(stats['maxavgs'])
+    stats.update({'avg_hr': avg_hr,
+                  'avg_ideal': np.mean(stats['ideal']),
+                  'avgid': avgid,
+                  'high': 100 * max(avg_hr),
+                  'obs': avgid/max(avg_hr)})
+    return stats
+
+
+def draw_curve(ax, cuts, stats, pop, ar, md, n_pl):
+    """Draws the average hit rate curve of the trials so far, as plot()
+    saves it after each trial.
+
+    Parameters
+    ----------
+    ax : matplotlib Axes
+        The axes to draw on (plot() uses pyplot's, PIPELINE.py one of its
+        own figures)
+    cuts : list
+        A list of possible sini cuts
+    stats : dictionary
+        tally()'s running averages
+    pop, ar, md, n_pl :
+        The same as for plot()
+    """
+    avg_hr = stats['avg_hr']
+    avg_ideal = stats['avg_ideal']
+    avgid = stats['avgid']
+    trials = stats['trials']
+    frac = 'Highest average HR = {:3.1f}% = {:3.1f}/{:3.1f}'.format(
+        stats['high'], avgid, stats['obs'])
+
+    ax.plot(cuts, avg_hr)
+    if md == 1:
+        s_type = 'M-Dwarfs'
+        title = 'Hit Rate v. sin(i) Cut-Off for a population of {0} {1}\n\
+Average of {2} trials'.format(pop, s_type, trials)
+    else:
+        s_type = 'Ultracool Dwarfs'
+        title = 'Hit Rate v. sin(i) Cut-Off for a population of {0} {1}\n\
+{2} planet(s) per star, a/R* = {3}, Average of {4} trials'.format(pop, s_type,
+                                                                  n_pl, ar,
+                                                                  trials)
+    ax.set_title(title)
+    ax.set_xlabel('sini cut-off')
+    ax.set_xticks(np.arange(0, 1.1, 0.1))
+    ax.set_ylabel('Hit Rate\n [# transits seen : # stars observed]')
+    if max(avg_hr) < 0.40:
+        ax.set_ylim(0, 0.40)
+    else:
+        ax.set_ylim(0, (max(avg_hr)+0.1))
+    label = 'ideal sini cut-off: {:1.5f} \n'.format(avg_ideal)
+    label += frac
+    ax.text(.5, .9,
+            label,
+            horizontalalignment='center',
+            transform=ax.transAxes)
+
+
+def curve_path(md, x):
+    """The file plot() saves the average of the first x+1 trials to."""
+    cwd = os.getcwd()
+    if md == 0:
+        path = cwd + '\\sini_curves'
+    if md == 1:
+        path = cwd + '\\mdwarf_curves'
+    name = 'avg' + str(x+1) + '.png'
+    return os.path.join(path, name)
+
+
+def plot(n=100, pop=100, ar=[20], numcuts=100, md=0, n_pl=1, top20=0,
+         store=None, seed=None, metrics=None, progress=None, batch=0):
     """This function produces n-number of plots of Hit Rate v. Sini Cut-off
     to show how the probability of finding a transiting exoplanet changes
     with a varying sini cut-off. The plots are saved to a folder.
@@ -54,91 +258,65 @@ def plot(n=100, pop=100, ar=[20], numcuts=100, md=0, n_pl=1, top20=0):
     *top20 : 0 or 1
         Optional keyword that indicates whether or not to bias to the top 20%
         (for bias.bias())
+    *store : string
+        A results database (see RESULTS_DB.py) to record every trial's curve,
+        ideal cut and transit counts in
+    *seed : number
+        Seed of the whole run; each trial is drawn with trial_seed(seed, x)
+        (None by default)
+    *metrics : string
+        A file to keep METRICS.py's throughput and progress metrics in
+    *progress : function
+        Called with the same metrics every few seconds
+    *batch : 0 or 1
+        Draws every trial's population first and scores them all at once
+        with eval_cut_batch() when set to 1; the results are the same
 
     Returns
     -------
     None
     """
-    hitrates = []
-    ideal = []
-    maxavgs = []
+    stats = {'trials': 0}
     cuts = gen_cuts(numcuts)
+    meter = new_meter(n, metrics, progress)
     if md == 1:
-        ar = [choose_planet() for star in range(pop)]
+        ar = choose_planets(pop, np.random.default_rng(trial_seed(seed)))
         # ar ^^^ will be a list of lists of a/R*s (len(ar) == pop)
+    if store is not None:
+        conn = open_store(store)
+        run = str(datetime.datetime.now())
+        params = {'pop': pop, 'ar': ar, 'md': md, 'n_pl': n_pl,
+                  'top20': top20, 'numcuts': numcuts}
+        rows = []
+    if batch == 1:
+        drawn = [draw_trial(pop, ar, top20, md, n_pl, seed=trial_seed(seed, x))
+                 for x in range(n)]
+        scored = eval_cut_batch(cuts, [d[0] for d in drawn],
+                                [d[1] for d in drawn], [d[2] for d in drawn],
+                                top20=top20)
     for x in range(n):
-        generate_pop(n=pop, ar=ar, top20=top20, md=md, n_pl=n_pl)
-
-        # Read data from text document and then evaluate
-        data = []
-        sini_list = []
-        siniu_list = []
-        with open('gen_pop.txt') as file:
-            for line in file:
-                data.append(line.strip('\n'))
-        transits = ast.literal_eval(data[-1])
-        data = data[1:-1]
-        for i in range(len(data)):
-            elem = data[i].split('   ')
-            sini = float(elem[0])
-            siniu = float(elem[1].strip())
-            sini_list += [sini]
-            siniu_list += [siniu]
-
-        evals = eval_cut2(cuts, sini_list, siniu_list, transits, top20=top20)
-        hitrates += [evals[0]]
-        avg_hr = [sum(e)/(x+1) for e in zip(*hitrates)]
-        index = avg_hr.index(max(avg_hr))
-        ideal += [cuts[index]]
-        avg_ideal = np.mean(ideal)
-
-        maxtr = evals[2]
-        maxavgs += [maxtr[0]]
-        avgid = np.mean(maxavgs)        # average num of transits at ideal cut
-        high = 100 * max(avg_hr)
-        # Average of transits spotted : stars observed at ideal sini cut-off
-        obs = avgid/max(avg_hr)    # number of stars observed at ideal sini cut
-        frac = 'Highest average HR = {:3.1f}% = {:3.1f}/{:3.1f}'.format(high,
-                                                                        avgid,
-                                                                        obs)
-
-        plt.figure()
-        plt.plot(cuts, avg_hr)
-        if md == 1:
-            s_type = 'M-Dwarfs'
-            title = 'Hit Rate v. sin(i) Cut-Off for a population of {0} {1}\n\
-Average of {2} trials'.format(pop, s_type, x+1)
-        else:
-            s_type = 'Ultracool Dwarfs'
-            title = 'Hit Rate v. sin(i) Cut-Off for a population of {0} {1}\n\
-{2} planet(s) per star, a/R* = {3}, Average of {4} trials'.format(pop, s_type,
-                                                                  n_pl, ar,
-                                                                  x+1)
-        plt.title(title)
-        plt.xlabel('sini cut-off')
-        plt.xticks(np.arange(0, 1.1, 0.1))
-        plt.ylabel('Hit Rate\n [# transits seen : # stars observed]')
-        if max(avg_hr) < 0.40:
-            plt.ylim(0, 0.40)
+        if batch == 1:
+            evals = (scored[0][x].tolist(), float(scored[2][x]),
+                     scored[3][x].tolist())
         else:
-            plt.ylim(0, (max(avg_hr)+0.1))
-        label = 'ideal sini cut-off: {:1.5f} \n'.format(avg_ideal)
-        label += frac
-        ax = plt.gca()
-        plt.text(.5, .9,
-                 label,
-                 horizontalalignment='center',
-                 transform=ax.transAxes)
-
-        cwd = os.getcwd()
-        if md == 0:
-            path = cwd + '\\sini_curves'
-        if md == 1:
-            path = cwd + '\\mdwarf_curves'
-        name = 'avg' + str(x+1) + '.png'
-        plt.savefig(os.path.join(path, name))
+            evals = run_trial(cuts, pop, ar, top20, md, n_pl,
+                              seed=trial_seed(seed, x))
+        if store is not None:
+            rows += [trial_row(params, x, cuts, evals[0], evals[1], evals[2],
+                               seed=trial_seed(seed, x), run=run)]
+            if len(rows) == 100 or x == n-1:    # Insert in batches.
+                add_trials(conn, rows)
+                rows = []
+        tally(stats, cuts, evals[0], evals[2])
+        tick(meter, pop, evals[0])
+        fig = plt.figure()
+        draw_curve(fig.gca(), cuts, stats, pop, ar, md, n_pl)
+        plt.savefig(curve_path(md, x))
         plt.close()
         status = str(x+1) + ' plots complete.'
         print(status)
 
+    if store is not None:
+        conn.close()
+    finish(meter)
     return
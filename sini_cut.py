@@ -33,6 +33,17 @@ Modification history:
  11/18/16 - added if/else statements to navigate top20 kwarg, made output
              'maxtr' into a list from a number
  12/2/16  - clarified variables in eval_cut2()
+ 10/19/26 - added hit_curve(), break_cuts(), exact_cut() and refine_cut() to
+             find the ideal cut from sorted sinis instead of a fixed grid;
+             fixed eval_cut2() overwriting its 'top20' kwarg and returning
+             after the first cut when frinc=1; _sweep() can score rows of
+             resample indices for BOOT_CUT.py
+ 10/19/26 - added 'prec' kwarg to _sweep() and hit_curve() so float32
+             populations are sorted in float32
+ 10/19/26 - added 'backend' kwarg to _sweep() and hit_curve() for KERNELS.py
+ 10/19/26 - added eval_cut_batch() to score many trials at once
+ 10/19/26 - added eval_policies() to score several lower-limit policies
+             (bias.low_sini()'s 'k') on the same trials in one pass
 
 * LAST REVIEWED: 6/30/16
 """
@@ -40,7 +51,11 @@ Modification history:
 import numpy as np
 import matplotlib.pyplot as plt
 
-from bias import bias
+from bias import bias, low_sini, as_float
+import kernels
+
+# Sigmas of the lower limit tried for sini > 1.0 (0 rejects them outright).
+POLICIES = [0.0, 0.5, 1.0, 2.0]
 
 
 def gen_cuts(num=100):
@@ -104,7 +119,7 @@ def eval_cut2(cuts, sinis, sinius, transits, frinc=0, top20=0):
     maxtr = [0, 0]              # Highest # of transits spotted, total observed
     for c in cuts:
         results = bias(sinis, sinius, c, transits, top20=top20)
-        top20 = results[0]      # Indices of top 20% BDs that would be biased.
+        chosen = results[0]     # Indices of top 20% BDs that would be biased.
         toptr = results[1]      # Indices with detectable transits.
         allobs = results[2]     # Total num of BDs observed with sini cut = c
         tot_rat = float(len(transits)) / float(len(sinis))
@@ -113,10 +128,10 @@ def eval_cut2(cuts, sinis, sinius, transits, frinc=0, top20=0):
             if len(toptr) == 0:
                 tr_rat = 0
             else:  # ratio of transits detected : # stars observed
-                tr_rat = float(len(toptr)) / float(len(top20))
+                tr_rat = float(len(toptr)) / float(len(chosen))
         else:   # when we are looking at the entire population of stars
                 # ratio of detectable transits : entire population size
-            if len(top20) == 0:
+            if len(chosen) == 0:
                 tr_rat = 0
             else:
                 tr_rat = float(len(toptr)) / allobs
@@ -138,11 +153,472 @@ def eval_cut2(cuts, sinis, sinius, transits, frinc=0, top20=0):
             if frac_inc > top_fr:
                 ideal_fr = c
                 top_fr = frac_inc
-            return ratios, ideal, maxtr, fr_incs, ideal_fr
 
+    if frinc == 1:
+        return ratios, ideal, maxtr, fr_incs, ideal_fr
     return ratios, ideal, maxtr
 
 
+def tr_mask(transits, n):
+    """Turns a list of transit indices into a boolean mask.
+
+    Parameters
+    ----------
+    transits : list or array
+        The indices of stars with a transiting planet (or already a boolean
+        mask of length n)
+    n : number
+        The size of the population
+
+    Returns
+    -------
+    mask : array
+        True for every star with a transiting planet
+    """
+    transits = np.asarray(transits)
+    if transits.dtype == bool:
+        return transits
+    mask = np.zeros(n, dtype=bool)
+    mask[transits.astype(int)] = True
+    return mask
+
+
+def _sweep(cuts, low, tr, idx=None, top20=0, prec=None, backend=None):
+    """Counts the stars (and the stars with transits) that bias() would
+    choose at each sini cut without calling bias() once per cut. A star is
+    chosen at cut c when c <= low <= 1.0. One population (1-D low and tr) is
+    sorted once, highest sini first, and the counts at every cut are read
+    off cumulative sums. Several populations (rows of low, or rows of idx)
+    are binned by the number of cuts below each sini instead, so the counts
+    come from one histogram summed from the top down and no row has to be
+    sorted unless top20=1.
+
+    Parameters
+    ----------
+    cuts : array
+        The sini cuts
+    low : array
+        low_sini() of the population(s), shape (..., stars)
+    tr : array
+        Boolean transit masks that broadcast against low
+    *idx : array
+        Optional rows of indices into a single population (1-D low and tr);
+        each row is scored as a population made of those stars, as for a
+        bootstrap resample
+    *top20 : 0 or 1
+        Keeps only the top 20% of each population, like bias()
+    *prec : dtype
+        The precision to sort the sinis in; float32 halves the memory and
+        sorting traffic (by default float32 input stays float32 and anything
+        else is float64). The cuts are always compared in float64.
+    *backend : None, 'numba' or 'numpy'
+        Scores one population with KERNELS.py's compiled loop when Numba is
+        installed (None, the default, or 'numba'); 'numpy' never does
+
+    Returns
+    -------
+    ratios : array
+        The hit rates, shape (..., cuts)
+    hits : array
+        The number of chosen stars with transits, shape (..., cuts)
+    cnt : array
+        The number of stars within the cut (bias()'s 'ct'), shape
+        (..., cuts)
+    """
+    cuts = np.asarray(cuts, dtype=float)
+    low = as_float(low, prec)
+    tr = np.asarray(tr, dtype=bool)
+    if idx is None and low.ndim == tr.ndim == 1 and \
+            kernels.use_numba(backend):
+        return kernels.sweep(cuts, low, tr, top20)
+    if idx is None:
+        shape = np.broadcast_shapes(low.shape, tr.shape)
+    else:
+        shape = np.shape(idx)
+    nc = len(cuts)
+    ok = low <= 1.0                             # sini > 1.0 is never chosen
+    key = np.where(ok, low, -np.inf)
+    srt = None
+
+    if len(shape) == 1:
+        # Highest sini first; ties go to the higher index, as in bias().
+        srt = np.argsort(key, kind='stable')[::-1]
+        pos = np.count_nonzero(ok) - np.searchsorted(np.sort(low[ok]), cuts,
+                                                     side='left')
+        ts = tr[srt]
+        cw = np.arange(len(low) + 1)
+        ch = np.concatenate(([0], np.cumsum(ts)))
+        cnt = cw[pos]
+        hits = ch[pos]
+    else:
+        rows = int(np.prod(shape[:-1]))
+        order = np.argsort(cuts, kind='stable')
+        bins = np.where(ok, np.searchsorted(cuts[order], low, side='right'),
+                        0)
+        if idx is None:
+            bins = np.broadcast_to(bins, shape)
+            trr = np.broadcast_to(tr, shape)
+        else:
+            bins = bins[idx]
+            trr = tr[idx]
+        flat = np.arange(rows)[:, None] * (nc + 1) + bins.reshape(rows, -1)
+        flat = flat.ravel()
+        cnt = np.bincount(flat, minlength=rows * (nc + 1))
+        hits = np.bincount(flat[trr.ravel()], minlength=rows * (nc + 1))
+        # Stars in bins > j are the ones with low >= (j-th smallest cut).
+        cnt = cnt.reshape(rows, nc + 1)[:, :0:-1].cumsum(axis=1)[:, ::-1]
+        hits = hits.reshape(rows, nc + 1)[:, :0:-1].cumsum(axis=1)[:, ::-1]
+        if np.any(order != np.arange(nc)):      # Put the cuts back in order.
+            inv = np.empty(nc, dtype=int)
+            inv[order] = np.arange(nc)
+            cnt = cnt[:, inv]
+            hits = hits[:, inv]
+        cnt = cnt.reshape(shape[:-1] + (nc,))
+        hits = hits.reshape(shape[:-1] + (nc,))
+
+    obs = cnt
+    if top20 == 1:
+        # bias() keeps the top 20% of the chosen stars, which (once there are
+        # enough of them) are the top 20% of all stars with low <= 1.0,
+        # whatever the cut.
+        if idx is not None:
+            # Count how often each star of the sorted population was drawn.
+            srt = np.argsort(key, kind='stable')[::-1]
+            rank = np.empty(len(low), dtype=int)
+            rank[srt] = np.arange(len(low))
+            rows = int(np.prod(shape[:-1]))
+            flat = np.arange(rows)[:, None] * len(low) + \
+                rank[idx].reshape(rows, -1)
+            ws = np.bincount(flat.ravel(), minlength=rows * len(low))
+            ws = ws.reshape(shape[:-1] + (len(low),))
+            ts = tr[srt]
+        elif srt is None:
+            srt = np.argsort(key, axis=-1, kind='stable')[..., ::-1]
+            srt = np.broadcast_to(srt, shape)
+            ws = np.ones(shape)
+            ts = np.take_along_axis(np.broadcast_to(tr, shape), srt, axis=-1)
+        if idx is not None or len(shape) > 1:
+            zero = np.zeros(ws.shape[:-1] + (1,))
+            cw = np.concatenate((zero, np.cumsum(ws, axis=-1)), axis=-1)
+            ch = np.concatenate((zero, np.cumsum(ws * ts, axis=-1)), axis=-1)
+        top = np.floor(0.2 * shape[-1])
+        # p is the first star that does not fit in the top 20% whole.
+        p = np.minimum((cw[..., 1:] < top).sum(axis=-1, keepdims=True),
+                       cw.shape[-1] - 2)
+        ts = np.broadcast_to(ts, cw[..., 1:].shape)
+        top_hits = np.take_along_axis(ch, p, axis=-1) + \
+            (top - np.take_along_axis(cw, p, axis=-1)) * \
+            np.take_along_axis(ts, p, axis=-1)
+        full = cnt >= top
+        hits = np.where(full, top_hits, hits)
+        obs = np.where(full, top, cnt)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratios = np.where(obs > 0, hits / np.where(obs > 0, obs, 1), 0.0)
+    return ratios, hits, cnt
+
+
+def _best(cuts, ratios, hits, cnt):
+    """Picks the ideal cut and eval_cut2()'s 'maxtr' from a swept curve; the
+    first cut reaching the highest hit rate wins, as in eval_cut2()."""
+    j = int(np.argmax(ratios))
+    ideal = cuts[j] if ratios[j] > 0 else 0
+    k = int(np.argmax(hits))
+    maxtr = [hits[k], cnt[k]] if hits[k] > 0 else [0, 0]
+    return ideal, maxtr
+
+
+def hit_curve(cuts, sinis, sinius, transits, top20=0, prec=None,
+              backend=None):
+    """A vectorized eval_cut2(): finds the hit rate at every sini cut from a
+    single sort of the population instead of calling bias() once per cut.
+
+    Parameters
+    ----------
+    cuts : list
+        A list of possible sini cuts
+    sinis : list
+        List of sini values for a population
+    sinius : list
+        List of sini uncertainty values for a population
+    transits : list
+        A list of indices that represent the stars with a transiting planet
+    *top20 : 0 or 1
+        Optional keyword that indicates whether or not to bias to the top 20%
+        (for bias.bias())
+    *prec : dtype
+        The precision of the sweep (see _sweep())
+    *backend : None, 'numba' or 'numpy'
+        Whether to use KERNELS.py's compiled loops (see _sweep())
+
+    Returns
+    -------
+    ratios : array
+        The hit rates using different sini cuts on one population
+    ideal : number
+        The ideal sini cut-off value
+    maxtr : list
+        List containing highest number of transits spotted and total number
+        of objects observed in that run
+    """
+    cuts = np.asarray(cuts, dtype=float)
+    low = low_sini(sinis, sinius, backend)
+    tr = tr_mask(transits, len(low))
+    ratios, hits, cnt = _sweep(cuts, low, tr, top20=top20, prec=prec,
+                               backend=backend)
+    ideal, maxtr = _best(cuts, ratios, hits, cnt)
+    return ratios, ideal, [int(x) for x in maxtr]
+
+
+def eval_cut_batch(cuts, sinis, sinius, transits, top20=0, prec=None):
+    """A batched eval_cut2(): scores many populations of the same size at
+    once. The hit rates of every trial at every cut come from one
+    vectorized pass over a (trials x stars) array, so a batch of small
+    populations costs a few microseconds per trial.
+
+    Parameters
+    ----------
+    cuts : list
+        A list of possible sini cuts
+    sinis : array
+        The measured sinis, shape (trials, stars)
+    sinius : array
+        Their uncertainties, the same shape (or broadcastable to it)
+    transits : array or list
+        Boolean transit masks of shape (trials, stars), or a list holding
+        each trial's list of transit indices (as from generate_pop())
+    *top20 : 0 or 1
+        Optional keyword that indicates whether or not to bias to the top 20%
+        (for bias.bias())
+    *prec : dtype
+        The precision of the sweep (see _sweep())
+
+    Returns
+    -------
+    ratios : array
+        The hit rates, shape (trials, cuts); each row is eval_cut2()'s
+        hit rates for that trial
+    avg : array
+        The hit rates averaged over the trials
+    ideals : array
+        The ideal sini cut-off of each trial (0 when it saw no transits)
+    maxtr : array
+        Each trial's eval_cut2() 'maxtr', shape (trials, 2)
+
+    Example
+    -------
+    >>> from vec_pop import gen_pop_arrays
+    >>> pops = [gen_pop_arrays(n=100, seed=x) for x in range(10**4)]
+    >>> sinis = np.array([p['sini_m'] for p in pops])
+    >>> sinius = np.array([p['sini_u'] for p in pops])
+    >>> transits = np.array([p['transit'] for p in pops])
+    >>> ratios, avg, ideals, maxtr = eval_cut_batch(gen_cuts(), sinis,
+    ...                                             sinius, transits)
+    >>> ratios.shape, maxtr.shape
+    ((10000, 100), (10000, 2))
+    """
+    cuts = np.asarray(cuts, dtype=float)
+    sinis = np.atleast_2d(as_float(sinis, prec))
+    low = low_sini(sinis, sinius)
+    tr = _trial_masks(transits, low.shape)
+    ratios, hits, cnt = _sweep(cuts, low, tr, top20=top20, prec=prec)
+    ideals, maxtr = _best_rows(cuts, ratios, hits, cnt)
+    return ratios, ratios.mean(axis=0), ideals, maxtr
+
+
+def _trial_masks(transits, shape):
+    """Boolean transit masks of shape (trials, stars) from masks or lists
+    of indices."""
+    if isinstance(transits, np.ndarray) and transits.dtype == bool:
+        return np.broadcast_to(transits, shape)
+    return np.array([tr_mask(x, shape[-1]) for x in transits],
+                    dtype=bool).reshape(shape)
+
+
+def _best_rows(cuts, ratios, hits, cnt):
+    """_best() for every row of swept curves (the last axis is the cuts)."""
+    # The first cut with the highest hit rate wins, as in _best().
+    j = np.argmax(ratios, axis=-1)[..., None]
+    best = np.take_along_axis(ratios, j, axis=-1)[..., 0]
+    ideals = np.where(best > 0, cuts[j[..., 0]], 0.0)
+    k = np.argmax(hits, axis=-1)[..., None]
+    most = np.take_along_axis(hits, k, axis=-1)[..., 0]
+    maxtr = np.stack((most, np.take_along_axis(cnt, k, axis=-1)[..., 0]),
+                     axis=-1).astype(int)
+    maxtr[most <= 0] = 0
+    return ideals, maxtr
+
+
+def eval_policies(cuts, sinis, sinius, transits, ks=POLICIES, top20=0,
+                  prec=None):
+    """Scores several lower-limit policies on the same trials at once: the
+    lower limits of every policy are worked out in one broadcast and the
+    hit rates of every (policy, trial) pair come from one sweep, so
+    choosing the policy costs one run instead of one run per policy.
+
+    Parameters
+    ----------
+    cuts : list
+        A list of possible sini cuts
+    sinis : array
+        The measured sinis, shape (trials, stars) or (stars,)
+    sinius : array
+        Their uncertainties, the same shape (or broadcastable to it)
+    transits : array or list
+        Transit masks or lists of indices, as for eval_cut_batch()
+    *ks : list
+        The policies: the number of sigmas, k, of the lower limit
+        sini - k*sini_u tried for a sini > 1.0 (see bias.low_sini()); 0
+        rejects every sini > 1.0 and 1 is bias()'s own rule
+    *top20 : 0 or 1
+        Optional keyword that indicates whether or not to bias to the top 20%
+        (for bias.bias())
+    *prec : dtype
+        The precision of the sweep (see _sweep())
+
+    Returns
+    -------
+    ratios : array
+        The hit rates, shape (policies, trials, cuts); ratios[i] is
+        eval_cut_batch()'s with bias(k=ks[i])
+    avg : array
+        The hit rates of each policy averaged over the trials, shape
+        (policies, cuts)
+    ideals : array
+        The ideal sini cut-off of each policy and trial, shape (policies,
+        trials)
+    maxtr : array
+        The 'maxtr' of each policy and trial, shape (policies, trials, 2)
+
+    Example
+    -------
+    >>> from vec_pop import gen_pop_arrays
+    >>> pops = [gen_pop_arrays(n=1000, seed=x) for x in range(100)]
+    >>> transits = np.array([p['transit'] for p in pops])
+    >>> ratios, avg, ideals, maxtr = eval_policies(
+    ...     gen_cuts(), [p['sini_m'] for p in pops],
+    ...     [p['sini_u'] for p in pops], transits)
+    >>> avg.max(axis=1).round(4)    # the best average hit rate of each policy
+    array([0.    , 0.0101, 0.1234, 0.0797])
+    """
+    cuts = np.asarray(cuts, dtype=float)
+    sinis = np.atleast_2d(as_float(sinis, prec))
+    ks = np.asarray(ks, dtype=float).reshape(-1, 1, 1)
+    low = low_sini(sinis, sinius, k=ks)
+    tr = _trial_masks(transits, sinis.shape)
+    ratios, hits, cnt = _sweep(cuts, low, tr, top20=top20, prec=prec)
+    ideals, maxtr = _best_rows(cuts, ratios, hits, cnt)
+    return ratios, ratios.mean(axis=1), ideals, maxtr
+
+
+def break_cuts(sinis, sinius):
+    """The sini cuts at which a population's hit rate can change. The hit
+    rate only changes when the cut passes one of the (lower-limit) sinis, so
+    these cuts give every value the curve takes between 0 and 1.
+
+    Parameters
+    ----------
+    sinis : list
+        List of sini values for a population
+    sinius : list
+        List of sini uncertainty values for a population
+
+    Returns
+    -------
+    cuts : array
+        The sorted, distinct values of low_sini() between 0 and 1 (these can
+        also be passed to eval_cut2())
+    """
+    low = low_sini(sinis, sinius)
+    return np.unique(low[(low >= 0) & (low <= 1.0)])
+
+
+def exact_cut(sinis, sinius, transits, top20=0):
+    """Evaluates a population's hit rate at its breakpoints (break_cuts()),
+    so the ideal cut is exact instead of being rounded to a grid of cuts.
+    Every cut between the ideal cut and the next lower breakpoint chooses
+    the same stars.
+
+    Parameters
+    ----------
+    sinis : list
+        List of sini values for a population
+    sinius : list
+        List of sini uncertainty values for a population
+    transits : list
+        A list of indices that represent the stars with a transiting planet
+    *top20 : 0 or 1
+        Optional keyword that indicates whether or not to bias to the top 20%
+
+    Returns
+    -------
+    cuts : array
+        The breakpoints
+    ratios : array
+        The hit rate at each breakpoint
+    ideal : number
+        The ideal sini cut-off value
+    maxtr : list
+        List containing highest number of transits spotted and total number
+        of objects observed in that run
+    """
+    cuts = break_cuts(sinis, sinius)
+    ratios, ideal, maxtr = hit_curve(cuts, sinis, sinius, transits, top20)
+    return cuts, ratios, ideal, maxtr
+
+
+def refine_cut(pops, top20=0, num=21, levels=3, keep=3):
+    """Finds the ideal cut of the hit rate averaged over several populations
+    by searching from coarse to fine: each level evaluates num cuts across
+    each bracket and zooms in on the cells next to the keep best ones, and
+    the last level is evaluated exactly at every breakpoint left inside the
+    brackets. A peak narrower than the first grid's spacing can be missed
+    unless keep is raised.
+
+    Parameters
+    ----------
+    pops : list
+        A list of (sinis, sinius, transits) for each population
+    *top20 : 0 or 1
+        Optional keyword that indicates whether or not to bias to the top 20%
+    *num : number
+        The number of cuts evaluated across each bracket
+    *levels : number
+        The number of grid levels before the exact search
+    *keep : number
+        The number of best cuts whose neighbourhoods are kept at each level
+
+    Returns
+    -------
+    ideal : number
+        The ideal sini cut-off value of the averaged hit rate
+    peak : number
+        The highest averaged hit rate
+    """
+    data = []
+    for sinis, sinius, transits in pops:
+        low = low_sini(sinis, sinius)
+        data += [(low, tr_mask(transits, len(low)))]
+
+    def avg(cuts):
+        return np.mean([_sweep(cuts, low, tr, top20=top20)[0]
+                        for low, tr in data], axis=0)
+
+    brackets = [(0.0, 1.0)]
+    for level in range(levels):
+        cuts = np.unique(np.concatenate([np.linspace(lo, hi, num=num)
+                                         for lo, hi in brackets]))
+        best = np.argsort(-avg(cuts), kind='stable')[:keep]
+        brackets = [(cuts[max(j - 1, 0)], cuts[min(j + 1, len(cuts) - 1)])
+                    for j in best]
+    cuts = [np.array([lo, hi]) for lo, hi in brackets]
+    for low, tr in data:
+        cuts += [low[(low >= lo) & (low <= hi)] for lo, hi in brackets]
+    cuts = np.unique(np.concatenate(cuts))
+    curve = avg(cuts)
+    j = int(np.argmax(curve))
+    return cuts[j], curve[j]
+
+
 def eval_cut(cuts, subs=0):
     """A function that evaluates the generated population and plots the
     results.
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:23:50 2026
+
+@author: Madeleine
+
+SURROGATE.py
+
+ A Gaussian-process model of the hit-rate surface, fitted to the results of
+ a PARAM_SWEEP.py sweep, so questions like "what is the best cut at
+ a/R* = 37 with 8% vsini error?" are answered from the model in a
+ fraction of a millisecond instead of by a new generate_pop() + eval_cut2()
+ run.
+
+ The model works in the sweep's unit cube (log scale for the parameters
+ swept on one) with a squared-exponential kernel. Every sweep point is one
+ small population, so its hit rate is noisy. The model is fitted to
+ arcsin(sqrt(hit rate)), whose binomial noise is 1/(4 observed) whatever
+ the hit rate; points where nobody was observed count for almost nothing.
+ The length scales and the variance of the surface are picked by
+ maximizing the marginal likelihood, first all the length scales together
+ and then one at a time. The kernel is kept as its Cholesky factor and
+ solved with it, never inverted. Every answer comes with the model's
+ standard deviation. Queries outside the swept ranges are simulated
+ instead, with VEC_POP.py's gen_pop_arrays() and sini_cut._sweep(), since
+ the model knows nothing there.
+
+     * fit_surrogate(sweep) fits a model to a sweep (or its .npz file)
+     * predict(model, points) gives the mean and standard deviation at many
+         points at once
+     * hit_rate(model, cut= , sim= , reps= , seed= , **params) answers one
+         hit-rate query
+     * ideal_cut(model, cuts= , sim= , reps= , seed= , **params) finds the
+         best cut for one set of parameters
+     * in_bounds(model, **params) says whether a query is inside the sweep
+     * simulate(model, cuts, reps= , seed= , **params) is the fallback
+
+Modification history:
+ 10/19/26 - created
+ 10/19/26 - keep the Cholesky factor of the kernel instead of its inverse
+"""
+
+import json
+
+import numpy as np
+
+try:
+    from scipy.linalg import cho_solve, solve_triangular
+    HAVE_SCIPY = True
+except ImportError:
+    HAVE_SCIPY = False
+
+from random_incs import spawn_rngs
+from mdwarfs import choose_planets
+from bias import low_sini
+from sini_cut import _sweep, gen_cuts
+from vec_pop import gen_pop_arrays
+from param_sweep import load_sweep
+
+# generate_pop()'s values for parameters a query leaves out.
+DEFAULTS = {'pop': 100, 'ar': 20, 'vsini_e': 0.1, 'period_e': 0.05,
+            'radius_e': 0.1, 'cut': 0.95}
+SCALES = np.exp(np.linspace(np.log(0.05), np.log(2.0), 13))
+STEPS = [0.5, 0.7, 1.4, 2.0]
+SEARCH = 512
+JITTER = 1e-8
+
+
+def _unit(model, points):
+    """Maps points in the parameters' own units to the sweep's unit cube."""
+    points = np.array(points, dtype=float)
+    for i, (low, high, log) in enumerate(model['bounds']):
+        if log:
+            points[..., i] = ((np.log(points[..., i]) - np.log(low)) /
+                              (np.log(high) - np.log(low)))
+        else:
+            points[..., i] = (points[..., i] - low) / (high - low)
+    return points
+
+
+def _kernel(a, b, lengths, var):
+    a = a / lengths
+    b = b / lengths
+    d2 = ((a * a).sum(axis=1)[:, None] + (b * b).sum(axis=1)[None, :] -
+          2 * a.dot(b.T))
+    return var * np.exp(-0.5 * np.maximum(d2, 0.0))
+
+
+def _likelihood(x, y, noise, lengths, var):
+    """The log marginal likelihood of the data under a kernel."""
+    k = _kernel(x, x, lengths, var) + np.diag(noise + JITTER)
+    try:
+        chol = np.linalg.cholesky(k)
+    except np.linalg.LinAlgError:
+        return -np.inf
+    alpha = np.linalg.solve(chol, y)
+    return -0.5 * alpha.dot(alpha) - np.log(np.diag(chol)).sum()
+
+
+def fit_surrogate(sweep, scales=SCALES, steps=STEPS, search=SEARCH):
+    """Fits a Gaussian process to the hit rates of a sweep.
+
+    Parameters
+    ----------
+    sweep : dictionary or string
+        From param_sweep.run_sweep() or load_sweep(), or the .npz file
+    *scales : array
+        The common length scales (in the unit cube) tried first
+    *steps : list
+        The factors each length scale (and the variance) is then tried at
+    *search : number
+        The most sweep points used to pick the length scales (the model
+        itself uses them all)
+
+    Returns
+    -------
+    model : dictionary
+        'names', 'bounds', 'lengths', 'var', 'mean', the training points
+        and the kernel's Cholesky factor, plus 'params' (the sweep's
+        settings)
+    """
+    if isinstance(sweep, str):
+        sweep = load_sweep(sweep)
+    params = sweep['params']
+    if isinstance(params, str):
+        params = json.loads(params)
+    names = list(sweep['names'])
+    bounds = [tuple(params['bounds'][x]) for x in names]
+    model = {'names': names, 'bounds': bounds, 'params': params}
+
+    x = _unit(model, sweep['points'])
+    # arcsin(sqrt(p)) gives every point the same binomial noise, 1/(4 obs).
+    obs = np.asarray(sweep['observed'], dtype=float)
+    noise = np.where(obs > 0, 0.25 / np.maximum(obs, 1), 1.0)
+    y = np.arcsin(np.sqrt(np.clip(sweep['hit_rate'], 0, 1)))
+    mean = np.average(y, weights=1 / noise)
+    y = y - mean
+    var = max(np.average(y**2, weights=1 / noise), 1e-6)
+
+    # All length scales together, then each one (and the variance of the
+    # surface, the last entry) on its own. Sweep points after the first
+    # 'search' are left out here; a Sobol sequence's first points already
+    # cover the whole cube.
+    xs, ys, ns = x[:search], y[:search], noise[:search]
+    best = max(scales, key=lambda s: _likelihood(xs, ys, ns,
+                                                 np.full(len(names), s), var))
+    theta = np.append(np.full(len(names), best), var)
+    top = _likelihood(xs, ys, ns, theta[:-1], theta[-1])
+    for sweep_pass in range(3):
+        for i in range(len(theta)):
+            for step in steps:
+                trial = theta.copy()
+                trial[i] *= step
+                like = _likelihood(xs, ys, ns, trial[:-1], trial[-1])
+                if like > top:
+                    theta, top = trial, like
+    lengths, var = theta[:-1], theta[-1]
+
+    k = _kernel(x, x, lengths, var) + np.diag(noise + JITTER)
+    chol = np.linalg.cholesky(k)
+    if HAVE_SCIPY:
+        alpha = cho_solve((chol, True), y)
+    else:
+        alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, y))
+    model.update({'x': x, 'lengths': lengths, 'var': var, 'mean': mean,
+                  'alpha': alpha, 'chol': chol})
+    return model
+
+
+def _lower_solve(chol, b):
+    """Solves chol . v = b for the lower-triangular Cholesky factor."""
+    if HAVE_SCIPY:
+        return solve_triangular(chol, b, lower=True)
+    return np.linalg.solve(chol, b)
+
+
+def predict(model, points):
+    """The model's hit rate and its uncertainty at many points.
+
+    Parameters
+    ----------
+    model : dictionary
+        From fit_surrogate()
+    points : array
+        Shape (points, parameters), in the parameters' own units and in the
+        order of model['names']
+
+    Returns
+    -------
+    mean : array
+        The predicted hit rates
+    std : array
+        Their standard deviations (of the underlying surface, without the
+        trial-to-trial scatter of single populations)
+    """
+    u = _unit(model, np.atleast_2d(points))
+    k = _kernel(u, model['x'], model['lengths'], model['var'])
+    y = model['mean'] + k.dot(model['alpha'])
+    v = _lower_solve(model['chol'], k.T)
+    var = model['var'] - (v * v).sum(axis=0)
+    # Back from arcsin(sqrt(p)); the spread is half the width of y +/- sd,
+    # which stays honest near a hit rate of 0.
+    sd = np.sqrt(np.maximum(var, 0.0))
+    lo, hi = (np.sin(np.clip(y + x, 0, np.pi / 2))**2 for x in (-sd, sd))
+    return np.sin(np.clip(y, 0, np.pi / 2))**2, (hi - lo) / 2
+
+
+def _point(model, params):
+    extra = set(params) - set(DEFAULTS)
+    if extra:
+        raise ValueError('unknown parameters: {0}'.format(sorted(extra)))
+    return [params.get(x, DEFAULTS[x]) for x in model['names']]
+
+
+def in_bounds(model, **params):
+    """Says whether a query lies inside the swept ranges (parameters left
+    out take DEFAULTS).
+
+    Returns
+    -------
+    inside : bool
+    """
+    point = _point(model, params)
+    return all(low <= x <= high
+               for x, (low, high, log) in zip(point, model['bounds']))
+
+
+def simulate(model, cuts, reps=20, seed=None, **params):
+    """Simulates the hit rate at some cuts for one set of parameters, pooling
+    reps populations, as the fallback for queries outside the sweep.
+
+    Parameters
+    ----------
+    model : dictionary
+        From fit_surrogate() (for top20, md and n_pl)
+    cuts : list
+        The sini cuts
+    *reps : number
+        The number of populations pooled
+    *seed : number
+        Seed of the populations
+    **params
+        pop, ar, vsini_e, period_e, radius_e (others take DEFAULTS)
+
+    Returns
+    -------
+    ratios : array
+        The pooled hit rates (transits spotted / stars observed)
+    std : array
+        Their binomial standard deviations
+    """
+    settings = model['params']
+    kwargs = dict(DEFAULTS)
+    kwargs.update(params)
+    del kwargs['cut']
+    n = int(round(kwargs.pop('pop')))
+    cuts = np.asarray(cuts, dtype=float)
+    hits = np.zeros(len(cuts))
+    obs = np.zeros(len(cuts))
+    for rng in spawn_rngs(seed, reps):
+        if settings['md'] == 1:
+            kwargs['ar'] = choose_planets(n, rng)
+        else:
+            kwargs['ar'] = [params.get('ar', DEFAULTS['ar'])]
+        pop = gen_pop_arrays(n=n, top20=settings['top20'], md=settings['md'],
+                             n_pl=settings['n_pl'], seed=rng, **kwargs)
+        h, cnt = _sweep(cuts, low_sini(pop['sini_m'], pop['sini_u']),
+                        pop['transit'], top20=settings['top20'])[1:]
+        hits += h
+        if settings['top20'] == 1:
+            cnt = np.minimum(cnt, int(0.2 * n))     # Only the top 20% seen.
+        obs += cnt
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratios = np.where(obs > 0, hits / np.where(obs > 0, obs, 1), 0.0)
+        std = np.where(obs > 0, np.sqrt(ratios * (1 - ratios) /
+                                        np.where(obs > 0, obs, 1)), np.nan)
+    return ratios, std
+
+
+def hit_rate(model, cut=DEFAULTS['cut'], sim=1, reps=20, seed=None,
+             **params):
+    """Answers one hit-rate query.
+
+    Parameters
+    ----------
+    model : dictionary
+        From fit_surrogate()
+    *cut : number
+        The sini cut-off
+    *sim : 0 or 1
+        Simulates queries outside the sweep (default); with 0 the model is
+        used anyway
+    *reps, seed :
+        As for simulate()
+    **params
+        pop, ar, vsini_e, period_e, radius_e (others take DEFAULTS)
+
+    Returns
+    -------
+    result : dictionary
+        'hit_rate', 'std' and 'source' ('model' or 'simulation')
+
+    Example
+    -------
+    >>> model = fit_surrogate('sweep.npz')
+    >>> hit_rate(model, cut=0.9, ar=37, vsini_e=0.08)      # 0.2 ms
+    """
+    params['cut'] = cut
+    if sim == 1 and not in_bounds(model, **params):
+        ratios, std = simulate(model, [cut], reps, seed, **params)
+        return {'hit_rate': ratios[0], 'std': std[0], 'source': 'simulation'}
+    mean, std = predict(model, _point(model, params))
+    return {'hit_rate': mean[0], 'std': std[0], 'source': 'model'}
+
+
+def ideal_cut(model, cuts=None, sim=1, reps=20, seed=None, **params):
+    """Finds the best sini cut for one set of parameters.
+
+    Parameters
+    ----------
+    model : dictionary
+        From fit_surrogate()
+    *cuts : list
+        The cuts to compare (gen_cuts(100) within the swept cut range by
+        default)
+    *sim, reps, seed :
+        As for hit_rate()
+    **params
+        pop, ar, vsini_e, period_e, radius_e (others take DEFAULTS)
+
+    Returns
+    -------
+    result : dictionary
+        'cut' (the first cut with the highest hit rate), 'hit_rate', 'std',
+        'source', and 'cuts' and 'ratios' (the whole curve)
+
+    Example
+    -------
+    >>> ideal_cut(model, ar=37, vsini_e=0.08)['cut']         # 1 ms
+    """
+    if 'cut' in params:
+        raise ValueError('ideal_cut() chooses the cut itself')
+    if cuts is None:
+        cuts = np.asarray(gen_cuts(100))
+        if 'cut' in model['names']:
+            low, high = model['bounds'][model['names'].index('cut')][:2]
+            cuts = cuts[(cuts >= low) & (cuts <= high)]
+    cuts = np.asarray(cuts, dtype=float)
+    params['cut'] = cuts.min()
+    outside = not in_bounds(model, **params)
+    params['cut'] = cuts.max()
+    outside = outside or not in_bounds(model, **params)
+    del params['cut']
+    if sim == 1 and outside:
+        ratios, std = simulate(model, cuts, reps, seed, **params)
+        source = 'simulation'
+    else:
+        points = np.tile(_point(model, params), (len(cuts), 1))
+        if 'cut' in model['names']:
+            points[:, model['names'].index('cut')] = cuts
+        ratios, std = predict(model, points)
+        source = 'model'
+    j = int(np.argmax(ratios))
+    return {'cut': cuts[j], 'hit_rate': ratios[j], 'std': std[j],
+            'source': source, 'cuts': cuts, 'ratios': ratios}
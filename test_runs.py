@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:40:12 2026
+
+@author: Madeleine
+
+TEST_RUNS.py
+
+ Pins the checks that keep the fast engines, the shards and the pipeline
+ honest, so a later change can't silently break them: the vectorized (and
+ Numba) engines match the scalar pipeline exactly (EQUIVALENCE.py), and a
+ seeded plot() gives the same trials every time, whether it is run again,
+ split over shards (SHARD_RUNS.py) or run as a pipeline (PIPELINE.py).
+ Run with
+
+     python -m pytest -q test_runs.py
+
+Modification history:
+ 10/19/26 - created
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from equivalence import exact_check
+from results_db import open_store, get_trials
+from shard_runs import run_shard, merge_shards
+from sini_curves import plot, curve_path
+from pipeline import run_pipeline
+
+SEED = 7
+TRIALS = 4
+POP = 300
+NUMCUTS = 50
+
+
+@pytest.mark.parametrize('top20, md', [(0, 0), (1, 0), (0, 1), (1, 1)])
+def test_exact_check(top20, md):
+    results = exact_check(n=300, trials=3, numcuts=NUMCUTS, top20=top20,
+                          md=md, seed=SEED)
+    for engine in results['time']:
+        if engine == 'scalar':
+            continue
+        for name, matched in results[engine].items():
+            assert matched == results['trials'], (engine, name)
+
+
+@pytest.fixture
+def rundir(tmp_path, monkeypatch):
+    """A folder to run plot() in, with the folder it saves its figures to
+    (a literal 'cwd\\sini_curves' where paths are not Windows ones)."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.dirname(curve_path(0, 0)), exist_ok=True)
+    return tmp_path
+
+
+def _plot_trials(store, **kwargs):
+    plot(n=TRIALS, pop=POP, numcuts=NUMCUTS, seed=SEED, store=store,
+         **kwargs)
+    conn = open_store(store)
+    try:
+        return get_trials(conn)
+    finally:
+        conn.close()
+
+
+def _same_trials(rows, other):
+    assert [x['trial'] for x in rows] == list(range(TRIALS))
+    assert [x['trial'] for x in other] == list(range(TRIALS))
+    for x, y in zip(rows, other):
+        assert x['seed'] == y['seed']
+        assert x['ideal'] == y['ideal']
+        assert (x['maxtr'], x['nobs']) == (y['maxtr'], y['nobs'])
+        assert np.array_equal(x['curve'], y['curve'])
+
+
+def test_plot_seed(rundir):
+    _same_trials(_plot_trials('a.db'), _plot_trials('b.db'))
+    assert os.path.isfile(curve_path(0, TRIALS - 1))
+
+
+def test_plot_batch(rundir):
+    _same_trials(_plot_trials('a.db'), _plot_trials('b.db', batch=1))
+
+
+def test_merge_shards(rundir):
+    rows = _plot_trials('a.db')
+    # ar as the command line gives it ([20.0]) in one of the shards.
+    fnames = [run_shard(SEED, index, 3, n=TRIALS, pop=POP,
+                        ar=[20.0] if index == 1 else [20], numcuts=NUMCUTS,
+                        path=str(rundir / 'shards')) for index in range(3)]
+    stats = merge_shards(fnames[::-1])
+    assert stats['trials'] == TRIALS
+    assert np.array_equal(stats['curves'], [x['curve'] for x in rows])
+    assert np.array_equal(stats['maxtr'],
+                          [(x['maxtr'], x['nobs']) for x in rows])
+
+    with pytest.raises(ValueError):
+        merge_shards(fnames[:2])
+
+
+def test_pipeline(rundir):
+    rows = _plot_trials('a.db')
+    run_pipeline(n=TRIALS, pop=POP, numcuts=NUMCUTS, seed=SEED,
+                 store='b.db', figures=0, save=0)
+    conn = open_store('b.db')
+    try:
+        _same_trials(rows, get_trials(conn))
+    finally:
+        conn.close()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:40:27 2026
+
+@author: Madeleine
+
+TOP_SELECT.py
+
+ bias()'s 'top20' selection for populations that arrive in chunks or are
+ spread over several workers, so they never have to be in memory at once.
+ A selection state keeps only the best k = int(frac * n) stars seen so far
+ within the sini cut (their lower-limit sinis, indices and transit flags),
+ where n is the size of the whole population. States of different chunks
+ merge into the state of all of them, and the final selection is the same
+ as bias_mask(top20=1) on the whole population: the k highest sinis, with
+ ties going to the higher index.
+
+     * new_top(n, frac= , cut= ) starts an empty selection state
+     * add_chunk(state, sini, sini_u, start, transits= ) adds the stars
+         start, start+1, ... of the population
+     * merge_top(states) combines the states of separate chunks
+     * top_result(state) returns the chosen and spotted indices and 'ct'
+
+Modification history:
+ 10/19/26 - created
+"""
+
+import numpy as np
+
+from bias import low_sini
+
+
+def new_top(n, frac=0.2, cut=0.95):
+    """Starts an empty selection state.
+
+    Parameters
+    ----------
+    n : number
+        The size of the whole population
+    *frac : number
+        The fraction of the population to keep (0.2 by default, as bias())
+    *cut : number
+        The sini cut-off
+
+    Returns
+    -------
+    state : dictionary
+        'k' (the number of stars to keep), 'cut', 'ct' (the number of
+        stars within the cut so far) and the kept stars' 'low', 'idx' and
+        'tr', best first
+    """
+    return {'k': int(frac * n), 'cut': cut, 'ct': 0,
+            'low': np.zeros(0), 'idx': np.zeros(0, dtype=np.int64),
+            'tr': np.zeros(0, dtype=bool)}
+
+
+def _trim(state, low, idx, tr):
+    """Keeps the best k of the given stars (with the stars already kept),
+    best first."""
+    low = np.concatenate((state['low'], low))
+    idx = np.concatenate((state['idx'], idx))
+    tr = np.concatenate((state['tr'], tr))
+    k = state['k']
+    if len(low) > k:
+        # Everything tied with the k-th best goes on to the exact sort.
+        kth = np.partition(low, len(low) - k)[len(low) - k]
+        sub = np.flatnonzero(low >= kth)
+    else:
+        sub = np.arange(len(low))
+    order = sub[np.lexsort((idx[sub], low[sub]))[::-1][:k]]
+    state.update({'low': low[order], 'idx': idx[order], 'tr': tr[order]})
+    return state
+
+
+def add_chunk(state, sini, sini_u, start, transits=None):
+    """Adds a chunk of the population to a selection state.
+
+    Parameters
+    ----------
+    state : dictionary
+        The state from new_top() (changed in place)
+    sini : array
+        The sinis of the chunk's stars
+    sini_u : array
+        Their uncertainties
+    start : number
+        The index of the chunk's first star in the whole population
+    *transits : array
+        A boolean mask of the chunk's stars with transiting exoplanets
+
+    Returns
+    -------
+    state : dictionary
+        The same state, updated
+    """
+    low = low_sini(sini, sini_u, backend='numpy')
+    ok = (np.float64(state['cut']) <= low) & (low <= 1.0)
+    if transits is None:
+        transits = np.zeros(len(low), dtype=bool)
+    state['ct'] += int(np.count_nonzero(ok))
+    idx = start + np.flatnonzero(ok)
+    return _trim(state, low[ok], idx, np.asarray(transits, dtype=bool)[ok])
+
+
+def merge_top(states):
+    """Combines the selection states of separate chunks of one population.
+
+    Parameters
+    ----------
+    states : list
+        States from new_top() and add_chunk(), each covering different stars
+
+    Returns
+    -------
+    state : dictionary
+        A new state covering all of their stars
+    """
+    first = states[0]
+    for other in states[1:]:
+        if other['k'] != first['k'] or other['cut'] != first['cut']:
+            raise ValueError('states are from different selections')
+    state = dict(first)
+    for other in states[1:]:
+        state['ct'] += other['ct']
+        state = _trim(state, other['low'], other['idx'], other['tr'])
+    return state
+
+
+def top_result(state):
+    """The final selection of a state.
+
+    Parameters
+    ----------
+    state : dictionary
+        A state covering the whole population
+
+    Returns
+    -------
+    chosen : array
+        The indices of the chosen stars, best first (bias()'s 'high_inds',
+        as a set)
+    spotted : array
+        The chosen stars with a visibly transiting planet
+    ct : number
+        The total number of stars within the sini cut-off
+
+    Example
+    -------
+    >>> state = new_top(10**8)
+    >>> for start in range(0, 10**8, 10**6):
+    ...     pop = gen_pop_arrays(10**6, seed=start)
+    ...     add_chunk(state, pop['sini_m'], pop['sini_u'], start,
+    ...               pop['transit'])
+    >>> chosen, spotted, ct = top_result(state)
+    """
+    return state['idx'], state['idx'][state['tr']], state['ct']
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:05:48 2026
+
+@author: Madeleine
+
+TRANSIT_TABLE.py
+
+ A lookup table of the probability that a star's planet transits given
+ what we measure: P(transit | measured sini, relative sini uncertainty,
+ a/R*). The table is filled once by simulating stars with VEC_POP.py (the
+ same truths, measurements and (a/R*)|cos i| < 1 geometry as
+ generate_pop()), with each star's vsini, period and radius error rates
+ drawn from a range so the relative uncertainties cover the grid. Ranking
+ a catalog is then an interpolation into the table instead of a new
+ simulation.
+
+     * build_table(n= , sini_edges= , rel_edges= , ar= , errs= , md= ,
+         seed= , chunk= ) fills the table
+     * save_table(table, fname= ) and load_table(fname= ) store it as .npz
+     * transit_prob(table, sini, sini_u, ar) looks up whole catalogs at
+         once
+
+Modification history:
+ 10/19/26 - created
+"""
+
+import json
+
+import numpy as np
+
+from vec_pop import draw_truths, measure, uncert, transit_matrix
+
+TABLE = 'transit_table.npz'
+SINI_EDGES = np.linspace(0, 1.5, 76)
+REL_EDGES = np.linspace(0, 0.4, 21)
+AR = [3, 5, 10, 20, 30, 50, 100]
+# Ranges the per-star error rates are drawn from (uniformly).
+ERRS = {'vsini_e': (0.0, 0.3), 'period_e': (0.0, 0.1),
+        'radius_e': (0.0, 0.3)}
+
+
+def build_table(n=10**7, sini_edges=SINI_EDGES, rel_edges=REL_EDGES, ar=AR,
+                errs=ERRS, md=0, seed=None, chunk=10**6):
+    """Fills the transit-probability table by simulation.
+
+    Parameters
+    ----------
+    *n : number
+        The number of stars to simulate
+    *sini_edges : array
+        The bin edges of measured sini
+    *rel_edges : array
+        The bin edges of relative sini uncertainty (sini_u / sini)
+    *ar : list
+        The a/R* values of the table
+    *errs : dictionary
+        (low, high) ranges of 'vsini_e', 'period_e' and 'radius_e'
+    *md : 0 or 1
+        A kwarg to indicate whether or not to use M-dwarf parameters
+    *seed : number
+        Seed for the random draws
+    *chunk : number
+        The number of stars simulated at once
+
+    Returns
+    -------
+    table : dictionary
+        'sini_edges', 'rel_edges', 'ar', 'prob' (shape (sini bins,
+        uncertainty bins, a/R* values); NaN for empty bins), 'count' (the
+        number of stars in each bin) and 'params'
+    """
+    rng = np.random.default_rng(seed)
+    sini_edges = np.asarray(sini_edges, dtype=float)
+    rel_edges = np.asarray(rel_edges, dtype=float)
+    ar = np.asarray(ar, dtype=float)
+    nx, ny = len(sini_edges) - 1, len(rel_edges) - 1
+    count = np.zeros(nx * ny)
+    hits = np.zeros((len(ar), nx * ny))
+    for start in range(0, n, chunk):
+        m = min(chunk, n - start)
+        truths = draw_truths(m, md, rng)
+        e = dict((x, rng.uniform(*errs[x], size=m)) for x in sorted(errs))
+        meas = measure(truths, e['vsini_e'], e['period_e'], md)
+        rel = uncert(meas, e['radius_e'], md) / meas['sini_m']
+        ix = np.searchsorted(sini_edges, meas['sini_m'], side='right') - 1
+        iy = np.searchsorted(rel_edges, rel, side='right') - 1
+        inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+        flat = (ix * ny + iy)[inside]
+        count += np.bincount(flat, minlength=nx * ny)
+        tr = transit_matrix(truths['inc'][inside], ar)
+        for a in range(len(ar)):
+            hits[a] += np.bincount(flat, weights=tr[:, a], minlength=nx * ny)
+    with np.errstate(invalid='ignore'):
+        prob = np.where(count > 0, hits / np.where(count > 0, count, 1),
+                        np.nan)
+    params = {'n': n, 'errs': errs, 'md': md, 'seed': seed}
+    return {'sini_edges': sini_edges, 'rel_edges': rel_edges, 'ar': ar,
+            'prob': np.moveaxis(prob, 0, -1).reshape(nx, ny, len(ar)),
+            'count': count.reshape(nx, ny),
+            'params': json.dumps(params, sort_keys=True, default=str)}
+
+
+def save_table(table, fname=TABLE):
+    np.savez(fname, **table)
+
+
+def load_table(fname=TABLE):
+    with np.load(fname) as data:
+        table = dict((name, data[name]) for name in data.files)
+    table['params'] = str(table['params'])
+    return table
+
+
+def _axis(centers, x):
+    """The lower neighbouring grid point of each x and its weight, clipped to
+    the ends of the grid. Evenly spaced grids are indexed arithmetically."""
+    step = np.diff(centers)
+    if np.allclose(step, step[0]):
+        i = np.floor((x - centers[0]) / step[0]).astype(np.intp)
+        i = np.clip(i, 0, len(centers) - 2)
+    else:
+        i = np.clip(np.searchsorted(centers, x, side='right') - 1, 0,
+                    len(centers) - 2)
+    t = (x - centers[i]) / (centers[i + 1] - centers[i])
+    return i, np.clip(t, 0.0, 1.0)
+
+
+def transit_prob(table, sini, sini_u, ar):
+    """Looks up P(transit) for a whole catalog by trilinear interpolation
+    between bin centres (in log a/R*). Values off the grid get the nearest
+    edge; empty bins are left out of the interpolation.
+
+    Parameters
+    ----------
+    table : dictionary
+        From build_table() or load_table()
+    sini : array
+        The measured sinis
+    sini_u : array
+        Their uncertainties
+    ar : number or array
+        The a/R* of each star's planet (or one value for all)
+
+    Returns
+    -------
+    prob : array
+        The probability that each star's planet transits (NaN only when
+        every neighbouring bin is empty)
+
+    Example
+    -------
+    >>> table = build_table(seed=1)
+    >>> transit_prob(table, [0.3, 0.98, 1.05], [0.03, 0.1, 0.1], 20)
+    array([0.        , 0.01046225, 0.0728018 ])
+    """
+    sini = np.asarray(sini, dtype=float)
+    rel = np.asarray(sini_u, dtype=float) / np.where(sini != 0, sini, 1)
+    se, re = table['sini_edges'], table['rel_edges']
+    ix, tx = _axis((se[1:] + se[:-1]) / 2, sini)
+    iy, ty = _axis((re[1:] + re[:-1]) / 2, rel)
+    # One a/R* for the whole catalog is looked up once.
+    iz, tz = _axis(np.log(table['ar']), np.log(np.asarray(ar, dtype=float)))
+
+    # Empty cells count as probability 0 with weight 0, so the weights of
+    # the corners that are filled can be divided out at the end.
+    prob = table['prob']
+    nx, ny, nz = prob.shape
+    filled = (~np.isnan(prob)).astype(float).ravel()
+    prob = np.nan_to_num(prob).ravel()
+    base = (ix * ny + iy) * nz + iz
+    total = np.zeros(sini.shape)
+    weight = np.zeros(sini.shape)
+    for dx, wx in ((0, 1 - tx), (1, tx)):
+        for dy, wy in ((0, 1 - ty), (1, ty)):
+            wxy = wx * wy
+            for dz, wz in ((0, 1 - tz), (1, tz)):
+                cell = base + ((dx * ny + dy) * nz + dz)
+                w = wxy * wz
+                total += w * np.take(prob, cell)
+                weight += w * np.take(filled, cell)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(weight > 0, total / weight, np.nan)
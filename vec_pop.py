@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:12:44 2026
+
+@author: Madeleine
+
+VEC_POP.py
+
+ A vectorized version of RANDOM_INCS.py's generate_pop(): every column of a
+ population is drawn or calculated for all stars at once with NumPy arrays
+ instead of one star at a time. The random numbers are drawn in the same
+ order as generate_pop() draws them (inclinations, radii, periods, then
+ planets), and the measurements use the same equations as find_sini() and
+ sini_unc().
+
+     * draw_truths(n, md= , rng= ) draws the "true" inclinations, radii and
+         periods of n stars
+     * draw_hosts(n, freq= , n_pl= , rng= ) picks the stars that have each
+         planet
+     * draw_planets(incs, ar, freq= , n_pl= , md= , rng= , has= ) gives
+         stars their planets and works out which ones transit
+     * measure(truths, vsini_e= , period_e= , md= ) calculates the measured
+         vsini, period and sini
+     * uncert(meas, radius_e= , md= ) calculates the sini uncertainties
+     * gen_pop_arrays(n= , cut= , ar= , ...) does all of the above and
+         biases the population like generate_pop()
+     * transit_matrix(incs, ar) checks every star against many a/R* values
+     * ar_surface(cuts, ar, n= , ...) draws one population and finds its hit
+         rate at every (a/R*, sini cut) pair
+     * check_prec(n= , cuts= , seed= , ...) compares a float32 population
+         with the float64 one drawn from the same seed
+
+ The 'prec' kwarg sets the precision of the truths and measurements. Even
+ float32 (about 7 significant digits) is far more precise than the 5-10%
+ measurement errors, and it halves the memory and cache traffic per star.
+ The random numbers are always drawn in float64 and then rounded, so a
+ float32 population is the float64 one from the same seed, rounded. The
+ one place the rounding shows is a cut of exactly 1.0: a star whose sini is
+ within 6e-8 of 1.0 rounds up to 1.0 in float32 and is then chosen at that
+ cut, where it is often the only star, so the hit rate there can jump to 0
+ or 1 and take the ideal cut with it. Leave that cut out of the grid
+ (gen_cuts(num)[:-1]) when using float32.
+
+Modification history:
+ 10/19/26 - created
+ 10/19/26 - added 'prec' kwarg and check_prec()
+ 10/19/26 - split draw_hosts() out of draw_planets() so POP_STAGES.py can
+             change a/R* without drawing the planets again
+"""
+
+import math
+
+import numpy as np
+
+from bias import bias_mask, low_sini
+from sini_cut import _sweep, _best, gen_cuts
+
+R_JUP = 71492               # km = 1 Jupiter radius (NASA)
+R_MD = 0.3 * 695700         # km, 0.3 solar radii (NASA fact sheet)
+
+
+def draw_truths(n, md=0, rng=None, prec='float64'):
+    """Draws the "true" parameters of n stars, as generate_pop() does with
+    gen_incs(), gen_radius() and gen_period().
+
+    Parameters
+    ----------
+    n : number
+        The size of the desired population
+    *md : 0 or 1
+        A kwarg to indicate whether or not to use M-dwarf parameters
+    *rng : numpy.random.Generator
+        The random number generator to draw from
+    *prec : dtype
+        The precision of the arrays ('float64' by default, or 'float32')
+
+    Returns
+    -------
+    truths : dictionary
+        Arrays 'inc' (radians), 'vsini' (km/s), 'period' (seconds),
+        'radius' (km, rounded like all_data) and 'sini'
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    data = np.linspace(0, 3.14, num=100)
+    y = np.arange(len(data)) / len(data)
+    incs = np.interp(rng.random(n), y, data)
+
+    R = R_JUP
+    low, hi = 2 * 3600, 8 * 3600                # 2 - 8 hours
+    if md == 1:
+        R = R_MD
+        low, hi = 2.4 * 3600, 24 * 3600         # 0.1 - 1.0 days
+    r = rng.normal(R, R * 0.1 / 3, size=n)
+    P = rng.uniform(low, hi, size=n)
+    incs, r, P = [x.astype(prec) for x in (incs, r, P)]
+
+    vsini = (2 * math.pi * r / P) * np.sin(incs)
+    sini = vsini * P / (2 * math.pi * r)
+    return {'inc': incs, 'vsini': vsini, 'period': P,
+            'radius': np.round(r, 4), 'sini': sini}
+
+
+def draw_hosts(n, freq=1, n_pl=1, rng=None):
+    """Picks which stars have each planet, as gen_planet() does: int(freq*n)
+    random stars get each of the n_pl planets.
+
+    Parameters
+    ----------
+    n : number
+        The number of stars
+    *freq : number
+        The intrinsic frequency of stars having an orbiting exoplanet
+    *n_pl : number
+        The number of planets to be generated per star
+    *rng : numpy.random.Generator
+        The random number generator to draw from
+
+    Returns
+    -------
+    has : array
+        Boolean array of shape (n, n_pl)
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    num = int(freq * n)
+    has = np.zeros((n, n_pl), dtype=bool)
+    for i in range(n_pl):
+        has[rng.permutation(n)[:num], i] = True
+    return has
+
+
+def draw_planets(incs, ar, freq=1, n_pl=1, md=0, rng=None, has=None):
+    """Gives stars their planets (like gen_planet(), or planet_eval() when
+    md=1) and works out which planets transit: (a/R*)*|cos i| < 1.
+
+    Parameters
+    ----------
+    incs : array
+        The inclinations of the stars
+    ar : list
+        The a/R* of each of the n_pl planets, or (md=1) a list of lists with
+        the a/R* values of each star's planets
+    *freq : number
+        The intrinsic frequency of stars having an orbiting exoplanet
+    *n_pl : number
+        The number of planets to be generated per star
+    *md : 0 or 1
+        A kwarg to indicate whether or not to use M-dwarf parameters
+    *rng : numpy.random.Generator
+        The random number generator to draw from
+    *has : array
+        Which stars have each planet, from draw_hosts(); drawn when not
+        given
+
+    Returns
+    -------
+    planets : dictionary
+        'planets' and 'pl_transit', arrays of shape (n, n_pl) saying whether
+        each star has each planet and whether it transits (for md=1, flat
+        arrays 'ar', 'owner' and 'pl_transit' over all planets), and
+        'transit', a mask of the stars with at least one transit
+    """
+    n = len(incs)
+    if md == 1:
+        lens = np.array([len(x) for x in ar], dtype=int)
+        flat = np.array([x for sub in ar for x in sub], dtype=float)
+        owner = np.repeat(np.arange(n), lens)
+        pl_tr = np.abs(flat * np.cos(incs[owner])) < 1
+        transit = np.bincount(owner[pl_tr], minlength=n) > 0
+        return {'ar': flat, 'owner': owner, 'pl_transit': pl_tr,
+                'transit': transit}
+
+    if has is None:
+        has = draw_hosts(n, freq, n_pl, rng)
+    ar = np.asarray(ar, dtype=float)[:n_pl]
+    pl_tr = has & (np.abs(ar[None, :] * np.cos(incs)[:, None]) < 1)
+    return {'planets': has, 'pl_transit': pl_tr,
+            'transit': pl_tr.any(axis=1)}
+
+
+def measure(truths, vsini_e=0.1, period_e=0.05, md=0):
+    """Calculates what we would measure for each star (generate_pop()'s
+    "measured" elements).
+
+    Parameters
+    ----------
+    truths : dictionary
+        The arrays from draw_truths()
+    *vsini_e : number or array
+        Rate of error on the vsini values
+    *period_e : number or array
+        The error rate assumed for the rotational period
+    *md : 0 or 1
+        A kwarg to indicate whether or not to use M-dwarf parameters
+
+    Returns
+    -------
+    meas : dictionary
+        Arrays 'vsini_m', 'period_m', 'sini_m', 'inc_m' and 'success' (True
+        when sini_m is within sini_u of the true sini; filled in by
+        uncert()), plus the errors 'vsini_err' and 'period_err'; all in the
+        precision of the truths
+    """
+    ra = R_MD if md == 1 else R_JUP
+    p_e = period_e * truths['period']
+    pm = truths['period'] + p_e
+    vm_e = vsini_e * truths['vsini']
+    vm = truths['vsini'] + vm_e
+    sini_m = vm * pm / (2 * math.pi * ra)
+    return {'vsini_m': vm, 'period_m': pm, 'radius_m': ra, 'sini_m': sini_m,
+            'inc_m': np.arcsin(np.minimum(sini_m, 1.0)),
+            'vsini_err': vm_e, 'period_err': p_e}
+
+
+def uncert(meas, radius_e=0.1, md=0):
+    """Calculates the absolute sini uncertainty of each star, as sini_unc()
+    does.
+
+    Parameters
+    ----------
+    meas : dictionary
+        The arrays from measure()
+    *radius_e : number or array
+        The error rate assumed for the radii
+    *md : 0 or 1
+        A kwarg to indicate whether or not to use M-dwarf parameters
+
+    Returns
+    -------
+    sini_u : array
+        The sini uncertainties
+    """
+    ra = R_MD if md == 1 else R_JUP
+    arg = (meas['vsini_err'] / meas['vsini_m'])**2 + \
+        (meas['period_err'] / meas['period_m'])**2 + (radius_e * ra / ra)**2
+    return meas['sini_m'] * np.sqrt(arg)
+
+
+def gen_pop_arrays(n=100, cut=0.95, ar=[20], freq=1, vsini_e=0.1,
+                   period_e=0.05, radius_e=0.1, top20=1, md=0, n_pl=1,
+                   seed=None, prec='float64'):
+    """Generates and biases a population of n stars like generate_pop(), but
+    keeps every column in an array.
+
+    Parameters
+    ----------
+    *n, cut, ar, freq, vsini_e, period_e, radius_e, top20, md, n_pl :
+        The same as for random_incs.generate_pop()
+    *seed : number or numpy.random.Generator
+        Seed (or generator) for the random draws
+    *prec : dtype
+        The precision of the truths and measurements ('float64' by default,
+        or 'float32')
+
+    Returns
+    -------
+    pop : dictionary
+        An array for each of random_incs.COLUMNS (planet columns as in
+        draw_planets()), plus 'transit' (mask of stars with a transiting
+        planet) and 'ct' (the number of stars within the sini cut)
+    """
+    rng = np.random.default_rng(seed)
+    pop = draw_truths(n, md, rng, prec)
+    pop.update(draw_planets(pop['inc'], ar, freq, n_pl, md, rng))
+    pop.update(measure(pop, vsini_e, period_e, md))
+    pop['sini_u'] = uncert(pop, radius_e, md)
+    pop['success'] = np.abs(pop['sini_m'] - pop['sini']) <= pop['sini_u']
+    pop['chosen'], pop['spotted'], pop['ct'] = bias_mask(
+        pop['sini_m'], pop['sini_u'], cut, pop['transit'], top20)
+    return pop
+
+
+def transit_matrix(incs, ar):
+    """Checks every star against every a/R* value at once.
+
+    Parameters
+    ----------
+    incs : array
+        The inclinations of the stars
+    ar : list
+        The a/R* values
+
+    Returns
+    -------
+    tr : array
+        Boolean array of shape (stars, a/R* values); True where a planet at
+        that a/R* would be seen to transit, (a/R*)*|cos i| < 1
+    """
+    ar = np.asarray(ar, dtype=float)
+    return np.abs(np.cos(incs)[:, None] * ar[None, :]) < 1
+
+
+def ar_surface(cuts, ar, n=100, freq=1, vsini_e=0.1, period_e=0.05,
+               radius_e=0.1, top20=0, md=0, seed=None, prec='float64'):
+    """Finds the hit rate at every pair of a/R* value and sini cut for one
+    population. The stars (and which of them have a planet) are drawn only
+    once, since only the transit geometry depends on a/R*, so the values of
+    a/R* are compared on the same stars.
+
+    Parameters
+    ----------
+    cuts : list
+        A list of possible sini cuts
+    ar : list
+        The a/R* values to compare (one planet per star at each)
+    *n, freq, vsini_e, period_e, radius_e, top20, md :
+        The same as for random_incs.generate_pop()
+    *seed : number or numpy.random.Generator
+        Seed (or generator) for the random draws
+    *prec : dtype
+        The precision of the truths and measurements ('float64' by default,
+        or 'float32')
+
+    Returns
+    -------
+    surface : array
+        The hit rates, shape (a/R* values, cuts)
+    ideal : array
+        The ideal sini cut for each a/R* value
+    tr : array
+        The transit matrix, shape (stars, a/R* values)
+    """
+    rng = np.random.default_rng(seed)
+    truths = draw_truths(n, md, rng, prec)
+    has = draw_planets(truths['inc'], [0], freq, 1, 0, rng)['planets'][:, 0]
+    meas = measure(truths, vsini_e, period_e, md)
+    low = low_sini(meas['sini_m'], uncert(meas, radius_e, md))
+    tr = transit_matrix(truths['inc'], ar) & has[:, None]
+
+    cuts = np.asarray(cuts, dtype=float)
+    surface = _sweep(cuts, low, tr.T, top20=top20)[0]
+    best = np.argmax(surface, axis=1)
+    ideal = np.where(surface.max(axis=1) > 0, cuts[best], 0)
+    return surface, ideal, tr
+
+
+def check_prec(n=10**6, cuts=None, seed=None, **kwargs):
+    """Checks how much a float32 population differs from the float64 one
+    drawn from the same seed.
+
+    Parameters
+    ----------
+    *n : number
+        The size of the populations
+    *cuts : list
+        The sini cuts to compare the hit rates at (gen_cuts(1000) by default)
+    *seed : number
+        Seed for the random draws (the same for both populations)
+    **kwargs
+        Other keywords for gen_pop_arrays(), e.g. ar= , top20= , md=
+
+    Returns
+    -------
+    check : dictionary
+        'sini_m' and 'sini_u', the largest differences of the measured
+        sinis and their uncertainties; 'transit' and 'chosen', the
+        fractions of stars whose transit or chosen flags differ; 'curve',
+        the largest difference of the hit rates; 'ideal', the ideal cuts
+        (float64, float32); and 'bytes', the bytes per star of the float
+        columns (float64, float32)
+
+    Example
+    -------
+    The measured sinis agree to better than 10**-6, no transits change and
+    the hit rates agree to about 10**-4 once the cut at 1.0 is left out:
+
+    >>> check_prec(seed=1, ar=[20], top20=1,
+    ...            cuts=gen_cuts(1000)[:-1])  # doctest: +NORMALIZE_WHITESPACE
+    {'sini_m': 4.245258387047812e-07, 'sini_u': 6.717783340715044e-08,
+     'transit': 0.0, 'chosen': 0.0, 'curve': 0.00030007580494723074,
+     'ideal': (0.995995995995996, 0.995995995995996), 'bytes': (96, 48)}
+    """
+    if cuts is None:
+        cuts = gen_cuts(1000)
+    cuts = np.asarray(cuts, dtype=float)
+    pops = [gen_pop_arrays(n, seed=seed, prec=x, **kwargs)
+            for x in ('float64', 'float32')]
+    check = {}
+    for col in ('sini_m', 'sini_u'):
+        check[col] = float(np.max(np.abs(pops[1][col] - pops[0][col])))
+    for col in ('transit', 'chosen'):
+        check[col] = float(np.mean(pops[0][col] != pops[1][col]))
+    curves = []
+    ideals = []
+    top20 = kwargs.get('top20', 1)
+    for pop in pops:
+        low = low_sini(pop['sini_m'], pop['sini_u'])
+        sweep = _sweep(cuts, low, pop['transit'], top20=top20)
+        curves += [sweep[0]]
+        ideals += [_best(cuts, *sweep)[0]]
+    check['curve'] = float(np.max(np.abs(curves[1] - curves[0])))
+    check['ideal'] = tuple(float(x) for x in ideals)
+    check['bytes'] = tuple(sum(x.itemsize for x in pop.values()
+                               if isinstance(x, np.ndarray) and
+                               x.dtype.kind == 'f' and x.shape == (n,))
+                           for pop in pops)
+    return check